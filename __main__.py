@@ -3,7 +3,9 @@ import traceback
 import sys
 import os
 import time
+import queue
 import asyncio
+import threading
 import signal
 import psutil
 
@@ -17,13 +19,18 @@ from mindsdb.utilities.config import Config, STOP_THREADS_EVENT
 from mindsdb.utilities.ps import is_pid_listen_port, get_child_pids
 from mindsdb.utilities.functions import args_parse, get_versions_where_predictors_become_obsolete
 from mindsdb.utilities.with_kwargs_wrapper import WithKWArgsWrapper
-from mindsdb.utilities.log import log
+from mindsdb.utilities.log import log, start_log_retention
 from mindsdb.interfaces.database.database import DatabaseWrapper
+from mindsdb.interfaces.database.registration_ledger import RegistrationLedger
 from mindsdb.interfaces.model.model_interface import ray_based, ModelInterface
+from mindsdb.interfaces.model.model_controller import ModelController
+from mindsdb.interfaces.model.inference_server import InferenceServerProcess
+from mindsdb.interfaces.stream.stream_pool import StreamWorkerPool
 import mindsdb.interfaces.storage.db as db
 
 
 COMPANY_ID = os.environ.get('MINDSDB_COMPANY_ID', None)
+INTEGRATION_SETUP_TIMEOUT = 120
 
 
 def close_api_gracefully(apis):
@@ -48,6 +55,108 @@ def close_api_gracefully(apis):
         pass
 
 
+def start_api(start_function, *args):
+    """ Entry point of API process: the first ModelController created by the API starts predictors warm-up """
+    ModelController.warm_up_on_init = True
+    start_function(*args)
+
+
+def mark_obsolete_predictors(mindsdb_version):
+    """ Mark predictors created by MindsDB versions older than last compatible one as available for update
+    """
+    is_modified = False
+    predictor_records = db.session.query(db.Predictor).all()
+    if len(predictor_records) > 0:
+        sucess, compatible_versions = get_versions_where_predictors_become_obsolete()
+        if sucess is True:
+            compatible_versions = [version.parse(x) for x in compatible_versions]
+            mindsdb_version_parsed = version.parse(mindsdb_version)
+            compatible_versions = [x for x in compatible_versions if x <= mindsdb_version_parsed]
+            if len(compatible_versions) > 0:
+                last_compatible_version = compatible_versions[-1]
+                for predictor_record in predictor_records:
+                    if (
+                        isinstance(predictor_record.mindsdb_version, str) is not None
+                        and version.parse(predictor_record.mindsdb_version) < last_compatible_version
+                    ):
+                        predictor_record.update_status = 'available'
+                        is_modified = True
+    if is_modified is True:
+        db.session.commit()
+
+
+def get_complete_models_data():
+    model_interface = WithKWArgsWrapper(ModelInterface(), company_id=COMPANY_ID)
+    model_data_arr = []
+    for model in model_interface.get_models():
+        if model['status'] == 'complete':
+            try:
+                model_data_arr.append(model_interface.get_model_data(model['name'], with_analysis=False))
+            except Exception:
+                pass
+    return model_data_arr
+
+
+def setup_integration(integration_name, model_data_arr, results):
+    from mindsdb.interfaces.database.integrations import DatasourceController
+    try:
+        dbw = DatabaseWrapper(COMPANY_ID)
+        ledger = RegistrationLedger(COMPANY_ID)
+        datasource_interface = WithKWArgsWrapper(DatasourceController(), company_id=COMPANY_ID)
+        integration_data = datasource_interface.get_db_integration(integration_name)
+        ledger.setup(dbw, integration_name, integration_data)
+        ledger.sync(dbw, integration_name, model_data_arr)
+        results.put((integration_name, None))
+    except Exception as e:
+        results.put((integration_name, e))
+    finally:
+        db.session.remove()
+
+
+def setup_integrations(integration_names, mindsdb_version):
+    """ Register predictors in all published integrations.
+        Each integration is set up in own thread and limited by INTEGRATION_SETUP_TIMEOUT.
+    """
+    try:
+        mark_obsolete_predictors(mindsdb_version)
+        model_data_arr = get_complete_models_data()
+    except Exception as e:
+        log.error(f'Error while getting predictors for registration in integrations: {e}')
+        return
+    finally:
+        db.session.remove()
+
+    if len(integration_names) == 0:
+        return
+
+    results = queue.Queue()
+    for integration_name in integration_names:
+        print(f'Setting up integration: {integration_name}')
+        threading.Thread(
+            target=setup_integration,
+            args=(integration_name, model_data_arr, results),
+            name=f'setup_integration_{integration_name}',
+            daemon=True
+        ).start()
+
+    deadline = time.time() + INTEGRATION_SETUP_TIMEOUT
+    pending = set(integration_names)
+    while len(pending) > 0:
+        try:
+            integration_name, error = results.get(timeout=max(deadline - time.time(), 0))
+        except queue.Empty:
+            break
+        pending.discard(integration_name)
+        done_count = len(integration_names) - len(pending)
+        if error is None:
+            print(f'Integration {integration_name}: predictors registered ({done_count}/{len(integration_names)})')
+        else:
+            log.error(f'\n\nError: {error} setting up database integration {integration_name}\n\n')
+
+    for integration_name in pending:
+        log.error(f'Integration {integration_name}: setup is not finished in {INTEGRATION_SETUP_TIMEOUT} seconds')
+
+
 if __name__ == '__main__':
     mp.freeze_support()
     args = args_parse()
@@ -81,48 +190,14 @@ if __name__ == '__main__':
 
     # @TODO Backwards compatibiltiy for tests, remove later
     from mindsdb.interfaces.database.integrations import DatasourceController
-    dbw = DatabaseWrapper(COMPANY_ID)
-    model_interface = WithKWArgsWrapper(ModelInterface(), company_id=COMPANY_ID)
     datasource_interface = WithKWArgsWrapper(DatasourceController(), company_id=COMPANY_ID)
-    raw_model_data_arr = model_interface.get_models()
-    model_data_arr = []
-    for model in raw_model_data_arr:
-        if model['status'] == 'complete':
-            x = model_interface.get_model_data(model['name'])
-            try:
-                model_data_arr.append(model_interface.get_model_data(model['name']))
-            except Exception:
-                pass
 
+    published_integrations = []
     if not is_cloud:
-        # region Mark old predictors as outdated
-        is_modified = False
-        predictor_records = db.session.query(db.Predictor).all()
-        if len(predictor_records) > 0:
-            sucess, compatible_versions = get_versions_where_predictors_become_obsolete()
-            if sucess is True:
-                compatible_versions = [version.parse(x) for x in compatible_versions]
-                mindsdb_version_parsed = version.parse(mindsdb_version)
-                compatible_versions = [x for x in compatible_versions if x <= mindsdb_version_parsed]
-                if len(compatible_versions) > 0:
-                    last_compatible_version = compatible_versions[-1]
-                    for predictor_record in predictor_records:
-                        if (
-                            isinstance(predictor_record.mindsdb_version, str) is not None
-                            and version.parse(predictor_record.mindsdb_version) < last_compatible_version
-                        ):
-                            predictor_record.update_status = 'available'
-                            is_modified = True
-        if is_modified is True:
-            db.session.commit()
-        # endregion
-
         for integration_name in datasource_interface.get_db_integrations(sensitive_info=True):
-            print(f"Setting up integration: {integration_name}")
             if datasource_interface.get_db_integration(integration_name).get('publish', False):
                 # do setup and register only if it is 'publish' integration
-                dbw.setup_integration(integration_name)
-                dbw.register_predictors(model_data_arr, integration_name=integration_name)
+                published_integrations.append(integration_name)
 
         for integration_name in config.get('integrations', {}):
             try:
@@ -131,14 +206,15 @@ if __name__ == '__main__':
                     datasource_interface.remove_db_integration(integration_name)
                 print(f'Adding: {integration_name}')
                 datasource_interface.add_db_integration(integration_name, config['integrations'][integration_name])            # Setup for user `None`, since we don't need this for cloud
-                if config['integrations'][integration_name].get('publish', False) and not is_cloud:
-                    dbw.setup_integration(integration_name)
-                    dbw.register_predictors(model_data_arr, integration_name=integration_name)
+                if (
+                    config['integrations'][integration_name].get('publish', False)
+                    and integration_name not in published_integrations
+                ):
+                    published_integrations.append(integration_name)
             except Exception as e:
                 log.error(f'\n\nError: {e} adding database integration {integration_name}\n\n')
 
-    del model_interface
-    del dbw
+    del datasource_interface
     # @TODO Backwards compatibiltiy for tests, remove later
 
     if args.api is None:
@@ -160,15 +236,22 @@ if __name__ == '__main__':
         'mongodb': start_mongo
     }
 
+    if config['inference_server']['enabled'] and not ray_based:
+        # started before APIs, so they do not fall back to local predictions
+        print('inference server: starting...')
+        p = InferenceServerProcess()
+        p.start()
+        apis['inference_server'] = {'process': p, 'started': True}
+
     for api_name, api_data in apis.items():
         if api_data['started']:
             continue
         print(f'{api_name} API: starting...')
         try:
             if api_name == 'http':
-                p = ctx.Process(target=start_functions[api_name], args=(args.verbose, args.no_studio))
+                p = ctx.Process(target=start_api, args=(start_functions[api_name], args.verbose, args.no_studio))
             else:
-                p = ctx.Process(target=start_functions[api_name], args=(args.verbose,))
+                p = ctx.Process(target=start_api, args=(start_functions[api_name], args.verbose))
             p.start()
             api_data['process'] = p
         except Exception as e:
@@ -178,6 +261,24 @@ if __name__ == '__main__':
 
     atexit.register(close_api_gracefully, apis=apis)
 
+    start_log_retention(STOP_THREADS_EVENT)
+
+    stream_pool = None
+    if config['streams']['workers'] > 0:
+        print(f"stream workers: starting {config['streams']['workers']} processes...")
+        stream_pool = StreamWorkerPool(config['streams']['workers']).start()
+        atexit.register(stream_pool.stop)
+
+    if not is_cloud:
+        # predictors registration may take minutes, so it is done while APIs are starting
+        setup_thread = threading.Thread(
+            target=setup_integrations,
+            args=(published_integrations, mindsdb_version),
+            name='setup_integrations',
+            daemon=True
+        )
+        setup_thread.start()
+
     async def wait_api_start(api_name, pid, port):
         timeout = 60
         start_time = time.time()
@@ -209,4 +310,6 @@ if __name__ == '__main__':
     except KeyboardInterrupt:
         print('Stopping stream integrations...')
         STOP_THREADS_EVENT.set()
+        if stream_pool is not None:
+            stream_pool.stop()
         print('Closing app...')
@@ -1,13 +1,12 @@
 import os
-import psutil
-import tempfile
-from pathlib import Path
 
-from flask import request
+from flask import request, Response
 from flask_restx import Resource
 from flask import current_app as ca
 
 from mindsdb.utilities.log import log
+from mindsdb.utilities.metrics import metrics
+from mindsdb.utilities.process_registry import activity_registry
 from mindsdb.api.http.namespaces.configs.util import ns_conf
 from mindsdb.utilities.telemetry import (
     enable_telemetry,
@@ -26,6 +25,25 @@ class Ping(Resource):
         return {'status': 'ok'}
 
 
+@ns_conf.route('/ready')
+class Ready(Resource):
+    @ns_conf.doc('get_ready')
+    def get(self):
+        '''Checks most used predictors are loaded after start'''
+        status = request.model_interface.get_warm_up_status()
+        return status, 200 if status['ready'] else 503
+
+
+@ns_conf.route('/metrics')
+class Metrics(Resource):
+    @ns_conf.doc('get_metrics')
+    def get(self):
+        '''Duration of predict and learn stages in Prometheus text format'''
+        if not metrics.enabled:
+            return 'Metrics are disabled in config', 404
+        return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
 @ns_conf.route('/ping_native')
 class PingNative(Resource):
     @ns_conf.doc('get_ping_native')
@@ -36,27 +54,7 @@ class PingNative(Resource):
         if os.name != 'posix':
             return {'native_process': False}
 
-        response = {
-            'learn': False,
-            'predict': False,
-            'analyse': False
-        }
-
-        for process_type in response:
-            processes_dir = Path(tempfile.gettempdir()).joinpath(f'mindsdb/processes/{process_type}/')
-            if not processes_dir.is_dir():
-                continue
-            process_marks = [x.name for x in processes_dir.iterdir()]
-            for p_mark in process_marks:
-                pid = int(p_mark.split('-')[0])
-                try:
-                    psutil.Process(pid)
-                except Exception:
-                    processes_dir.joinpath(p_mark).unlink()
-                else:
-                    response[process_type] = True
-
-        return response
+        return activity_registry.get_active()
 
 
 @ns_conf.route('/telemetry')
@@ -90,6 +88,59 @@ class ValidateJsonAI(Resource):
             return {'error': str(e)}
         return {'code': code}
 
+@ns_conf.route('/batch_predict')
+class BatchPredict(Resource):
+    @ns_conf.doc('post_batch_predict')
+    def post(self):
+        ''' Start batch prediction job for datasource or query to integration.
+            Results are written as parquet or arrow files.
+        '''
+        data = request.json
+        predictor = data.get('predictor')
+        if predictor is None:
+            return 'Please provide predictor', 400
+
+        from_data = None
+        if data.get('data_source_name') is not None:
+            from_data = request.default_store.get_datasource_obj(data['data_source_name'], raw=True)
+        elif data.get('integration') is None or data.get('query') is None:
+            return 'Please provide data_source_name or integration and query', 400
+
+        try:
+            # query result is not saved as datasource, it is read by pages in the job
+            job = request.model_interface.start_batch_predict(
+                predictor,
+                from_data,
+                output_format=data.get('output_format', 'parquet'),
+                workers=data.get('workers'),
+                integration=data.get('integration'),
+                query=data.get('query')
+            )
+        except Exception as e:
+            return {'error': str(e)}, 400
+        return job, 200
+
+
+@ns_conf.route('/batch_predict/<job_id>')
+@ns_conf.param('job_id', 'Batch prediction job id')
+class BatchPredictStatus(Resource):
+    @ns_conf.doc('get_batch_predict')
+    def get(self, job_id):
+        ''' Progress and result of batch prediction job '''
+        try:
+            return request.model_interface.get_batch_predict(job_id)
+        except Exception as e:
+            return {'error': str(e)}, 404
+
+    @ns_conf.doc('put_batch_predict')
+    def put(self, job_id):
+        ''' Resume failed or interrupted batch prediction job '''
+        try:
+            return request.model_interface.resume_batch_predict(job_id)
+        except Exception as e:
+            return {'error': str(e)}, 400
+
+
 @ns_conf.route('/update-gui')
 class UpdateGui(Resource):
     @ns_conf.doc('get_update_gui')
@@ -0,0 +1,210 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from contextlib import contextmanager
+
+from mindsdb.utilities.cache import Cache
+from mindsdb.utilities.config import Config
+from mindsdb.utilities.with_kwargs_wrapper import WithKWArgsWrapper
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# fields of integration data which are changed on each re-adding of same integration
+VOLATILE_INTEGRATION_FIELDS = ('id', 'date_last_update')
+# predictors may be dropped in integration bypassing mindsdb, so once in REFRESH_INTERVAL seconds
+# sync registers all predictors again, regardless of the ledger
+REFRESH_INTERVAL = 24 * 60 * 60
+
+
+class RegistrationLedger():
+    """ Keeps record of which version of predictor is registered in which integration,
+        so only added, changed or removed predictors are passed to integrations.
+
+        Record of each integration:
+            {
+                'setup': hash of integration data at the moment of setup,
+                'predictors': {predictor_name: predictor updated_at},
+                'refreshed_at': time of last registration of all predictors
+            }
+
+        Ledger is shared by all mindsdb processes (APIs and learn processes), so each access
+        to it opens the cache under a file lock. Integrations are called outside of the lock.
+    """
+    _lock = threading.Lock()
+
+    def __init__(self, company_id=None):
+        self.company_id = company_id
+        self.cache_name = f'predictors_registration_{company_id}'
+
+    @contextmanager
+    def _locked(self):
+        with self._lock:
+            if fcntl is None:
+                with Cache(self.cache_name) as cache:
+                    yield cache
+                return
+            lock_path = os.path.join(Config()['paths']['cache'], f'{self.cache_name}.lock')
+            with open(lock_path, 'a') as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    with Cache(self.cache_name) as cache:
+                        yield cache
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _get_record(cache, integration_name):
+        try:
+            return cache[integration_name]
+        except KeyError:
+            return {'setup': None, 'predictors': {}}
+
+    def _read(self, integration_name):
+        with self._locked() as cache:
+            return self._get_record(cache, integration_name)
+
+    @staticmethod
+    def _integration_hash(integration_data):
+        data = {k: v for k, v in integration_data.items() if k not in VOLATILE_INTEGRATION_FIELDS}
+        return hashlib.md5(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+    @staticmethod
+    def _predictor_version(model_data):
+        return str(model_data.get('updated_at'))
+
+    def _get_published_integrations(self):
+        from mindsdb.interfaces.database.integrations import DatasourceController
+        datasource_interface = WithKWArgsWrapper(DatasourceController(), company_id=self.company_id)
+        return [
+            name for name, data in datasource_interface.get_db_integrations(sensitive_info=True).items()
+            if data.get('publish', False)
+        ]
+
+    def get_integration(self, dbw, integration_name):
+        """ Integration object of integration_name, or None if there is no such integration or its type is unknown """
+        from mindsdb.interfaces.database.integrations import DatasourceController
+        datasource_interface = WithKWArgsWrapper(DatasourceController(), company_id=self.company_id)
+        integration_data = datasource_interface.get_db_integration(integration_name)
+        if not integration_data or integration_data.get('type') not in dbw.known_dbs:
+            return None
+        return dbw.known_dbs[integration_data['type']](dbw.config, integration_name, integration_data)
+
+    @staticmethod
+    def _tables_missing(integration):
+        """ Integrations which can check that their mindsdb tables exist expose is_set_up().
+            Tables may be dropped bypassing mindsdb, then record of the ledger is not valid anymore.
+        """
+        is_set_up = getattr(integration, 'is_set_up', None)
+        return callable(is_set_up) and not is_set_up()
+
+    def is_set_up(self, integration_name, integration_data, integration=None):
+        if self._read(integration_name)['setup'] != self._integration_hash(integration_data):
+            return False
+        return integration is None or not self._tables_missing(integration)
+
+    def mark_set_up(self, integration_name, integration_data):
+        """ Integration setup drops all registered predictors, so the record starts from scratch """
+        with self._locked() as cache:
+            cache[integration_name] = {
+                'setup': self._integration_hash(integration_data),
+                'predictors': {},
+                'refreshed_at': time.time()
+            }
+
+    def setup(self, dbw, integration_name, integration_data):
+        """ Set up integration, if it was not set up with same integration data or its tables are missing
+
+            Returns:
+                bool: True if setup was done
+        """
+        integration = self.get_integration(dbw, integration_name)
+        if integration is None:
+            raise Exception(f'Unknown database integration type for: {integration_name}')
+        if self.is_set_up(integration_name, integration_data, integration):
+            return False
+        integration.setup()
+        self.mark_set_up(integration_name, integration_data)
+        return True
+
+    def _apply(self, dbw, integration_name, model_data_arr, remove_absent):
+        integration = self.get_integration(dbw, integration_name)
+        if integration is None or not integration.check_connection():
+            # nothing is recorded, so predictors are registered on next sync
+            return 0, 0
+
+        record = self._read(integration_name)
+        registered = record['predictors']
+
+        refresh = remove_absent and time.time() - record.get('refreshed_at', 0) > REFRESH_INTERVAL
+        to_register = [
+            x for x in model_data_arr
+            if refresh or registered.get(x['name']) != self._predictor_version(x)
+        ]
+        to_unregister = []
+        if remove_absent:
+            names = set(x['name'] for x in model_data_arr)
+            to_unregister = [x for x in registered if x not in names]
+
+        for name in to_unregister:
+            integration.unregister_predictor(name)
+        if len(to_register) > 0:
+            integration.register_predictors(to_register)
+
+        if len(to_register) > 0 or len(to_unregister) > 0 or refresh:
+            # record may be changed by other process meanwhile, so changes are applied to the fresh one
+            with self._locked() as cache:
+                record = self._get_record(cache, integration_name)
+                for name in to_unregister:
+                    record['predictors'].pop(name, None)
+                for model_data in to_register:
+                    record['predictors'][model_data['name']] = self._predictor_version(model_data)
+                if refresh:
+                    record['refreshed_at'] = time.time()
+                cache[integration_name] = record
+        return len(to_register), len(to_unregister)
+
+    def sync(self, dbw, integration_name, model_data_arr):
+        """ Make set of predictors registered in integration equal to model_data_arr
+
+            Args:
+                dbw (DatabaseWrapper)
+                integration_name (str)
+                model_data_arr (list): data of all complete predictors
+            Returns:
+                tuple: count of registered and unregistered predictors
+        """
+        return self._apply(dbw, integration_name, model_data_arr, remove_absent=True)
+
+    def register(self, dbw, model_data_arr, integration_name=None):
+        """ Register predictors in integration or, if integration_name is None, in all published integrations.
+            Predictors which already registered with same version are skipped.
+        """
+        if integration_name is None:
+            integration_names = self._get_published_integrations()
+        else:
+            integration_names = [integration_name]
+        for name in integration_names:
+            self._apply(dbw, name, model_data_arr, remove_absent=False)
+
+    def unregister(self, dbw, name, integration_name=None):
+        """ Unregister predictor from integration or, if integration_name is None, from all published integrations """
+        if integration_name is None:
+            integration_names = self._get_published_integrations()
+        else:
+            integration_names = [integration_name]
+        record_name = name.split('@@@@@')[-1]
+        for integration_name in integration_names:
+            integration = self.get_integration(dbw, integration_name)
+            if integration is None or not integration.check_connection():
+                continue
+            integration.unregister_predictor(name)
+            with self._locked() as cache:
+                record = self._get_record(cache, integration_name)
+                if record_name in record['predictors']:
+                    del record['predictors'][record_name]
+                    cache[integration_name] = record
@@ -0,0 +1,406 @@
+import os
+import csv
+import uuid
+import shutil
+import itertools
+
+import psutil
+import numpy as np
+import pandas as pd
+from pandas.core.frame import DataFrame
+import mindsdb_datasources
+from mindsdb_datasources.datasources.data_source import unnest_df
+from mindsdb_datasources.datasources.file_ds import clean_row, accepted_csv_delimiters
+
+from mindsdb.interfaces.datastore.datastore import QueryDS
+
+try:
+    import pyarrow  # noqa: F401
+    SPILL_FORMAT = 'parquet'
+except ImportError:
+    SPILL_FORMAT = 'pickle'
+
+
+DEFAULT_CHUNK_SIZE = 100000
+DEFAULT_SAMPLE_SIZE = 100000
+
+# datasources which query can be wrapped into 'SELECT * FROM (...) WHERE key > x ORDER BY key LIMIT n'
+PAGINATED_DATASOURCES = ('MySqlDS', 'MariaDS', 'PostgresDS', 'ClickhouseDS')
+# integration type -> datasource class and fields of integration data which are its arguments
+INTEGRATION_DATASOURCES = {
+    'mysql': ('MySqlDS', ('database', 'host', 'port', 'user', 'password', 'ssl', 'ssl_ca', 'ssl_cert', 'ssl_key')),
+    'mariadb': ('MariaDS', ('database', 'host', 'port', 'user', 'password', 'ssl', 'ssl_ca', 'ssl_cert', 'ssl_key')),
+    'postgres': ('PostgresDS', ('database', 'host', 'port', 'user', 'password')),
+    'clickhouse': ('ClickhouseDS', ('host', 'port', 'user', 'password'))
+}
+# quote of identifiers in queries of paginated datasources
+IDENTIFIER_QUOTES = {'PostgresDS': '"'}
+# lightwood learns from one DataFrame, so training data may take at most this share of available memory
+MAX_TRAINING_MEMORY_SHARE = 0.5
+
+
+def get_integration_from_data(integration_data: dict, query: str):
+    """ Description of datasource which runs query in integration and can be read by pages,
+        None if integration is not of PAGINATED_DATASOURCES
+    """
+    ds_class, fields = INTEGRATION_DATASOURCES.get(integration_data.get('type'), (None, None))
+    if ds_class is None:
+        return None
+    kwargs = {x: integration_data[x] for x in fields if integration_data.get(x) is not None}
+    return {'class': ds_class, 'args': [], 'kwargs': dict(kwargs, query=query)}
+
+
+def make_datasource(from_data: dict):
+    """ Create datasource object from its description {'class': ..., 'args': ..., 'kwargs': ...} """
+    if from_data['class'] == 'QueryDS':
+        return QueryDS(*from_data['args'], **from_data['kwargs'])
+    ds_cls = getattr(mindsdb_datasources, from_data['class'])
+    return ds_cls(*from_data['args'], **from_data['kwargs'])
+
+
+def _apply_dtypes(chunk: DataFrame, dtypes: pd.Series) -> DataFrame:
+    """ Cast columns of chunk to types of first chunk, so all chunks have same schema """
+    for col, dtype in dtypes.items():
+        if col in chunk.columns and chunk[col].dtype != dtype:
+            try:
+                chunk[col] = chunk[col].astype(dtype)
+            except (ValueError, TypeError):
+                pass
+    return chunk
+
+
+def is_paginated(ds) -> bool:
+    return (
+        type(ds).__name__ in PAGINATED_DATASOURCES
+        and isinstance(getattr(ds, '_query', None), str)
+        and getattr(ds, '_internal_df', None) is None
+    )
+
+
+def _query_df(ds, query: str) -> DataFrame:
+    result = ds.query(query)
+    return result[0] if isinstance(result, tuple) else result
+
+
+def count_rows(ds):
+    """ Count of rows in SQL datasource without loading it, None for other datasources """
+    if not is_paginated(ds):
+        return None
+    query = ds._query.strip().rstrip(';')
+    df = _query_df(ds, f'SELECT COUNT(*) AS rows_count FROM ({query}) AS counted_ds')
+    return int(df.iloc[0, 0])
+
+
+def _quote_identifier(ds, name: str) -> str:
+    quote = IDENTIFIER_QUOTES.get(type(ds).__name__, '`')
+    return quote + name.replace(quote, quote * 2) + quote
+
+
+def _to_literal(ds, value) -> str:
+    if isinstance(value, (int, np.integer)):
+        return str(int(value))
+    value = str(value).replace("'", "''")
+    if type(ds).__name__ != 'PostgresDS':
+        # backslash is escape character in mysql and clickhouse strings
+        value = value.replace('\\', '\\\\')
+    return f"'{value}'"
+
+
+def find_key_column(ds):
+    """ Column of SQL datasource which can be used for keyset pagination: integer or string, unique and not null.
+        Candidates are 'id' and columns which names end with 'id', they are checked by one query.
+
+        Returns:
+            str or None
+    """
+    query = ds._query.strip().rstrip(';')
+    head = _query_df(ds, f'SELECT * FROM ({query}) AS chunked_ds LIMIT 1')
+    candidates = [
+        col for col in head.columns
+        if isinstance(col, str) and col.lower().endswith('id')
+        and (pd.api.types.is_integer_dtype(head[col]) or pd.api.types.is_object_dtype(head[col]))
+    ]
+    candidates.sort(key=lambda x: x.lower() != 'id')
+    if len(candidates) == 0:
+        return None
+    # COUNT(DISTINCT) skips nulls, so it is equal to COUNT(*) only for unique not null column
+    counts = ', '.join(
+        f'COUNT(DISTINCT {_quote_identifier(ds, col)}) AS key_{i}' for i, col in enumerate(candidates)
+    )
+    df = _query_df(ds, f'SELECT COUNT(*) AS rows_count, {counts} FROM ({query}) AS counted_ds')
+    rows_count = int(df.iloc[0, 0])
+    for i, col in enumerate(candidates):
+        if int(df.iloc[0, i + 1]) == rows_count:
+            return col
+    return None
+
+
+def _iter_paginated(ds, key_column: str, chunk_size: int, offset: int = 0):
+    """ Keyset pagination: each page is read by index of key column, so reading is linear,
+        and the order of rows is the same on each read, so offset can be used to resume reading
+    """
+    query = ds._query.strip().rstrip(';')
+    key = _quote_identifier(ds, key_column)
+    condition = ''
+    while True:
+        page_query = f'SELECT * FROM ({query}) AS chunked_ds {condition} ORDER BY {key} LIMIT {chunk_size}'
+        if offset > 0:
+            # offset is skipped once, next pages are read after last key
+            page_query += f' OFFSET {offset}'
+            offset = 0
+        chunk = _query_df(ds, page_query)
+        if len(chunk) == 0:
+            break
+        yield chunk
+        if len(chunk) < chunk_size:
+            break
+        condition = f'WHERE {key} > {_to_literal(ds, chunk[key_column].iloc[-1])}'
+
+
+def _iter_ordered(ds, chunk_size: int, offset: int = 0):
+    """ Pagination of SQL datasource without key column: pages are read by LIMIT/OFFSET in order of
+        all columns, so the order is the same on each read. Each page sorts whole result on the database side,
+        it is slower than keyset pagination, but the datasource is never loaded in memory entirely.
+    """
+    query = ds._query.strip().rstrip(';')
+    head = _query_df(ds, f'SELECT * FROM ({query}) AS chunked_ds LIMIT 1')
+    if len(head.columns) == 0:
+        return
+    order = ', '.join(_quote_identifier(ds, str(col)) for col in head.columns)
+    while True:
+        chunk = _query_df(
+            ds, f'SELECT * FROM ({query}) AS chunked_ds ORDER BY {order} LIMIT {chunk_size} OFFSET {offset}'
+        )
+        if len(chunk) == 0:
+            break
+        yield chunk
+        if len(chunk) < chunk_size:
+            break
+        offset += len(chunk)
+
+
+def _get_csv_file(ds):
+    """ Path and dialect of FileDS which can be read by rows: local csv file without custom parser """
+    if type(ds).__name__ != 'FileDS' or getattr(ds, '_internal_df', None) is not None:
+        return None
+    if ds.custom_parser is not None or ds.is_url or not os.path.isfile(ds.file):
+        return None
+    with open(ds.file, 'rb') as f:
+        head = f.read(128 * 1024)
+    if head.startswith((b'\xd0\xcf\x11\xe0', b'PK')):
+        # xls or xlsx
+        return None
+    try:
+        text = head.decode('utf-8-sig', errors='ignore')
+        if text.strip().startswith(('{', '[')):
+            return None
+        dialect = csv.Sniffer().sniff(text, delimiters=accepted_csv_delimiters)
+    except csv.Error:
+        return None
+    return ds.file, dialect
+
+
+def _iter_csv(ds, file_path: str, dialect, chunk_size: int, offset: int = 0):
+    """ Read csv file of FileDS by rows, in same way as FileDS does it for whole file """
+    # utf-8-sig skips Microsoft's BOM, as FileDS does
+    with open(file_path, 'rt', encoding='utf-8-sig', newline='') as f:
+        reader = csv.reader(f, dialect)
+        header = next(reader, None)
+        if header is None:
+            return
+        rows = itertools.islice(reader, offset, None)
+        columns = None
+        while True:
+            file_data = list(itertools.islice(rows, chunk_size))
+            if len(file_data) == 0:
+                break
+            if ds.clean_rows:
+                file_data = [clean_row(row) for row in file_data]
+            chunk, _ = unnest_df(pd.DataFrame(file_data, columns=header))
+            # json columns are unnested by first chunk, later chunks get same columns
+            if columns is None:
+                columns = chunk.columns
+            else:
+                chunk = chunk.reindex(columns=columns)
+            yield chunk
+            if len(file_data) < chunk_size:
+                break
+
+
+def iter_chunks(ds, chunk_size: int = DEFAULT_CHUNK_SIZE, offset: int = 0, key_column: str = None,
+                find_key: bool = True):
+    """ Read datasource by chunks.
+        SQL datasources with unique key column are read page by page in order of the key,
+        SQL datasources without it are read page by page in order of all columns,
+        local csv files are read by rows. Other datasources are loaded entirely and then split.
+
+        Args:
+            ds: instance of datasource class
+            chunk_size (int): max rows in chunk
+            offset (int): count of rows to skip
+            key_column (str): unique column of SQL datasource, found by find_key_column if not set
+            find_key (bool): if False and key_column is not set, SQL datasource is read without key
+        Yields:
+            DataFrame
+    """
+    csv_file = _get_csv_file(ds) if not is_paginated(ds) else None
+    if is_paginated(ds):
+        if key_column is None and find_key:
+            key_column = find_key_column(ds)
+        if key_column is not None:
+            chunks = _iter_paginated(ds, key_column, chunk_size, offset)
+        else:
+            chunks = _iter_ordered(ds, chunk_size, offset)
+    elif csv_file is not None:
+        chunks = _iter_csv(ds, *csv_file, chunk_size, offset)
+    else:
+        df = ds.df
+        chunks = (df.iloc[i:i + chunk_size] for i in range(offset, len(df), chunk_size))
+
+    dtypes = None
+    for chunk in chunks:
+        if dtypes is None:
+            dtypes = chunk.dtypes
+        else:
+            chunk = _apply_dtypes(chunk, dtypes)
+        yield chunk
+
+
+class ReservoirSampler():
+    """ Uniform sample of fixed size from stream of DataFrames (algorithm R) """
+
+    def __init__(self, sample_size: int = DEFAULT_SAMPLE_SIZE, random_state: int = 42):
+        self.sample_size = sample_size
+        self.seen = 0
+        self._rng = np.random.default_rng(random_state)
+        self._sample = None
+
+    def add(self, chunk: DataFrame) -> None:
+        chunk = chunk.reset_index(drop=True)
+        fill_count = min(max(self.sample_size - self.seen, 0), len(chunk))
+        if fill_count > 0:
+            head = chunk.iloc[:fill_count]
+            self._sample = head.copy() if self._sample is None else pd.concat([self._sample, head], ignore_index=True)
+            self.seen += fill_count
+            chunk = chunk.iloc[fill_count:]
+
+        if len(chunk) == 0:
+            return
+
+        # row number t replaces random row of the reservoir with probability sample_size / t
+        positions = np.arange(self.seen + 1, self.seen + len(chunk) + 1)
+        slots = (self._rng.random(len(chunk)) * positions).astype(np.int64)
+        mask = slots < self.sample_size
+        if mask.any():
+            rows = np.nonzero(mask)[0]
+            slots = slots[mask]
+            # if slot is replaced several times, last row wins
+            _, last = np.unique(slots[::-1], return_index=True)
+            last = len(slots) - 1 - last
+            replaced = np.zeros(len(self._sample), dtype=bool)
+            replaced[slots[last]] = True
+            self._sample = pd.concat(
+                [self._sample[~replaced], chunk.iloc[rows[last]]],
+                ignore_index=True
+            )
+        self.seen += len(chunk)
+
+    @property
+    def sample(self) -> DataFrame:
+        return self._sample if self._sample is not None else pd.DataFrame()
+
+
+class SpilledDataFrame():
+    """ DataFrame which is written by chunks to a directory on disk.
+        Sample of the data is kept in memory, it is enough to generate json-ai.
+    """
+
+    def __init__(self, path: str, sample: DataFrame = None):
+        self.path = path
+        self.sample = sample
+        self._chunks_count = 0
+        os.makedirs(path, exist_ok=True)
+
+    def write(self, chunk: DataFrame) -> None:
+        file_path = os.path.join(self.path, f'{self._chunks_count:08d}.{SPILL_FORMAT}')
+        if SPILL_FORMAT == 'parquet':
+            chunk.to_parquet(file_path, index=False)
+        else:
+            chunk.to_pickle(file_path)
+        self._chunks_count += 1
+
+    def load(self) -> DataFrame:
+        chunks = []
+        for file_name in sorted(os.listdir(self.path)):
+            file_path = os.path.join(self.path, file_name)
+            if file_name.endswith('.parquet'):
+                chunks.append(pd.read_parquet(file_path))
+            else:
+                chunks.append(pd.read_pickle(file_path))
+        return pd.concat(chunks, ignore_index=True)
+
+    def delete(self) -> None:
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+def read_training_data(ds, spill_dir: str, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                       sample_size: int = DEFAULT_SAMPLE_SIZE, max_memory: int = None):
+    """ Read datasource without holding it in memory entirely
+
+        Args:
+            max_memory (int): max size of the data in bytes, by default MAX_TRAINING_MEMORY_SHARE
+                of available memory. Lightwood loads whole data to learn, so reading fails
+                as soon as the data is bigger.
+        Returns:
+            DataFrame if datasource has no more than sample_size rows, else SpilledDataFrame
+    """
+    if max_memory is None:
+        max_memory = int(psutil.virtual_memory().available * MAX_TRAINING_MEMORY_SHARE)
+    sampler = ReservoirSampler(sample_size)
+    buffered = []
+    spilled = None
+    memory = 0
+    try:
+        for chunk in iter_chunks(ds, chunk_size):
+            memory += int(chunk.memory_usage(index=False, deep=True).sum())
+            if memory > max_memory:
+                raise Exception(
+                    f'Datasource does not fit in memory available for training: more than {sampler.seen + len(chunk)} rows '
+                    f'take more than {memory // 2**20} MB, while limit is {max_memory // 2**20} MB'
+                )
+            sampler.add(chunk)
+            if spilled is None:
+                buffered.append(chunk)
+                if sampler.seen > sample_size:
+                    spilled = SpilledDataFrame(os.path.join(spill_dir, f'learn_data_{uuid.uuid4().hex}'))
+                    for x in buffered:
+                        spilled.write(x)
+                    buffered = None
+            else:
+                spilled.write(chunk)
+    except Exception:
+        delete_spilled(spilled)
+        raise
+
+    if spilled is None:
+        if len(buffered) == 0:
+            return ds.df
+        return pd.concat(buffered, ignore_index=True)
+
+    spilled.sample = sampler.sample
+    return spilled
+
+
+def get_sample(data):
+    """ Data which is enough for analysis: sample for SpilledDataFrame, or DataFrame itself """
+    return data.sample if isinstance(data, SpilledDataFrame) else data
+
+
+def get_df(data) -> DataFrame:
+    """ Whole data to learn from, read_training_data has checked it fits in memory """
+    return data.load() if isinstance(data, SpilledDataFrame) else data
+
+
+def delete_spilled(data) -> None:
+    if isinstance(data, SpilledDataFrame):
+        data.delete()
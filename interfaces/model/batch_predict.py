@@ -0,0 +1,263 @@
+import os
+import re
+import json
+import time
+import uuid
+import datetime
+import traceback
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+try:
+    import fcntl
+except ImportError:
+    # not posix, jobs are not locked
+    fcntl = None
+
+from mindsdb.interfaces.storage.db import session, Predictor
+from mindsdb.interfaces.storage.artifacts import ArtifactStore
+from mindsdb.interfaces.model.parallel_predict import ctx, init_worker, predict_shard, get_workers_count
+from mindsdb.interfaces.datastore.chunked_reader import (
+    make_datasource,
+    iter_chunks,
+    is_paginated,
+    find_key_column,
+    DEFAULT_CHUNK_SIZE
+)
+from mindsdb.utilities.config import Config
+from mindsdb.utilities.log import log
+
+
+# output format is also extension of result files
+OUTPUT_FORMATS = ('parquet', 'arrow')
+# seconds to wait for lock of the job, it may be held for a moment by is_running check
+LOCK_TIMEOUT = 5
+# job id is part of the path, so only these characters are allowed
+JOB_ID_PATTERN = re.compile(r'[A-Za-z0-9_-]+')
+
+
+def _write_table(table, path: str, output_format: str) -> None:
+    tmp_path = f'{path}.tmp'
+    if output_format == 'parquet':
+        pq.write_table(table, tmp_path)
+    else:
+        with pa.OSFile(tmp_path, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+    # part is visible only when completely written, that makes job resumable
+    os.replace(tmp_path, path)
+
+
+def _count_rows(path: str, output_format: str) -> int:
+    if output_format == 'parquet':
+        return pq.read_metadata(path).num_rows
+    with pa.memory_map(path, 'r') as source:
+        return pa.ipc.open_file(source).read_all().num_rows
+
+
+def _predict_chunk(chunk, offset: int, key_column, part_path: str, output_format: str) -> int:
+    """ Rows of result are joined to input by original_index (index of row in whole datasource),
+        and by key column of SQL datasource, which is copied to the result
+    """
+    predictions = predict_shard(chunk, offset)
+    if key_column is not None and key_column not in predictions.columns:
+        predictions.insert(0, key_column, chunk[key_column].values)
+    _write_table(pa.Table.from_pandas(predictions, preserve_index=False), part_path, output_format)
+    return len(predictions)
+
+
+class BatchPredictJob():
+    """ Batch prediction job, which state is kept in {storage}/batch_predictions/{company_id}/{job_id}/job.json
+        Results are written to same directory as numbered parts: part-000000.parquet, part-000001.parquet, ...
+        Each part has original_index of rows in the datasource and, for SQL datasources, their key column.
+    """
+
+    def __init__(self, job_id: str, company_id: int):
+        if not isinstance(job_id, str) or JOB_ID_PATTERN.fullmatch(job_id) is None:
+            raise Exception(f"Wrong batch prediction job id: '{job_id}'")
+        self.job_id = job_id
+        self.company_id = company_id
+        self.path = os.path.join(Config()['paths']['storage'], 'batch_predictions', str(company_id), job_id)
+
+    @classmethod
+    def create(cls, predictor: str, from_data: dict, output_format: str, workers: int, company_id: int):
+        if pa is None:
+            raise Exception('pyarrow is required for batch predictions')
+        if output_format not in OUTPUT_FORMATS:
+            raise Exception(f'Output format must be one of: {", ".join(OUTPUT_FORMATS)}')
+        job = cls(uuid.uuid4().hex, company_id)
+        os.makedirs(job.path)
+        job.save({
+            'id': job.job_id,
+            'predictor': predictor,
+            'from_data': from_data,
+            'output_format': output_format,
+            'workers': workers,
+            'status': 'pending',
+            'rows_read': 0,
+            'rows_written': 0,
+            'chunks_done': 0,
+            'error': None,
+            'created_at': str(datetime.datetime.now())
+        })
+        return job
+
+    @property
+    def meta_path(self) -> str:
+        return os.path.join(self.path, 'job.json')
+
+    def exists(self) -> bool:
+        return os.path.isfile(self.meta_path)
+
+    def load(self) -> dict:
+        with open(self.meta_path, 'rt') as f:
+            return json.load(f)
+
+    def save(self, meta: dict) -> None:
+        tmp_path = f'{self.meta_path}.tmp'
+        with open(tmp_path, 'wt') as f:
+            json.dump(meta, f, default=str)
+        os.replace(tmp_path, self.meta_path)
+
+    def part_path(self, i: int, output_format: str) -> str:
+        return os.path.join(self.path, f'part-{i:06d}.{output_format}')
+
+    def list_parts(self, output_format: str) -> list:
+        return [
+            os.path.join(self.path, x) for x in sorted(os.listdir(self.path))
+            if x.startswith('part-') and x.endswith(f'.{output_format}')
+        ]
+
+    @contextmanager
+    def lock(self, timeout: float = 0):
+        """ Exclusive lock of the job, it is held by the process which runs the job
+
+            Yields:
+                bool: is lock acquired
+        """
+        if fcntl is None:
+            yield True
+            return
+        with open(os.path.join(self.path, 'job.lock'), 'a') as f:
+            started = time.time()
+            while True:
+                try:
+                    fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except OSError:
+                    if time.time() - started >= timeout:
+                        yield False
+                        return
+                    time.sleep(0.1)
+            try:
+                yield True
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def is_running(self) -> bool:
+        with self.lock() as acquired:
+            return not acquired
+
+    def status(self) -> dict:
+        meta = self.load()
+        del meta['from_data']
+        meta['path'] = self.path
+        return meta
+
+
+def run_batch_predict(job_id: str, company_id: int) -> None:
+    job = BatchPredictJob(job_id, company_id)
+    with job.lock(LOCK_TIMEOUT) as acquired:
+        if not acquired:
+            log.warning(f'Batch prediction job {job_id} is already running')
+            return
+        _run_batch_predict(job)
+
+
+def _run_batch_predict(job: BatchPredictJob) -> None:
+    company_id = job.company_id
+    meta = job.load()
+    output_format = meta['output_format']
+    meta['status'] = 'running'
+    meta['rows_read'] = 0
+    meta['chunks_done'] = 0
+    meta['error'] = None
+    job.save(meta)
+
+    try:
+        config = Config()
+        predictor_record = session.query(Predictor).filter_by(company_id=company_id, name=meta['predictor']).first()
+        assert predictor_record is not None, f"Predictor '{meta['predictor']}' does not exist"
+        if ((predictor_record.learn_args or {}).get('timeseries_settings') or {}).get('is_timeseries', False):
+            # rows of one group may fall into different chunks
+            raise Exception('Batch predictions are not supported for timeseries predictors')
+
+        fs_name = f'predictor_{company_id}_{predictor_record.id}'
+        ArtifactStore().get(fs_name, config['paths']['predictors'])
+        pickle_path = os.path.join(config['paths']['predictors'], fs_name)
+
+        ds = make_datasource(meta['from_data'])
+        if 'key_column' not in meta:
+            # key is found once, so each run of the job reads rows in the same order
+            meta['key_column'] = find_key_column(ds) if is_paginated(ds) else None
+            job.save(meta)
+        key_column = meta['key_column']
+
+        workers = get_workers_count(pickle_path, meta['workers'])
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=ctx,
+            initializer=init_worker,
+            initargs=(pickle_path, predictor_record.code)
+        ) as executor:
+            pending = set()
+            for i, chunk in enumerate(iter_chunks(ds, DEFAULT_CHUNK_SIZE, key_column=key_column, find_key=False)):
+                offset = meta['rows_read']
+                meta['rows_read'] += len(chunk)
+                part_path = job.part_path(i, output_format)
+                if os.path.isfile(part_path):
+                    # written by previous run of the job
+                    meta['chunks_done'] += 1
+                    continue
+                pending.add(executor.submit(_predict_chunk, chunk, offset, key_column, part_path, output_format))
+                # do not read datasource much faster than workers predict
+                if len(pending) >= workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        future.result()
+                    meta['chunks_done'] += len(done)
+                    job.save(meta)
+            for future in pending:
+                future.result()
+                meta['chunks_done'] += 1
+                job.save(meta)
+
+        meta['rows_written'] = sum(_count_rows(x, output_format) for x in job.list_parts(output_format))
+        if meta['rows_written'] != meta['rows_read']:
+            raise Exception(f"Rows count mismatch: read {meta['rows_read']}, written {meta['rows_written']}")
+        meta['status'] = 'complete'
+    except Exception as e:
+        log.error(f'Batch prediction job {job.job_id} failed: {e}')
+        meta['status'] = 'error'
+        meta['error'] = f'{traceback.format_exc()}\nMain error: {e}'
+    finally:
+        meta['updated_at'] = str(datetime.datetime.now())
+        job.save(meta)
+
+
+class BatchPredictProcess(ctx.Process):
+    # daemonic processes are not allowed to have children, and the job starts workers pool
+    daemon = False
+
+    def __init__(self, *args):
+        super(BatchPredictProcess, self).__init__(args=args)
+
+    def run(self):
+        run_batch_predict(*self._args)
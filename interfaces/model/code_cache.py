@@ -0,0 +1,110 @@
+import os
+import sys
+import json
+import hashlib
+import threading
+import importlib.util
+from collections import OrderedDict
+
+import dill
+import lightwood
+from lightwood import __version__ as lightwood_version
+
+from mindsdb.utilities.config import Config
+from mindsdb.utilities.metrics import metrics
+
+MAX_CACHED_MODULES = 128
+MAX_CACHED_CODES = 256
+
+_lock = threading.Lock()
+_modules = OrderedDict()
+_codes = OrderedDict()
+
+
+def _hash(text: str) -> str:
+    return hashlib.sha256(f'{lightwood_version}\n{text}'.encode('utf8')).hexdigest()
+
+
+def _cache_dir() -> str:
+    path = os.path.join(Config()['paths']['cache'], 'predictor_modules')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _remember(cache: OrderedDict, key, value, max_size: int) -> None:
+    cache[key] = value
+    cache.move_to_end(key)
+    if len(cache) > max_size:
+        cache.popitem(last=False)
+
+
+def module_from_code(code: str):
+    """ Module of generated predictor code. Module name depends only on hash of the code and
+        lightwood version, and its source is kept in paths['cache'], so python stores its bytecode
+        and the code is compiled once, not in each process.
+    """
+    module_name = f'predictor_{_hash(code)[:32]}'
+    with _lock:
+        module = _modules.get(module_name)
+        if module is not None:
+            _modules.move_to_end(module_name)
+            metrics.inc('predictor_module_cache_hits')
+            return module
+        metrics.inc('predictor_module_cache_misses')
+        path = os.path.join(_cache_dir(), f'{module_name}.py')
+        if not os.path.isfile(path):
+            with open(f'{path}.{os.getpid()}.tmp', 'wt') as f:
+                f.write(code)
+            os.replace(f'{path}.{os.getpid()}.tmp', path)
+        spec = importlib.util.spec_from_file_location(module_name, path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[module_name] = module
+        try:
+            spec.loader.exec_module(module)
+        except Exception:
+            del sys.modules[module_name]
+            raise
+        _remember(_modules, module_name, module, MAX_CACHED_MODULES)
+        return module
+
+
+def predictor_from_code(code: str):
+    return module_from_code(code).Predictor()
+
+
+def predictor_from_state(path: str, code: str):
+    """ Same as lightwood.predictor_from_state, but module of the predictor is taken from the cache """
+    for _ in range(2):
+        try:
+            with open(path, 'rb') as f:
+                return dill.load(f)
+        except ModuleNotFoundError as e:
+            if e.name is None or e.name in sys.modules:
+                raise
+            # predictor was saved in other process, module name there may be different
+            sys.modules[e.name] = module_from_code(code)
+    return lightwood.predictor_from_state(path, code)
+
+
+def code_from_json_ai(json_ai) -> str:
+    """ Code generated from JsonAI, which is cached by hash of the JsonAI """
+    key = _hash(json.dumps(json_ai.to_dict(), sort_keys=True, default=str))
+    with _lock:
+        code = _codes.get(key)
+        if code is not None:
+            _codes.move_to_end(key)
+            metrics.inc('predictor_code_cache_hits')
+            return code
+    metrics.inc('predictor_code_cache_misses')
+    path = os.path.join(_cache_dir(), f'code_{key}.py')
+    if os.path.isfile(path):
+        with open(path, 'rt') as f:
+            code = f.read()
+    else:
+        code = lightwood.code_from_json_ai(json_ai)
+        with open(f'{path}.{os.getpid()}.tmp', 'wt') as f:
+            f.write(code)
+        os.replace(f'{path}.{os.getpid()}.tmp', path)
+    with _lock:
+        _remember(_codes, key, code, MAX_CACHED_CODES)
+    return code
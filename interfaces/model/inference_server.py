@@ -0,0 +1,230 @@
+import os
+import socket
+import struct
+import pickle
+import itertools
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import torch.multiprocessing as mp
+
+from mindsdb.utilities.config import Config
+from mindsdb.utilities.log import log
+
+
+ctx = mp.get_context('spawn')
+
+# frame header: length of payload, id of request
+HEADER = struct.Struct('!IQ')
+# methods of ModelController which may be called through the server
+ALLOWED_METHODS = ('predict', 'get_warm_up_status')
+
+# True in the process of inference server, so its ModelController predicts locally
+is_server_process = False
+
+
+def get_socket_path():
+    config = Config()
+    return config.get('inference_server', {}).get('socket') or os.path.join(config['paths']['tmp'], 'inference.sock')
+
+
+def _recv_exactly(sock, size):
+    buf = bytearray(size)
+    view = memoryview(buf)
+    received = 0
+    while received < size:
+        n = sock.recv_into(view[received:], size - received)
+        if n == 0:
+            raise ConnectionError('Connection closed')
+        received += n
+    return buf
+
+
+def _send_frame(sock, request_id, obj):
+    payload = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+    sock.sendall(HEADER.pack(len(payload), request_id) + payload)
+
+
+def _recv_frame(sock):
+    length, request_id = HEADER.unpack(_recv_exactly(sock, HEADER.size))
+    return request_id, pickle.loads(_recv_exactly(sock, length))
+
+
+class InferenceServer():
+    """ Process which owns the predictors cache, so hot predictors are loaded once per node
+        and not in each API process.
+
+        Requests are framed pickled dicts {'method': ..., 'args': ..., 'kwargs': ...}, over UNIX socket.
+        Requests of one connection are executed concurrently and may be answered out of order,
+        so client may send next request without waiting for the answer to previous one.
+    """
+
+    def __init__(self, model_controller, socket_path, workers=8):
+        self.model_controller = model_controller
+        self.socket_path = socket_path
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+
+    def _handle_request(self, conn, write_lock, request_id, request):
+        from mindsdb.interfaces.storage.db import session
+        try:
+            if request['method'] not in ALLOWED_METHODS:
+                raise Exception(f"Method '{request['method']}' is not allowed")
+            method = getattr(self.model_controller, request['method'])
+            response = {'result': method(*request['args'], **request['kwargs'])}
+        except Exception as e:
+            response = {'error': str(e)}
+        finally:
+            session.remove()
+        try:
+            with write_lock:
+                _send_frame(conn, request_id, response)
+        except OSError:
+            pass
+
+    def _handle_connection(self, conn):
+        write_lock = threading.Lock()
+        try:
+            while True:
+                request_id, request = _recv_frame(conn)
+                self.executor.submit(self._handle_request, conn, write_lock, request_id, request)
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            conn.close()
+
+    def serve_forever(self):
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        # requests are pickled, so only the owner of the process may connect. The socket is created
+        # with these permissions, chmod after bind would leave a moment when others may connect
+        umask = os.umask(0o077)
+        try:
+            server.bind(self.socket_path)
+        finally:
+            os.umask(umask)
+        server.listen(128)
+        log.info(f'Inference server is listening on {self.socket_path}')
+        while True:
+            conn, _ = server.accept()
+            threading.Thread(target=self._handle_connection, args=(conn, ), daemon=True).start()
+
+
+class _Connection():
+    """ Connection of client. Answers are read by separate thread and matched with requests by id """
+
+    def __init__(self, socket_path):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(socket_path)
+        self.write_lock = threading.Lock()
+        self.pending = {}
+        self.pending_lock = threading.Lock()
+        self.closed = False
+        threading.Thread(target=self._read_loop, daemon=True).start()
+
+    def _read_loop(self):
+        try:
+            while True:
+                request_id, response = _recv_frame(self.sock)
+                with self.pending_lock:
+                    future = self.pending.pop(request_id, None)
+                if future is not None:
+                    future.set_result(response)
+        except (ConnectionError, OSError) as e:
+            self.closed = True
+            with self.pending_lock:
+                pending, self.pending = self.pending, {}
+            for future in pending.values():
+                future.set_exception(ConnectionError(f'Connection to inference server is lost: {e}'))
+
+    def send(self, request_id, request):
+        future = Future()
+        with self.pending_lock:
+            self.pending[request_id] = future
+        try:
+            with self.write_lock:
+                _send_frame(self.sock, request_id, request)
+        except OSError:
+            with self.pending_lock:
+                self.pending.pop(request_id, None)
+            self.closed = True
+            raise
+        return future
+
+
+class InferenceClient():
+    """ Pool of connections to inference server. Requests of many threads are sent over
+        the same connections without waiting for answers to previous requests.
+    """
+
+    def __init__(self, socket_path, connections=4, timeout=None):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._connections = [None] * connections
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self._next = itertools.count()
+
+    def _get_connection(self):
+        i = next(self._next) % len(self._connections)
+        with self._lock:
+            connection = self._connections[i]
+            if connection is None or connection.closed:
+                connection = self._connections[i] = _Connection(self.socket_path)
+        return connection
+
+    def call(self, method, *args, **kwargs):
+        future = self._get_connection().send(next(self._ids), {'method': method, 'args': args, 'kwargs': kwargs})
+        response = future.result(timeout=self.timeout)
+        if 'error' in response:
+            raise Exception(response['error'])
+        return response['result']
+
+
+_client = None
+_client_lock = threading.Lock()
+# config of inference server is read once, because the client is requested on each prediction
+_server_config = None
+
+
+def get_inference_client():
+    """ Client of inference server, or None if predictions should be made in this process """
+    global _client, _server_config
+    if is_server_process:
+        return None
+    if _client is not None:
+        return _client
+    if _server_config is None:
+        _server_config = Config().get('inference_server', {})
+    server_config = _server_config
+    if not server_config.get('enabled', False):
+        return None
+    with _client_lock:
+        if _client is None:
+            _client = InferenceClient(
+                get_socket_path(),
+                connections=server_config.get('connections', 4),
+                timeout=server_config.get('timeout')
+            )
+    return _client
+
+
+def run_inference_server():
+    global is_server_process
+    is_server_process = True
+    from mindsdb.interfaces.model.model_interface import ModelInterface
+    model_controller = ModelInterface()
+    model_controller.start_warm_up()
+    server_config = Config().get('inference_server', {})
+    InferenceServer(model_controller, get_socket_path(), server_config.get('workers', 8)).serve_forever()
+
+
+class InferenceServerProcess(ctx.Process):
+    # daemonic processes are not allowed to have children, and parallel prediction starts workers pool
+    daemon = False
+
+    def __init__(self, *args):
+        super(InferenceServerProcess, self).__init__(args=args)
+
+    def run(self):
+        run_inference_server(*self._args)
@@ -16,13 +16,19 @@ from lightwood import __version__ as lightwood_version
 from mindsdb import __version__ as mindsdb_version
 import mindsdb.interfaces.storage.db as db
 from mindsdb.interfaces.database.database import DatabaseWrapper
+from mindsdb.interfaces.database.registration_ledger import RegistrationLedger
 from mindsdb.interfaces.model.model_interface import ModelInterface
+from mindsdb.interfaces.model import code_cache
+from mindsdb.interfaces.model import predictor_analysis
+from mindsdb.interfaces.model.prediction_cache import PredictionCache
 from mindsdb.interfaces.storage.db import session, Predictor, Datasource
 from mindsdb.interfaces.datastore.datastore import DataStore
-from mindsdb.interfaces.storage.fs import FsStore
+from mindsdb.interfaces.datastore.chunked_reader import read_training_data, get_sample, get_df, delete_spilled
+from mindsdb.interfaces.storage.artifacts import ArtifactStore
 from mindsdb.utilities.config import Config
 from mindsdb.utilities.functions import mark_process
 from mindsdb.utilities.log import log
+from mindsdb.utilities.metrics import metrics
 from mindsdb.utilities.with_kwargs_wrapper import WithKWArgsWrapper
 
 
@@ -86,8 +92,11 @@ def brack_to_mod(ovr):
     return ovr
 
 @mark_process(name='learn')
+@metrics.timed('learn.run_generate')
 def run_generate(df: DataFrame, problem_definition: ProblemDefinition, predictor_id: int, json_ai_override: dict = None) -> int:
-    json_ai = lightwood.json_ai_from_problem(df, problem_definition)
+    # for spilled data json-ai is generated from the sample
+    with metrics.timer('learn.json_ai'):
+        json_ai = lightwood.json_ai_from_problem(get_sample(df), problem_definition)
     if json_ai_override is None:
         json_ai_override = {}
 
@@ -97,7 +106,8 @@ def run_generate(df: DataFrame, problem_definition: ProblemDefinition, predictor
 
     json_ai = JsonAI.from_dict(json_ai)
 
-    code = lightwood.code_from_json_ai(json_ai)
+    with metrics.timer('learn.code'):
+        code = code_cache.code_from_json_ai(json_ai)
 
     predictor_record = Predictor.query.with_for_update().get(predictor_id)
     predictor_record.json_ai = json_ai.to_dict()
@@ -106,30 +116,38 @@ def run_generate(df: DataFrame, problem_definition: ProblemDefinition, predictor
 
 
 @mark_process(name='learn')
+@metrics.timed('learn.run_fit')
 def run_fit(predictor_id: int, df: pd.DataFrame) -> None:
     try:
         predictor_record = Predictor.query.with_for_update().get(predictor_id)
         assert predictor_record is not None
 
-        fs_store = FsStore()
+        artifact_store = ArtifactStore()
         config = Config()
 
         predictor_record.data = {'training_log': 'training'}
         session.commit()
-        predictor: lightwood.PredictorInterface = lightwood.predictor_from_code(predictor_record.code)
-        predictor.learn(df)
+        predictor: lightwood.PredictorInterface = code_cache.predictor_from_code(predictor_record.code)
+        try:
+            with metrics.timer('learn.fit'):
+                predictor.learn(get_df(df))
+        finally:
+            delete_spilled(df)
 
         session.refresh(predictor_record)
 
         fs_name = f'predictor_{predictor_record.company_id}_{predictor_record.id}'
         pickle_path = os.path.join(config['paths']['predictors'], fs_name)
-        predictor.save(pickle_path)
+        with metrics.timer('learn.save'):
+            predictor.save(pickle_path)
 
-        fs_store.put(fs_name, fs_name, config['paths']['predictors'])
+        with metrics.timer('learn.artifact_put'):
+            artifact_store.put(fs_name, config['paths']['predictors'])
 
-        predictor_record.data = predictor.model_analysis.to_dict()
+        predictor_analysis.save_analysis(predictor_record, predictor.model_analysis.to_dict())
         predictor_record.dtype_dict = predictor.dtype_dict
         session.commit()
+        PredictionCache().invalidate(predictor_record.company_id, predictor_record.id)
 
         dbw = DatabaseWrapper(predictor_record.company_id)
         mi = WithKWArgsWrapper(ModelInterface(), company_id=predictor_record.company_id)
@@ -140,7 +158,7 @@ def run_fit(predictor_id: int, df: pd.DataFrame) -> None:
         raise e
 
     try:
-        dbw.register_predictors([mi.get_model_data(predictor_record.name)])
+        RegistrationLedger(predictor_record.company_id).register(dbw, [mi.get_model_data(predictor_record.name, with_analysis=False)])
     except Exception as e:
         log.warn(e)
 
@@ -154,6 +172,7 @@ def run_learn(df: DataFrame, problem_definition: ProblemDefinition, predictor_id
         run_generate(df, problem_definition, predictor_id, json_ai_override)
         run_fit(predictor_id, df)
     except Exception as e:
+        delete_spilled(df)
         predictor_record = Predictor.query.with_for_update().get(predictor_id)
         if delete_ds_on_fail is True:
             linked_db_ds = Datasource.query.filter_by(id=predictor_record.datasource_id).first()
@@ -174,13 +193,15 @@ def run_adjust(name, db_name, from_data, datasource_id, company_id):
 
 
 @mark_process(name='learn')
+@metrics.timed('learn.run_update')
 def run_update(name: str, company_id: int):
     original_name = name
     name = f'{company_id}@@@@@{name}'
 
-    fs_store = FsStore()
+    artifact_store = ArtifactStore()
     config = Config()
     data_store = WithKWArgsWrapper(DataStore(), company_id=company_id)
+    data = None
 
     try:
         predictor_record = Predictor.query.filter_by(company_id=company_id, name=original_name).first()
@@ -190,7 +211,8 @@ def run_update(name: str, company_id: int):
 
         session.commit()
         ds = data_store.get_datasource_obj(None, raw=False, id=predictor_record.datasource_id)
-        df = ds.df
+        with metrics.timer('learn.read_data'):
+            data = read_training_data(ds, config['paths']['tmp'])
 
         problem_definition = predictor_record.learn_args
 
@@ -206,28 +228,36 @@ def run_update(name: str, company_id: int):
         if 'stop_training_in_x_seconds' in problem_definition:
             problem_definition['time_aim'] = problem_definition['stop_training_in_x_seconds']
 
-        json_ai = lightwood.json_ai_from_problem(df, problem_definition)
+        json_ai = lightwood.json_ai_from_problem(get_sample(data), problem_definition)
         predictor_record.json_ai = json_ai.to_dict()
-        predictor_record.code = lightwood.code_from_json_ai(json_ai)
+        predictor_record.code = code_cache.code_from_json_ai(json_ai)
         predictor_record.data = {'training_log': 'training'}
         session.commit()
-        predictor: lightwood.PredictorInterface = lightwood.predictor_from_code(predictor_record.code)
-        predictor.learn(df)
+        predictor: lightwood.PredictorInterface = code_cache.predictor_from_code(predictor_record.code)
+        try:
+            with metrics.timer('learn.fit'):
+                predictor.learn(get_df(data))
+        finally:
+            delete_spilled(data)
 
         fs_name = f'predictor_{predictor_record.company_id}_{predictor_record.id}'
         pickle_path = os.path.join(config['paths']['predictors'], fs_name)
-        predictor.save(pickle_path)
-        fs_store.put(fs_name, fs_name, config['paths']['predictors'])
-        predictor_record.data = predictor.model_analysis.to_dict()  # type: ignore
+        with metrics.timer('learn.save'):
+            predictor.save(pickle_path)
+        with metrics.timer('learn.artifact_put'):
+            artifact_store.put(fs_name, config['paths']['predictors'])
+        predictor_analysis.save_analysis(predictor_record, predictor.model_analysis.to_dict())  # type: ignore
         session.commit()
 
         predictor_record.lightwood_version = lightwood_version
         predictor_record.mindsdb_version = mindsdb_version
         predictor_record.update_status = 'up_to_date'
         session.commit()
+        PredictionCache().invalidate(predictor_record.company_id, predictor_record.id)
 
     except Exception as e:
         log.error(e)
+        delete_spilled(data)
         predictor_record.update_status = 'update_failed'  # type: ignore
         session.commit()
         return str(e)
@@ -250,7 +280,10 @@ class GenerateProcess(ctx.Process):
         super(GenerateProcess, self).__init__(args=args)
 
     def run(self):
-        run_generate(*self._args)
+        try:
+            run_generate(*self._args)
+        finally:
+            delete_spilled(self._args[0])
 
 
 class FitProcess(ctx.Process):
@@ -4,10 +4,10 @@ import time
 import json
 import psutil
 import datetime
-from copy import deepcopy
+import threading
 from contextlib import contextmanager
 from dateutil.parser import parse as parse_datetime
-from typing import Optional, Tuple, Union, Dict, Any
+from typing import Optional, Tuple, Union, Dict, Any, List, Set
 
 import lightwood
 from lightwood.api.types import ProblemDefinition
@@ -16,38 +16,204 @@ import numpy as np
 import pandas as pd
 from pandas.core.frame import DataFrame
 import mindsdb_datasources
+from sqlalchemy import func
 
 from mindsdb import __version__ as mindsdb_version
 import mindsdb.interfaces.storage.db as db
 from mindsdb.utilities.functions import mark_process
 from mindsdb.interfaces.database.database import DatabaseWrapper
+from mindsdb.interfaces.database.registration_ledger import RegistrationLedger
 from mindsdb.utilities.config import Config
-from mindsdb.interfaces.storage.fs import FsStore
+from mindsdb.interfaces.storage.artifacts import ArtifactStore
 from mindsdb.utilities.log import log
+from mindsdb.utilities.metrics import metrics
+from mindsdb.interfaces.model.prediction_cache import PredictionCache
+from mindsdb.interfaces.model.predictor_usage import PredictorUsage
+from mindsdb.interfaces.model.ts_window_cache import TsWindowCache
+from mindsdb.interfaces.model import code_cache
+from mindsdb.interfaces.model import predictor_analysis
+from mindsdb.interfaces.model.parallel_predict import ParallelPredictor, get_workers_count
+from mindsdb.interfaces.model.inference_server import get_inference_client
+from mindsdb.interfaces.model.batch_predict import BatchPredictJob, BatchPredictProcess
 from mindsdb.interfaces.model.learn_process import LearnProcess, GenerateProcess, FitProcess, UpdateProcess
 from mindsdb.interfaces.datastore.datastore import DataStore
-from mindsdb.interfaces.datastore.datastore import QueryDS
+from mindsdb.interfaces.datastore.chunked_reader import (
+    make_datasource,
+    get_integration_from_data,
+    read_training_data,
+    iter_chunks,
+    count_rows,
+    ReservoirSampler,
+    SpilledDataFrame,
+    DEFAULT_SAMPLE_SIZE
+)
 
 IS_PY36 = sys.version_info[1] <= 6
+FORMATTED_PRED_FORMATS = ('explain', 'dict', 'dict&explain')
+# fields of explanation and columns of lightwood predictions they are taken from
+EXPLAIN_FIELDS = {
+    'confidence': 'confidence',
+    'anomaly': 'anomaly',
+    'truth': 'truth',
+    'confidence_lower_bound': 'lower',
+    'confidence_upper_bound': 'upper'
+}
+# predictors are not kept in memory if less than that is available
+MIN_AVAILABLE_MEMORY = 1.2 * pow(10, 9)
+# how often predictors of company are checked for changes, in seconds
+VERSION_CHECK_INTERVAL = 1
 
 
 class ModelController():
     config: Config
-    fs_store: FsStore
+    artifact_store: ArtifactStore
     predictor_cache: Dict[str, Dict[str, Union[Any]]]
+    prediction_cache: PredictionCache
+    predictor_usage: PredictorUsage
+    warm_up_status: Dict[str, Any]
     ray_based: bool
+    # set in API processes, so the controller which serves the API starts warm-up on creation
+    warm_up_on_init: bool = False
 
     def __init__(self, ray_based: bool) -> None:
         self.config = Config()
-        self.fs_store = FsStore()
+        self.artifact_store = ArtifactStore()
         self.predictor_cache = {}
+        self.prediction_cache = PredictionCache()
+        self.predictor_usage = PredictorUsage()
+        self.ts_window_cache = TsWindowCache(self.config.get('ts_window_cache', {}).get('max_groups', 10000))
+        self.warm_up_status = {'status': 'not_started', 'loaded': 0, 'total': 0}
+        self._warm_up_lock = threading.Lock()
+        # guards changes of predictor_cache, which is filled by API threads and by warm-up
+        self._predictor_cache_lock = threading.Lock()
+        self.company_versions = {}
         self.ray_based = ray_based
+        if ModelController.warm_up_on_init:
+            # only the first controller of the process
+            ModelController.warm_up_on_init = False
+            self.start_warm_up()
 
     def _invalidate_cached_predictors(self) -> None:
         # @TODO: Cache will become stale if the respective ModelInterface is not invoked yet a bunch of predictors remained cached, no matter where we invoke it. In practice shouldn't be a big issue though
-        for predictor_name in list(self.predictor_cache.keys()):
-            if (datetime.datetime.now() - self.predictor_cache[predictor_name]['created']).total_seconds() > 1200:
-                del self.predictor_cache[predictor_name]
+        for predictor_name, record in list(self.predictor_cache.items()):
+            if (datetime.datetime.now() - record['created']).total_seconds() > 1200:
+                self._uncache_predictor(predictor_name)
+
+    def _uncache_predictor(self, name: str) -> None:
+        with self._predictor_cache_lock:
+            record = self.predictor_cache.pop(name, None)
+        if record is not None and record.get('parallel') is not None:
+            record['parallel'].close()
+
+    def _get_predictor(self, name: str, rows_count: int, is_timeseries: bool):
+        """ Cached predictor, or, if enabled in config, pool of processes with the predictor if input is big enough.
+            Timeseries predictors are never parallel, because result for a row depends on other rows of its group.
+        """
+        record = self.predictor_cache[name]
+        parallel_config = self.config.get('parallel_predict', {})
+        if (
+            not parallel_config.get('enabled', False)
+            or is_timeseries
+            or rows_count < parallel_config.get('min_rows', 100000)
+        ):
+            return record['predictor']
+        # several API threads may predict with the predictor at same time, only one creates the pool
+        with record['lock']:
+            if record.get('parallel') is None:
+                workers = get_workers_count(record['pickle'], parallel_config.get('workers'))
+                if workers < 2:
+                    # not enough memory or cpu for the pool
+                    return record['predictor']
+                record['parallel'] = ParallelPredictor(record['pickle'], record['code'], workers)
+        return record['parallel']
+
+    def _load_predictor(self, name: str, predictor_record) -> dict:
+        fs_name = f'predictor_{predictor_record.company_id}_{predictor_record.id}'
+        with metrics.timer('predict.artifact_get'):
+            self.artifact_store.get(fs_name, self.config['paths']['predictors'])
+        with metrics.timer('predict.deserialize'):
+            predictor = code_cache.predictor_from_state(
+                os.path.join(self.config['paths']['predictors'], fs_name),
+                predictor_record.code
+            )
+        record = {
+            'predictor': predictor,
+            'updated_at': predictor_record.updated_at,
+            'created': datetime.datetime.now(),
+            'code': predictor_record.code,
+            'pickle': str(os.path.join(self.config['paths']['predictors'], fs_name)),
+            'parallel': None,
+            'lock': threading.Lock(),
+            'predictor_id': predictor_record.id,
+            'target': predictor_record.to_predict[0],
+            'timeseries_settings': (predictor_record.learn_args or {}).get('timeseries_settings') or {},
+            'is_timeseries': ((predictor_record.learn_args or {}).get('timeseries_settings') or {}).get('is_timeseries', False),
+            # version of company predictors at the moment the entry was checked to be current
+            'version': None
+        }
+        with self._predictor_cache_lock:
+            replaced = self.predictor_cache.get(name)
+            if replaced is not None and replaced['updated_at'] == record['updated_at']:
+                # same predictor was loaded by other thread meanwhile
+                return replaced
+            self.predictor_cache[name] = record
+        if replaced is not None and replaced.get('parallel') is not None:
+            replaced['parallel'].close()
+        return record
+
+    def start_warm_up(self) -> None:
+        """ Load most used predictors to the cache in background, so first predictions after start are fast """
+        warm_up_config = self.config.get('warm_up', {})
+        if get_inference_client() is not None:
+            # predictors are loaded by inference server
+            return
+        if self.ray_based or not warm_up_config.get('enabled', True):
+            self.warm_up_status['status'] = 'disabled'
+            return
+        with self._warm_up_lock:
+            if self.warm_up_status['status'] != 'not_started':
+                return
+            self.warm_up_status['status'] = 'running'
+        threading.Thread(
+            target=self._warm_up,
+            args=(warm_up_config.get('predictors', 10), ),
+            name='predictors_warm_up',
+            daemon=True
+        ).start()
+
+    def _warm_up(self, limit: int) -> None:
+        try:
+            hot = self.predictor_usage.get_hot(limit)
+            self.warm_up_status['total'] = len(hot)
+            for company_id, predictor_id in hot:
+                if psutil.virtual_memory().available < MIN_AVAILABLE_MEMORY:
+                    log.warning('Predictors warm-up is stopped: not enough memory')
+                    break
+                predictor_record = db.session.query(db.Predictor).filter_by(company_id=company_id, id=predictor_id).first()
+                if predictor_record is None:
+                    self.predictor_usage.forget(company_id, predictor_id)
+                    continue
+                name = f'{company_id}@@@@@{predictor_record.name}'
+                try:
+                    if (
+                        name not in self.predictor_cache
+                        and self._get_status(predictor_record) == 'complete'
+                    ):
+                        self._load_predictor(name, predictor_record)
+                    self.warm_up_status['loaded'] += 1
+                except Exception as e:
+                    log.warning(f'Predictor {predictor_record.name} is not loaded during warm-up: {e}')
+        except Exception as e:
+            log.error(f'Error during predictors warm-up: {e}')
+        finally:
+            self.warm_up_status['status'] = 'complete'
+            db.session.remove()
+
+    def get_warm_up_status(self) -> dict:
+        inference_client = get_inference_client()
+        if inference_client is not None:
+            return inference_client.call('get_warm_up_status')
+        return dict(self.warm_up_status, ready=self.warm_up_status['status'] in ('complete', 'disabled'))
 
     def _lock_predictor(self, id: int, mode: str) -> None:
         from mindsdb.interfaces.storage.db import session, Semaphor
@@ -63,7 +229,9 @@ class ModelController():
                 session.commit()
                 return True
             except Exception:
-                pass
+                # predictor is locked by other process (unique index of semaphor), the failed insert
+                # must be rolled back, otherwise each next query of the session fails
+                session.rollback()
             time.sleep(1)
 
     def _unlock_predictor(self, id: int) -> None:
@@ -81,17 +249,17 @@ class ModelController():
         finally:
             self._unlock_predictor(id)
 
-    def _get_from_data_df(self, from_data: dict) -> DataFrame:
-        if from_data['class'] == 'QueryDS':
-            ds = QueryDS(*from_data['args'], **from_data['kwargs'])
-        else:
-            ds_cls = getattr(mindsdb_datasources, from_data['class'])
-            ds = ds_cls(*from_data['args'], **from_data['kwargs'])
-        return ds.df
+    def _get_from_data_ds(self, from_data: dict):
+        return make_datasource(from_data)
+
+    def _get_from_data_df(self, from_data: dict) -> Union[DataFrame, SpilledDataFrame]:
+        """ Big datasources are not loaded in memory, but spilled to disk with sample kept in memory """
+        ds = self._get_from_data_ds(from_data)
+        return read_training_data(ds, self.config['paths']['tmp'])
 
     def _unpack_old_args(
         self, from_data: dict, kwargs: dict, to_predict: Optional[Union[str, list]] = None
-    ) -> Tuple[pd.DataFrame, ProblemDefinition, bool]:
+    ) -> Tuple[Union[DataFrame, SpilledDataFrame], ProblemDefinition, bool, dict]:
         problem_definition = kwargs or {}
         if isinstance(to_predict, str):
             problem_definition['target'] = to_predict
@@ -191,91 +359,133 @@ class ModelController():
         else:
             data['status'] = 'error'
 
-    @mark_process(name='predict')
-    def predict(self, name: str, when_data: Union[dict, list, pd.DataFrame], pred_format: str, company_id: int):
-        original_name = name
-        name = f'{company_id}@@@@@{name}'
-
-        predictor_record = db.session.query(db.Predictor).filter_by(company_id=company_id, name=original_name).first()
+    def _get_company_version(self, company_id: int) -> tuple:
+        """ Stamp which is changed if any predictor of the company is added, changed or deleted.
+            It is queried not more often than once in VERSION_CHECK_INTERVAL seconds.
+        """
+        record = self.company_versions.get(company_id)
+        now = time.monotonic()
+        if record is None or now - record['checked_at'] > VERSION_CHECK_INTERVAL:
+            with metrics.timer('predict.version_check'):
+                stamp = db.session.query(
+                    func.max(db.Predictor.updated_at), func.count(db.Predictor.id)
+                ).filter_by(company_id=company_id).first()
+            record = {'stamp': tuple(stamp), 'checked_at': now}
+            self.company_versions[company_id] = record
+        return record['stamp']
+
+    def _check_cached_predictor(self, name: str, original_name: str, company_id: int, version: tuple) -> dict:
+        """ Load predictor to the cache, or reload it if it was changed. Returns the cache entry """
+        with metrics.timer('predict.db_lookup'):
+            predictor_record = db.session.query(db.Predictor).filter_by(company_id=company_id, name=original_name).first()
         assert predictor_record is not None
-        predictor_data = self.get_model_data(name, company_id)
-        fs_name = f'predictor_{company_id}_{predictor_record.id}'
 
-        if (
-            name in self.predictor_cache
-            and self.predictor_cache[name]['updated_at'] != predictor_record.updated_at
-        ):
-            del self.predictor_cache[name]
+        cached = self.predictor_cache.get(name)
+        if cached is not None and cached['updated_at'] != predictor_record.updated_at:
+            self._uncache_predictor(name)
+            self.ts_window_cache.invalidate(name)
+            cached = None
 
-        if name not in self.predictor_cache:
+        if cached is not None:
+            metrics.inc('predictor_cache_hits')
+        else:
+            metrics.inc('predictor_cache_misses')
             # Clear the cache entirely if we have less than 1.2 GB left
-            if psutil.virtual_memory().available < 1.2 * pow(10, 9):
-                self.predictor_cache = {}
-
-            if predictor_data['status'] == 'complete':
-                self.fs_store.get(fs_name, fs_name, self.config['paths']['predictors'])
-                self.predictor_cache[name] = {
-                    'predictor': lightwood.predictor_from_state(
-                        os.path.join(self.config['paths']['predictors'], fs_name),
-                        predictor_record.code
-                    ),
-                    'updated_at': predictor_record.updated_at,
-                    'created': datetime.datetime.now(),
-                    'code': predictor_record.code,
-                    'pickle': str(os.path.join(self.config['paths']['predictors'], fs_name))
-                }
+            if psutil.virtual_memory().available < MIN_AVAILABLE_MEMORY:
+                for predictor_name in list(self.predictor_cache.keys()):
+                    self._uncache_predictor(predictor_name)
+
+            status = self._get_status(predictor_record)
+            if status == 'complete':
+                cached = self._load_predictor(name, predictor_record)
             else:
                 raise Exception(
-                    f'Trying to predict using predictor {original_name} with status: {predictor_data["status"]}. Error is: {predictor_data.get("error", "unknown")}'
+                    f'Trying to predict using predictor {original_name} with status: {status}. Error is: {(predictor_record.data or {}).get("error", "unknown")}'
+                )
+
+        cached['version'] = version
+        return cached
+
+    @mark_process(name='predict')
+    def predict(self, name: str, when_data: Union[dict, list, pd.DataFrame], pred_format: str, company_id: int,
+                columns: Optional[List[str]] = None, incremental: bool = False):
+        """ Make predictions
+
+            Args:
+                columns (list): fields which are needed by the caller, None means all fields. Names of
+                    EXPLAIN_FIELDS select fields of explanation, other names select columns of input data
+                    in 'dict' part of result. 'predicted_value' is always returned.
+                incremental (bool): for timeseries predictor: when_data contains only new rows of groups,
+                    history is taken from rows passed in previous calls. Predictions are returned for new rows only,
+                    in order of rows of when_data. History of groups is moved only if prediction succeeded.
+        """
+        inference_client = get_inference_client()
+        if inference_client is not None:
+            try:
+                return inference_client.call(
+                    'predict', name, when_data, pred_format, company_id=company_id, columns=columns,
+                    incremental=incremental
                 )
+            except OSError as e:
+                log.warning(f'Inference server is not available, predicting in this process: {e}')
 
+        original_name = name
+        name = f'{company_id}@@@@@{name}'
+
+        version = self._get_company_version(company_id)
+        cached = self.predictor_cache.get(name)
+        if cached is not None and cached['version'] == version:
+            # no predictor of the company was changed since the entry was checked
+            metrics.inc('predictor_cache_hits')
+        else:
+            cached = self._check_cached_predictor(name, original_name, company_id, version)
+
+        use_cache = False
+        is_timeseries = cached['is_timeseries']
         if isinstance(when_data, dict) and 'kwargs' in when_data and 'args' in when_data:
             ds_cls = getattr(mindsdb_datasources, when_data['class'])
             df = ds_cls(*when_data['args'], **when_data['kwargs']).df
         else:
             if isinstance(when_data, dict):
                 when_data = [when_data]
-            df = pd.DataFrame(when_data)
+            with metrics.timer('predict.build_df'):
+                df = pd.DataFrame(when_data)
+            # result for a row depends on other rows in case of timeseries
+            use_cache = (
+                self.prediction_cache.enabled
+                and pred_format in FORMATTED_PRED_FORMATS
+                and not is_timeseries
+            )
 
-        predictions = self.predictor_cache[name]['predictor'].predict(df)
-        predictions = predictions.to_dict(orient='records')
+        new_positions = None
+        if incremental and is_timeseries:
+            tss = cached['timeseries_settings']
+            if tss.get('window') is None:
+                raise Exception(f"Predictor {original_name} has no 'window' in timeseries settings, incremental predictions are not possible")
+            df, new_positions, new_tails = self.ts_window_cache.extend(
+                name, cached['updated_at'], df, tss['order_by'], tss.get('group_by') or [], tss['window']
+            )
+
+        self.predictor_usage.record(company_id, cached['predictor_id'])
+        predictor = self._get_predictor(name, len(df), is_timeseries)
+        target = cached['target']
+        if columns is not None:
+            columns = set(columns)
+        if use_cache:
+            rows = self._predict_rows_cached(
+                predictor, df, target, pred_format, company_id, cached['predictor_id'], cached['updated_at'], columns
+            )
+        else:
+            rows = self._predict_rows(predictor, df, target, pred_format, columns, new_positions)
+        if new_positions is not None:
+            # window is moved only if rows were predicted
+            self.ts_window_cache.update(new_tails)
         # Bellow is useful for debugging caching and storage issues
         # del self.predictor_cache[name]
 
-        target = predictor_record.to_predict[0]
-        if pred_format in ('explain', 'dict', 'dict&explain'):
-            explain_arr = []
-            dict_arr = []
-            for i, row in enumerate(predictions):
-                obj = {
-                    target: {
-                        'predicted_value': row['prediction'],
-                        'confidence': row.get('confidence', None),
-                        'anomaly': row.get('anomaly', None),
-                        'truth': row.get('truth', None)
-                    }
-                }
-                if 'lower' in row:
-                    obj[target]['confidence_lower_bound'] = row.get('lower', None)
-                    obj[target]['confidence_upper_bound'] = row.get('upper', None)
-                    
-                explain_arr.append(obj)
-
-                td = {'predicted_value': row['prediction']}
-                for col in df.columns:
-                    if col in row:
-                        td[col] = row[col]
-                    elif f'order_{col}' in row:
-                        td[col] = row[f'order_{col}']
-                    elif f'group_{col}' in row:
-                        td[col] = row[f'group_{col}']
-                    else:
-                        orginal_index = row.get('original_index')
-                        if orginal_index is None:
-                            log.warning('original_index is None')
-                            orginal_index = i
-                        td[col] = df.iloc[orginal_index][col]
-                dict_arr.append({target: td})
+        if pred_format in FORMATTED_PRED_FORMATS:
+            dict_arr = [x[0] for x in rows]
+            explain_arr = [x[1] for x in rows]
             if pred_format == 'explain':
                 return explain_arr
             elif pred_format == 'dict':
@@ -284,16 +494,262 @@ class ModelController():
                 return dict_arr, explain_arr
         # New format -- Try switching to this in 2-3 months for speed, for now above is ok
         else:
-            return predictions
+            return rows
+
+    def _predict_rows(self, predictor, df: DataFrame, target: str, pred_format: str,
+                      columns: Optional[Set[str]] = None, positions: Optional[List[int]] = None) -> list:
+        """ Run the predictor. For formatted pred_format returns pair [dict, explain] for each row.
+            If positions is set, only rows of df at these positions are returned, in order of positions.
+        """
+        with metrics.timer('predict.inference'):
+            predictions = predictor.predict(df)
+        if positions is not None:
+            if 'original_index' in predictions.columns:
+                predictions = predictions.set_index('original_index', drop=False).loc[positions].reset_index(drop=True)
+            else:
+                predictions = predictions.iloc[positions]
+        with metrics.timer('predict.format'):
+            return self._format_rows(predictions, df, target, pred_format, columns)
+
+    def _format_rows(self, predictions: DataFrame, df: DataFrame, target: str, pred_format: str,
+                     columns: Optional[Set[str]] = None) -> list:
+        """ Convert predictions to rows. Part of result which is not returned for pred_format, and fields
+            which are not in columns, are not built at all.
+        """
+        if pred_format not in FORMATTED_PRED_FORMATS:
+            return predictions.to_dict(orient='records')
+
+        build_explain = pred_format != 'dict'
+        build_dict = pred_format != 'explain'
+        explain_fields = {
+            k: v for k, v in EXPLAIN_FIELDS.items()
+            if (columns is None or k in columns) and (v in predictions.columns or k in ('confidence', 'anomaly', 'truth'))
+        }
+        if not build_explain:
+            explain_fields = {}
+        input_columns = [x for x in df.columns if columns is None or x in columns] if build_dict else []
+
+        # explain fields which are not requested are not converted to python objects
+        predictions = predictions[[
+            x for x in predictions.columns
+            if x not in EXPLAIN_FIELDS.values() or x in explain_fields.values()
+        ]].to_dict(orient='records')
+
+        rows = []
+        for i, row in enumerate(predictions):
+            obj = None
+            if build_explain:
+                obj = {target: {'predicted_value': row['prediction']}}
+                for field, col in explain_fields.items():
+                    obj[target][field] = row.get(col, None)
+
+            if not build_dict:
+                rows.append([None, obj])
+                continue
+
+            td = {'predicted_value': row['prediction']}
+            for col in input_columns:
+                if col in row:
+                    td[col] = row[col]
+                elif f'order_{col}' in row:
+                    td[col] = row[f'order_{col}']
+                elif f'group_{col}' in row:
+                    td[col] = row[f'group_{col}']
+                else:
+                    orginal_index = row.get('original_index')
+                    if orginal_index is None:
+                        log.warning('original_index is None')
+                        orginal_index = i
+                    td[col] = df.iloc[orginal_index][col]
+            rows.append([{target: td}, obj])
+        return rows
+
+    def _predict_rows_cached(self, predictor, df: DataFrame, target: str, pred_format: str,
+                             company_id: int, predictor_id: int, updated_at, columns: Optional[Set[str]] = None) -> list:
+        # rows with part of fields are cached separately from full rows
+        cache_format = pred_format if columns is None else f"{pred_format}:{','.join(sorted(columns))}"
+        with metrics.timer('predict.cache_get'):
+            keys = self.prediction_cache.get_keys(
+                company_id, predictor_id, updated_at, cache_format, df.to_dict(orient='records')
+            )
+            rows = self.prediction_cache.get_many(keys)
+        missed = [i for i, x in enumerate(rows) if x is None]
+        metrics.inc('prediction_cache_hits', len(rows) - len(missed))
+        metrics.inc('prediction_cache_misses', len(missed))
+        if len(missed) > 0:
+            missed_df = df.iloc[missed].reset_index(drop=True)
+            predicted_rows = self._predict_rows(predictor, missed_df, target, pred_format, columns)
+            for i, row in zip(missed, predicted_rows):
+                rows[i] = row
+            with metrics.timer('predict.cache_put'):
+                self.prediction_cache.put_many([keys[i] for i in missed], predicted_rows)
+        return rows
 
     @mark_process(name='analyse')
-    def analyse_dataset(self, ds: dict, company_id: int) -> lightwood.DataAnalysis:
-        ds_cls = getattr(mindsdb_datasources, ds['class'])
-        df = ds_cls(*ds['args'], **ds['kwargs']).df
-        analysis = lightwood.analyze_dataset(df)
-        return analysis.to_dict()  # type: ignore
+    def analyse_dataset(self, ds: dict, company_id: int, datasource_id: Optional[int] = None) -> dict:
+        """ Analyse a sample of the datasource.
 
-    def get_model_data(self, name, company_id: int):
+            If the datasource is saved (it is found by datasource_id or by creation_info equal to ds),
+            the result is stored in Datasource.analysis together with version of datasource content,
+            and reused while the version is same. If rows were only appended to SQL datasource,
+            just new rows are read to update the sample.
+        """
+        ds_obj = self._get_from_data_ds(ds)
+        datasource_record = self._find_datasource_record(ds, company_id, datasource_id)
+        if datasource_record is not None:
+            datasource_id = datasource_record.id
+
+        if datasource_record is None:
+            sampler = self._sample_datasource(ds_obj)
+            return lightwood.analyze_dataset(sampler.sample).to_dict()  # type: ignore
+
+        content_version = {
+            'created_at': str(datasource_record.created_at),
+            'rows_count': count_rows(ds_obj)
+        }
+
+        cached_analysis = None
+        if datasource_record.analysis is not None:
+            try:
+                cached_analysis = json.loads(datasource_record.analysis)
+            except Exception:
+                pass
+        if isinstance(cached_analysis, dict) and cached_analysis.get('content_version') == content_version:
+            del cached_analysis['content_version']
+            return cached_analysis
+
+        sampler_path = self._analysis_sample_path(company_id, datasource_id)
+        sampler = None
+        if (
+            isinstance(cached_analysis, dict)
+            and isinstance(cached_analysis.get('content_version'), dict)
+            and cached_analysis['content_version'].get('created_at') == content_version['created_at']
+            and cached_analysis['content_version'].get('rows_count') is not None
+            and content_version['rows_count'] is not None
+            and cached_analysis['content_version']['rows_count'] < content_version['rows_count']
+            and os.path.isfile(sampler_path)
+        ):
+            # rows were appended: update the sample only with new rows
+            try:
+                sampler = pd.read_pickle(sampler_path)
+                for chunk in iter_chunks(ds_obj, offset=sampler.seen):
+                    sampler.add(chunk)
+            except Exception as e:
+                log.warning(f'Can not update analysis sample incrementally: {e}')
+                sampler = None
+
+        if sampler is None:
+            sampler = self._sample_datasource(ds_obj)
+            self._delete_orphan_analysis_samples(company_id)
+        os.makedirs(os.path.dirname(sampler_path), exist_ok=True)
+        pd.to_pickle(sampler, sampler_path)
+
+        analysis = lightwood.analyze_dataset(sampler.sample).to_dict()  # type: ignore
+        datasource_record.analysis = json.dumps(dict(analysis, content_version=content_version), default=str)
+        db.session.commit()
+        return analysis
+
+    @staticmethod
+    def _find_datasource_record(ds: dict, company_id: int, datasource_id: Optional[int] = None):
+        if datasource_id is not None:
+            return db.session.query(db.Datasource).filter_by(company_id=company_id, id=datasource_id).first()
+        records = db.session.query(db.Datasource.id, db.Datasource.creation_info).filter_by(company_id=company_id)
+        for record_id, creation_info in records:
+            try:
+                if json.loads(creation_info) == ds:
+                    return db.session.query(db.Datasource).get(record_id)
+            except Exception:
+                continue
+        return None
+
+    def _analysis_sample_path(self, company_id: int, datasource_id: int) -> str:
+        return os.path.join(self.config['paths']['cache'], 'analysis_samples', str(company_id), f'{datasource_id}.pickle')
+
+    def _delete_orphan_analysis_samples(self, company_id: int) -> None:
+        """ Delete samples of datasources which were deleted, DataStore.delete_datasource does not know about them.
+            Samples of each company are in own directory, file names are ids of datasources.
+        """
+        samples_dir = os.path.dirname(self._analysis_sample_path(company_id, 0))
+        if not os.path.isdir(samples_dir):
+            return
+        datasource_ids = set(
+            str(x[0]) for x in db.session.query(db.Datasource.id).filter_by(company_id=company_id)
+        )
+        for file_name in os.listdir(samples_dir):
+            if file_name[:-len('.pickle')] not in datasource_ids:
+                try:
+                    os.remove(os.path.join(samples_dir, file_name))
+                except OSError:
+                    pass
+
+    def _sample_datasource(self, ds) -> ReservoirSampler:
+        sampler = ReservoirSampler(self.config.get('analysis_sample_size', DEFAULT_SAMPLE_SIZE))
+        for chunk in iter_chunks(ds):
+            sampler.add(chunk)
+        return sampler
+
+    def start_batch_predict(self, name: str, from_data: Optional[dict] = None, output_format: str = 'parquet',
+                            workers: Optional[int] = None, integration: Optional[str] = None,
+                            query: Optional[str] = None, company_id: int = None) -> dict:
+        """ Start job which predicts whole datasource by chunks in pool of processes
+            and writes results as parquet or arrow files to paths['storage'].
+            Instead of datasource, query to integration may be passed, its result is read by pages.
+        """
+        predictor_record = db.session.query(db.Predictor).filter_by(company_id=company_id, name=name).first()
+        if predictor_record is None:
+            raise Exception(f"Predictor '{name}' does not exist")
+        if from_data is None:
+            from mindsdb.interfaces.database.integrations import DatasourceController
+            integration_data = DatasourceController().get_db_integration(integration, company_id, sensitive_info=True)
+            if not integration_data:
+                raise Exception(f"Integration '{integration}' does not exist")
+            from_data = get_integration_from_data(integration_data, query)
+            if from_data is None:
+                raise Exception(
+                    f"Queries to '{integration_data.get('type')}' integration can not be read by pages, "
+                    "create datasource from the query to predict it"
+                )
+        job = BatchPredictJob.create(name, from_data, output_format, workers, company_id)
+        BatchPredictProcess(job.job_id, company_id).start()
+        return job.status()
+
+    def resume_batch_predict(self, job_id: str, company_id: int = None) -> dict:
+        """ Restart failed or interrupted job, already written parts are not predicted again """
+        job = BatchPredictJob(job_id, company_id)
+        if not job.exists():
+            raise Exception(f"Batch prediction job '{job_id}' does not exist")
+        if job.load()['status'] == 'complete':
+            raise Exception(f"Batch prediction job '{job_id}' is already complete")
+        if job.is_running():
+            raise Exception(f"Batch prediction job '{job_id}' is already running")
+        BatchPredictProcess(job_id, company_id).start()
+        return job.status()
+
+    def get_batch_predict(self, job_id: str, company_id: int = None) -> dict:
+        job = BatchPredictJob(job_id, company_id)
+        if not job.exists():
+            raise Exception(f"Batch prediction job '{job_id}' does not exist")
+        return job.status()
+
+    @staticmethod
+    def _get_status(predictor_record) -> str:
+        # assume older models are complete, only temporary
+        if predictor_record.data is not None and 'error' in predictor_record.data:
+            return 'error'
+        elif predictor_record.update_status == 'available':
+            return 'complete'
+        elif predictor_record.json_ai is None and predictor_record.code is None:
+            return 'generating'
+        elif predictor_record.data is None:
+            return 'editable'
+        elif 'training_log' in predictor_record.data:
+            return 'training'
+        return 'complete'
+
+    def get_model_data(self, name, company_id: int, with_analysis: bool = True):
+        """ Data of the predictor. Model analysis (histograms, column importances, etc) is kept in separate
+            table and is loaded only if with_analysis, without it only summary of analysis is returned.
+        """
         if '@@@@@' in name:
             sn = name.split('@@@@@')
             assert len(sn) < 3  # security
@@ -307,7 +763,13 @@ class ModelController():
 
         linked_db_ds = db.session.query(db.Datasource).filter_by(company_id=company_id, id=predictor_record.datasource_id).first()
 
-        data = deepcopy(predictor_record.data)
+        # only top-level keys are changed, so a shallow copy keeps the record unchanged
+        data = dict(predictor_record.data or {})
+        data['status'] = self._get_status(predictor_record)
+        if with_analysis and data['status'] == 'complete':
+            analysis = predictor_analysis.get_analysis(predictor_record.id)
+            if analysis is not None:
+                data.update(analysis)
         data['dtype_dict'] = predictor_record.dtype_dict
         data['created_at'] = str(parse_datetime(str(predictor_record.created_at).split('.')[0]))
         data['updated_at'] = str(parse_datetime(str(predictor_record.updated_at).split('.')[0]))
@@ -320,22 +782,6 @@ class ModelController():
         data['data_source_name'] = linked_db_ds.name if linked_db_ds else None
         data['problem_definition'] = predictor_record.learn_args
 
-        # assume older models are complete, only temporary
-        if 'error' in predictor_record.data:
-            data['status'] = 'error'
-        elif predictor_record.update_status == 'available':
-            data['status'] = 'complete'
-        elif predictor_record.json_ai is None and predictor_record.code is None:
-            data['status'] = 'generating'
-        elif predictor_record.data is None:
-            data['status'] = 'editable'
-        elif 'training_log' in predictor_record.data:
-            data['status'] = 'training'
-        elif 'error' not in predictor_record.data:
-            data['status'] = 'complete'
-        else:
-            data['status'] = 'error'
-
         if data.get('accuracies', None) is not None:
             if len(data['accuracies']) > 0:
                 data['accuracy'] = float(np.mean(list(data['accuracies'].values())))
@@ -364,7 +810,7 @@ class ModelController():
     def get_models(self, company_id: int):
         models = []
         for db_p in db.session.query(db.Predictor).filter_by(company_id=company_id):
-            model_data = self.get_model_data(db_p.name, company_id=company_id)
+            model_data = self.get_model_data(db_p.name, company_id=company_id, with_analysis=False)
             reduced_model_data = {}
 
             for k in ['name', 'version', 'is_active', 'predict', 'status',
@@ -392,6 +838,7 @@ class ModelController():
         db_p = db.session.query(db.Predictor).filter_by(company_id=company_id, name=original_name).first()
         if db_p is None:
             raise Exception(f"Predictor '{name}' does not exist")
+        predictor_analysis.delete_analysis(db_p.id)
         db.session.delete(db_p)
         if db_p.datasource_id is not None:
             try:
@@ -401,14 +848,22 @@ class ModelController():
                     and json.loads(dataset_record.data).get('source_type') != 'file'
                 ):
                     DataStore().delete_datasource(dataset_record.name, company_id)
+                    sample_path = self._analysis_sample_path(company_id, dataset_record.id)
+                    if os.path.isfile(sample_path):
+                        os.remove(sample_path)
             except Exception:
                 pass
         db.session.commit()
+        if name in self.predictor_cache:
+            self._uncache_predictor(name)
+        self.ts_window_cache.invalidate(name)
 
-        DatabaseWrapper(company_id).unregister_predictor(name)
+        RegistrationLedger(company_id).unregister(DatabaseWrapper(company_id), name)
 
         # delete from s3
-        self.fs_store.delete(f'predictor_{company_id}_{db_p.id}')
+        self.artifact_store.delete(f'predictor_{company_id}_{db_p.id}')
+        self.prediction_cache.invalidate(company_id, db_p.id)
+        self.predictor_usage.forget(company_id, db_p.id)
 
         return 0
 
@@ -416,9 +871,13 @@ class ModelController():
         db_p = db.session.query(db.Predictor).filter_by(company_id=company_id, name=old_name).first()
         db_p.name = new_name
         db.session.commit()
+        if f'{company_id}@@@@@{old_name}' in self.predictor_cache:
+            self._uncache_predictor(f'{company_id}@@@@@{old_name}')
+        self.ts_window_cache.invalidate(f'{company_id}@@@@@{old_name}')
         dbw = DatabaseWrapper(company_id)
-        dbw.unregister_predictor(old_name)
-        dbw.register_predictors([self.get_model_data(new_name, company_id)])
+        ledger = RegistrationLedger(company_id)
+        ledger.unregister(dbw, old_name)
+        ledger.register(dbw, [self.get_model_data(new_name, company_id, with_analysis=False)])
 
     @mark_process(name='learn')
     def update_model(self, name: str, company_id: int):
@@ -471,13 +930,13 @@ class ModelController():
         assert predictor_record is not None
 
         json_ai = lightwood.JsonAI.from_dict(json_ai)
-        predictor_record.code = lightwood.code_from_json_ai(json_ai)   
+        predictor_record.code = code_cache.code_from_json_ai(json_ai)
         predictor_record.json_ai = json_ai.to_dict()
         db.session.commit()
 
     def code_from_json_ai(self, json_ai: dict, company_id=None):
         json_ai = lightwood.JsonAI.from_dict(json_ai)
-        code = lightwood.code_from_json_ai(json_ai)
+        code = code_cache.code_from_json_ai(json_ai)
         return code
 
     def edit_code(self, name: str, code: str, company_id=None):
@@ -488,7 +947,7 @@ class ModelController():
         predictor_record = db.session.query(db.Predictor).filter_by(company_id=company_id, name=name).first()
         assert predictor_record is not None
 
-        lightwood.predictor_from_code(code)
+        code_cache.predictor_from_code(code)
         predictor_record.code = code
         predictor_record.json_ai = None
         db.session.commit()
@@ -0,0 +1,101 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import psutil
+import numpy as np
+import pandas as pd
+from pandas.core.frame import DataFrame
+import torch.multiprocessing as mp
+
+from mindsdb.interfaces.model import code_cache
+from mindsdb.utilities.log import log
+
+
+ctx = mp.get_context('spawn')
+
+# default count of workers is not more than this, each worker holds a copy of the predictor
+MAX_DEFAULT_WORKERS = 4
+# memory of worker process without predictor: interpreter, torch, lightwood
+WORKER_BASE_MEMORY = 512 * 1024 * 1024
+
+# predictor loaded in the worker process by init_worker
+_worker_predictor = None
+
+
+def get_workers_count(pickle_path: str, workers: int = None) -> int:
+    """ Count of workers, reduced so copies of predictor fit into available memory.
+        Unpickled predictor takes more memory than its pickle, twice the size of pickle is assumed.
+    """
+    workers = workers or min(MAX_DEFAULT_WORKERS, os.cpu_count())
+    worker_memory = WORKER_BASE_MEMORY + 2 * os.path.getsize(pickle_path)
+    return max(min(workers, int(psutil.virtual_memory().available // worker_memory)), 1)
+
+
+def init_worker(pickle_path: str, code: str) -> None:
+    global _worker_predictor
+    _worker_predictor = code_cache.predictor_from_state(pickle_path, code)
+
+
+def predict_shard(df: DataFrame, offset: int = 0) -> DataFrame:
+    predictions = _worker_predictor.predict(df.reset_index(drop=True))
+    if 'original_index' in predictions.columns:
+        # index of row in whole input, not in the shard
+        predictions['original_index'] = predictions['original_index'] + offset
+    return predictions
+
+
+class ParallelPredictor():
+    """ Pool of processes with loaded predictor. Input is split in shards which are predicted
+        in parallel, results are concatenated in order of the input.
+        If a worker dies (e.g. killed by OOM killer), the pool is broken: it is recreated
+        and the input is predicted once again.
+    """
+
+    def __init__(self, pickle_path: str, code: str, workers: int = None):
+        self.pickle_path = pickle_path
+        self.code = code
+        self.workers = get_workers_count(pickle_path, workers)
+        self._lock = threading.Lock()
+        self.executor = self._make_executor()
+
+    def _make_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=ctx,
+            initializer=init_worker,
+            initargs=(self.pickle_path, self.code)
+        )
+
+    def _recreate(self, broken: ProcessPoolExecutor) -> None:
+        with self._lock:
+            # other thread may have recreated it already
+            if self.executor is broken:
+                broken.shutdown(wait=False)
+                self.executor = self._make_executor()
+
+    def _predict(self, executor: ProcessPoolExecutor, df: DataFrame) -> DataFrame:
+        bounds = np.linspace(0, len(df), self.workers + 1, dtype=int)
+        futures = [
+            executor.submit(predict_shard, df.iloc[start:end], start)
+            for start, end in zip(bounds[:-1], bounds[1:]) if end > start
+        ]
+        return pd.concat([x.result() for x in futures], ignore_index=True)
+
+    def predict(self, df: DataFrame) -> DataFrame:
+        executor = self.executor
+        try:
+            return self._predict(executor, df)
+        except BrokenProcessPool as e:
+            log.warning(f'Pool of predictor workers is broken, it is recreated: {e}')
+            self._recreate(executor)
+        executor = self.executor
+        try:
+            return self._predict(executor, df)
+        except BrokenProcessPool:
+            self._recreate(executor)
+            raise
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=False)
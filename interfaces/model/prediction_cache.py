@@ -0,0 +1,152 @@
+import time
+import json
+import pickle
+import hashlib
+import threading
+from collections import OrderedDict
+
+from mindsdb.utilities.config import Config
+from mindsdb.utilities.log import log
+
+# same prefix as Cache('predictions') would use
+REDIS_PREFIX = 'predictions_'
+# sorted set of all cached keys by time of writing, it bounds size of the cache in redis
+REDIS_INDEX = 'predictions__index'
+
+
+class PredictionCache():
+    """ Per-row cache of predictions.
+
+        Row key consists of company_id, predictor id, predictor updated_at, pred_format and hash of input row,
+        so results of a predictor are never returned after it was retrained.
+        Entries are expired after 'ttl' seconds, and if there is more than 'max_size' entries,
+        oldest entries are removed. In redis expiration is done by EXPIRE of each key,
+        and size is bounded by sorted set of keys, so no operation scans the whole keyspace.
+        With 'local' cache type entries are kept in memory of each process, in LRU order.
+
+        Values are stored pickled, so a hit returns same types as the prediction which was cached,
+        and cached rows can not be changed through returned ones.
+        The cache is best-effort: any error of the cache backend is treated as a miss.
+    """
+
+    def __init__(self):
+        config = Config()
+        cache_config = config['cache'].get('predictions', {})
+        self.enabled = cache_config.get('enabled', False)
+        self.ttl = cache_config.get('ttl', 3600)
+        self.max_size = cache_config.get('max_size', 100000)
+        self.is_redis = config['cache']['type'] == 'redis'
+        self._lock = threading.Lock()
+        # key -> (expires_at, pickled value)
+        self._local = OrderedDict()
+        self._redis = None
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            import walrus
+            self._redis = walrus.Database(**Config()['cache']['params'])
+        return self._redis
+
+    @staticmethod
+    def _hash_row(row):
+        return hashlib.sha1(json.dumps(row, sort_keys=True, default=str).encode('utf8')).hexdigest()
+
+    @staticmethod
+    def _predictor_prefix(company_id, predictor_id):
+        return f'{company_id}:{predictor_id}:'
+
+    def get_keys(self, company_id, predictor_id, updated_at, pred_format, rows):
+        prefix = f'{self._predictor_prefix(company_id, predictor_id)}{updated_at}:{pred_format}:'
+        return [prefix + self._hash_row(row) for row in rows]
+
+    def get_many(self, keys):
+        """ Returns list of cached values, None for missed keys """
+        try:
+            if self.is_redis:
+                raw = self.redis.mget([REDIS_PREFIX + key for key in keys])
+            else:
+                raw = self._get_many_local(keys)
+            return [None if x is None else pickle.loads(x) for x in raw]
+        except Exception as e:
+            log.warning(f'Error while reading predictions cache: {e}')
+            return [None] * len(keys)
+
+    def _get_many_local(self, keys):
+        now = time.time()
+        raw = []
+        with self._lock:
+            for key in keys:
+                record = self._local.get(key)
+                if record is None:
+                    raw.append(None)
+                elif record[0] <= now:
+                    del self._local[key]
+                    raw.append(None)
+                else:
+                    self._local.move_to_end(key)
+                    raw.append(record[1])
+        return raw
+
+    def put_many(self, keys, values):
+        try:
+            values = [pickle.dumps(x, protocol=pickle.HIGHEST_PROTOCOL) for x in values]
+            if self.is_redis:
+                self._put_many_redis(keys, values)
+            else:
+                self._put_many_local(keys, values)
+        except Exception as e:
+            log.warning(f'Error while writing predictions cache: {e}')
+
+    def _put_many_local(self, keys, values):
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            for key, value in zip(keys, values):
+                self._local[key] = (expires_at, value)
+                self._local.move_to_end(key)
+            while len(self._local) > self.max_size:
+                self._local.popitem(last=False)
+
+    def _put_many_redis(self, keys, values):
+        now = time.time()
+        redis_keys = [REDIS_PREFIX + key for key in keys]
+        pipe = self.redis.pipeline(transaction=False)
+        for key, value in zip(redis_keys, values):
+            pipe.set(key, value, ex=self.ttl)
+        pipe.zadd(REDIS_INDEX, {key: now for key in redis_keys})
+        # keys which are already expired by redis
+        pipe.zremrangebyscore(REDIS_INDEX, '-inf', now - self.ttl)
+        pipe.zcard(REDIS_INDEX)
+        size = pipe.execute()[-1]
+        if size <= self.max_size:
+            return
+        # free 10% more than needed, so eviction does not happen on each write
+        oldest = self.redis.zrange(REDIS_INDEX, 0, size - int(self.max_size * 0.9) - 1)
+        if len(oldest) > 0:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.delete(*oldest)
+            pipe.zrem(REDIS_INDEX, *oldest)
+            pipe.execute()
+
+    def invalidate(self, company_id, predictor_id):
+        """ Remove all entries of predictor, should be called after predictor is retrained or deleted.
+            Local entries are removed only in the calling process, in other ones they expire by ttl.
+        """
+        if not self.enabled:
+            return
+        prefix = self._predictor_prefix(company_id, predictor_id)
+        try:
+            if self.is_redis:
+                # SCAN does not block redis as KEYS does, and invalidation happens only on retrain or delete
+                keys = list(self.redis.scan_iter(match=f'{REDIS_PREFIX}{prefix}*', count=1000))
+                for i in range(0, len(keys), 1000):
+                    pipe = self.redis.pipeline(transaction=False)
+                    pipe.delete(*keys[i:i + 1000])
+                    pipe.zrem(REDIS_INDEX, *keys[i:i + 1000])
+                    pipe.execute()
+                return
+            with self._lock:
+                for key in [x for x in self._local if x.startswith(prefix)]:
+                    del self._local[key]
+        except Exception as e:
+            log.warning(f'Error while invalidating predictions cache: {e}')
@@ -0,0 +1,42 @@
+from typing import Optional
+
+from sqlalchemy import Column, Integer, ForeignKey
+
+from mindsdb.interfaces.storage.db import session, Base, Json
+
+# fields of analysis which are kept in predictor.data, because they are shown in the list of predictors
+SUMMARY_FIELDS = ('accuracies', )
+
+
+class PredictorAnalysis(Base):
+    """ Model analysis of trained predictor (histograms, confusion matrix, column importances).
+
+        It is big, so it is kept out of the predictor row and loaded only when description
+        of the predictor is requested, not by lists, status checks and predictions.
+        The table belongs with other models in interfaces/storage/db.py; while it is declared here,
+        this module must be imported before metadata of db is used (create_all, alembic autogenerate).
+    """
+    __tablename__ = 'predictor_analysis'
+
+    id = Column(Integer, primary_key=True)
+    predictor_id = Column(Integer, ForeignKey('predictor.id', ondelete='CASCADE'), nullable=False, unique=True)
+    data = Column(Json)
+
+
+def save_analysis(predictor_record, analysis: dict) -> None:
+    """ Store analysis of predictor, and its summary in predictor_record.data. Caller commits the session """
+    record = session.query(PredictorAnalysis).filter_by(predictor_id=predictor_record.id).first()
+    if record is None:
+        record = PredictorAnalysis(predictor_id=predictor_record.id)
+        session.add(record)
+    record.data = analysis
+    predictor_record.data = {k: analysis[k] for k in SUMMARY_FIELDS if k in analysis}
+
+
+def get_analysis(predictor_id: int) -> Optional[dict]:
+    return session.query(PredictorAnalysis.data).filter_by(predictor_id=predictor_id).scalar()
+
+
+def delete_analysis(predictor_id: int) -> None:
+    # foreign keys are not enforced by sqlite, so analysis is deleted explicitly
+    session.query(PredictorAnalysis).filter_by(predictor_id=predictor_id).delete()
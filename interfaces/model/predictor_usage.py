@@ -0,0 +1,114 @@
+import time
+import atexit
+import weakref
+import threading
+
+from mindsdb.utilities.cache import Cache
+from mindsdb.utilities.log import log
+
+# usage is written to the cache not more often than once in FLUSH_INTERVAL seconds
+FLUSH_INTERVAL = 60
+# weight of predictor usage halves every USAGE_HALF_LIFE seconds
+USAGE_HALF_LIFE = 7 * 24 * 60 * 60
+
+
+# instances which are flushed at exit, atexit handler is registered once per process
+_instances = weakref.WeakSet()
+
+
+def _flush_all():
+    for usage in list(_instances):
+        usage.flush()
+
+
+atexit.register(_flush_all)
+
+
+class PredictorUsage():
+    """ Persistent statistic of predictors usage, used to choose predictors for warm-up.
+
+        Record of each predictor is stored by key '{company_id}:{predictor_id}':
+            {
+                'count': count of predict calls,
+                'last_used': timestamp of last predict call
+            }
+        Calls are counted in memory and added to the stored records periodically, so
+        several API processes may share the cache.
+    """
+    _lock = threading.Lock()
+
+    def __init__(self):
+        self._cache = None
+        self._pending = {}
+        self._last_flush = time.time()
+        _instances.add(self)
+
+    @property
+    def cache(self):
+        if self._cache is None:
+            self._cache = Cache('predictors_usage')
+        return self._cache
+
+    @staticmethod
+    def _key(company_id, predictor_id):
+        return f'{company_id}:{predictor_id}'
+
+    def record(self, company_id, predictor_id):
+        key = self._key(company_id, predictor_id)
+        with self._lock:
+            pending = self._pending.setdefault(key, {'count': 0, 'last_used': 0})
+            pending['count'] += 1
+            pending['last_used'] = time.time()
+        if time.time() - self._last_flush > FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.time()
+            if len(pending) == 0:
+                return
+            try:
+                with self.cache as cache:
+                    for key, usage in pending.items():
+                        try:
+                            record = cache[key]
+                        except KeyError:
+                            record = {'count': 0, 'last_used': 0}
+                        record['count'] += usage['count']
+                        record['last_used'] = max(record['last_used'], usage['last_used'])
+                        cache[key] = record
+            except Exception as e:
+                log.debug(f'Error while writing predictors usage: {e}')
+
+    def forget(self, company_id, predictor_id):
+        key = self._key(company_id, predictor_id)
+        with self._lock:
+            self._pending.pop(key, None)
+            try:
+                with self.cache as cache:
+                    del cache[key]
+            except Exception:
+                pass
+
+    def get_hot(self, limit):
+        """ Predictors ordered by count of calls weighted by recency of last call
+
+            Returns:
+                list of (company_id, predictor_id)
+        """
+        now = time.time()
+        scores = {}
+        with self._lock:
+            try:
+                with self.cache as cache:
+                    for key in list(cache):
+                        record = cache[key]
+                        scores[key] = record['count'] * 0.5 ** ((now - record['last_used']) / USAGE_HALF_LIFE)
+            except Exception as e:
+                log.debug(f'Error while reading predictors usage: {e}')
+        result = []
+        for key in sorted(scores, key=scores.get, reverse=True)[:limit]:
+            company_id, predictor_id = key.split(':')
+            result.append((None if company_id == 'None' else int(company_id), int(predictor_id)))
+        return result
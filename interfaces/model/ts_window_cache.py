@@ -0,0 +1,82 @@
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+from pandas.core.frame import DataFrame
+
+DEFAULT_MAX_GROUPS = 10000
+# temporary column with position of new row in input, -1 for rows of cached tails
+NEW_ROW_POSITION = '__mindsdb_new_row_position'
+
+
+class TsWindowCache():
+    """ Last rows of each group of timeseries, which were passed to predict earlier.
+
+        In incremental mode client sends only new rows of groups, and they are predicted together
+        with cached tail of the group, so history is not sent and encoded again on each call.
+        Entries are keyed by predictor key, version of predictor and values of group_by columns,
+        so tails of previous version are never used, and they should be invalidated when predictor is changed.
+        Tails do not depend on loaded predictor object, so they are kept when predictor is removed from
+        predictors cache. If there are more than max_groups entries, least recently used are removed.
+        Tails are kept in memory of the process: if several processes serve predictions (e.g. workers
+        of http API), each of them has own tails, so incremental clients should use the inference server,
+        or send rows of a group to the same process.
+    """
+
+    def __init__(self, max_groups=DEFAULT_MAX_GROUPS):
+        self.max_groups = max_groups
+        self._lock = threading.Lock()
+        self._tails = OrderedDict()
+
+    def extend(self, predictor_key, version, df: DataFrame, order_by: list, group_by: list, window: int):
+        """ Add cached tails to new rows. Cached tails are not changed, new tails are returned
+            and should be passed to update() after successful prediction.
+
+            Returns:
+                DataFrame: tails of groups and new rows, sorted by groups and order
+                list: positions of new rows in that DataFrame, in order of rows of df
+                dict: new tails of groups
+        """
+        df = df.assign(**{NEW_ROW_POSITION: range(len(df))})
+        parts = []
+        new_tails = {}
+        if len(group_by) > 0:
+            groups = df.groupby(group_by, sort=False, dropna=False)
+        else:
+            groups = [((), df)]
+        for group_key, new_rows in groups:
+            if not isinstance(group_key, tuple):
+                group_key = (group_key, )
+            key = (predictor_key, version, group_key)
+            with self._lock:
+                tail = self._tails.get(key)
+                if tail is not None:
+                    self._tails.move_to_end(key)
+            if tail is not None:
+                # if new rows repeat rows of the tail, new values win
+                tail = tail[~tail[order_by].apply(tuple, axis=1).isin(new_rows[order_by].apply(tuple, axis=1))]
+                parts.append(tail.assign(**{NEW_ROW_POSITION: -1}))
+            parts.append(new_rows)
+
+            new_rows = new_rows.drop(columns=[NEW_ROW_POSITION])
+            combined = new_rows if tail is None else pd.concat([tail, new_rows], ignore_index=True)
+            new_tails[key] = combined.sort_values(order_by, kind='stable').tail(window).reset_index(drop=True)
+
+        data = pd.concat(parts, ignore_index=True)
+        data = data.sort_values(group_by + order_by, kind='stable').reset_index(drop=True)
+        new_positions = list(data[data[NEW_ROW_POSITION] >= 0].sort_values(NEW_ROW_POSITION).index)
+        return data.drop(columns=[NEW_ROW_POSITION]), new_positions, new_tails
+
+    def update(self, new_tails: dict):
+        """ Store tails returned by extend() """
+        with self._lock:
+            for key, tail in new_tails.items():
+                self._tails[key] = tail
+                self._tails.move_to_end(key)
+            while len(self._tails) > self.max_groups:
+                self._tails.popitem(last=False)
+
+    def invalidate(self, predictor_key):
+        with self._lock:
+            for key in [x for x in self._tails if x[0] == predictor_key]:
+                del self._tails[key]
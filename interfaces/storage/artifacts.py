@@ -0,0 +1,430 @@
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from mindsdb.interfaces.storage.fs import FsStore
+from mindsdb.utilities.config import Config
+from mindsdb.utilities.log import log
+
+
+def _is_not_found(e: Exception) -> bool:
+    if isinstance(e, FileNotFoundError):
+        return True
+    # ClientError of s3 permanent storage
+    response = getattr(e, 'response', None)
+    if isinstance(response, dict):
+        return str(response.get('Error', {}).get('Code')) in ('404', 'NoSuchKey', 'NotFound')
+    return False
+
+
+class LocalDirBackend():
+    """ Remote storage of artifacts in local directory. Used if 'artifacts.remote_dir' is set,
+        for example in tests or with shared network directory.
+        Blobs are shared by all artifacts, scope of artifact is not used.
+    """
+    scoped_blobs = False
+
+    def __init__(self, path):
+        self.blobs_dir = os.path.join(path, 'blobs')
+        self.manifests_dir = os.path.join(path, 'manifests')
+        os.makedirs(self.blobs_dir, exist_ok=True)
+        os.makedirs(self.manifests_dir, exist_ok=True)
+
+    def has_blob(self, sha, scope):
+        return os.path.isfile(os.path.join(self.blobs_dir, sha))
+
+    def put_blob(self, sha, src_path, scope):
+        dst_path = os.path.join(self.blobs_dir, sha)
+        shutil.copyfile(src_path, f'{dst_path}.tmp')
+        os.replace(f'{dst_path}.tmp', dst_path)
+
+    def get_blob(self, sha, dst_path, scope):
+        shutil.copyfile(os.path.join(self.blobs_dir, sha), dst_path)
+
+    def delete_blob(self, sha, scope):
+        try:
+            os.remove(os.path.join(self.blobs_dir, sha))
+        except FileNotFoundError:
+            pass
+
+    def get_manifest(self, name):
+        try:
+            with open(os.path.join(self.manifests_dir, f'{name}.json'), 'rt') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def put_manifest(self, name, manifest):
+        path = os.path.join(self.manifests_dir, f'{name}.json')
+        with open(f'{path}.tmp', 'wt') as f:
+            json.dump(manifest, f)
+        os.replace(f'{path}.tmp', path)
+
+    def delete_manifest(self, name):
+        try:
+            os.remove(os.path.join(self.manifests_dir, f'{name}.json'))
+        except FileNotFoundError:
+            pass
+
+    def list_manifests(self, scope):
+        return [x[:-len('.json')] for x in os.listdir(self.manifests_dir) if x.endswith('.json')]
+
+    def get_legacy(self, name, base_dir):
+        raise Exception(f"Artifact '{name}' does not exist")
+
+    def delete_legacy(self, name):
+        pass
+
+
+class FsStoreBackend():
+    """ Remote storage of artifacts in permanent storage, each blob and manifest is a separate FsStore object.
+
+        FsStore can not check existence of objects or list them, so blobs are shared only by artifacts
+        of one scope (predictors of one company), and manifests of the scope are listed by predictors in db.
+        Blobs of manifests written before scopes were introduced are not scoped and never deleted.
+    """
+    scoped_blobs = True
+
+    def __init__(self):
+        self.staging_dir = os.path.join(Config()['paths']['tmp'], 'artifacts')
+        os.makedirs(self.staging_dir, exist_ok=True)
+
+    @staticmethod
+    def _blob_name(sha, scope):
+        if scope is None:
+            return f'blob_{sha}'
+        return f'blob_{scope}_{sha}'
+
+    def has_blob(self, sha, scope):
+        # known blobs are skipped by ArtifactStore
+        return False
+
+    def _put(self, remote_name, src_path):
+        staging = tempfile.mkdtemp(dir=self.staging_dir)
+        try:
+            os.link(src_path, os.path.join(staging, remote_name))
+        except OSError:
+            shutil.copyfile(src_path, os.path.join(staging, remote_name))
+        try:
+            FsStore().put(remote_name, remote_name, staging)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def _get(self, remote_name, dst_path):
+        staging = tempfile.mkdtemp(dir=self.staging_dir)
+        try:
+            FsStore().get(remote_name, remote_name, staging)
+            shutil.move(os.path.join(staging, remote_name), dst_path)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def put_blob(self, sha, src_path, scope):
+        self._put(self._blob_name(sha, scope), src_path)
+
+    def get_blob(self, sha, dst_path, scope):
+        self._get(self._blob_name(sha, scope), dst_path)
+
+    def delete_blob(self, sha, scope):
+        FsStore().delete(self._blob_name(sha, scope))
+
+    def get_manifest(self, name):
+        fd, path = tempfile.mkstemp(dir=self.staging_dir)
+        os.close(fd)
+        try:
+            self._get(f'manifest_{name}', path)
+            with open(path, 'rt') as f:
+                return json.load(f)
+        except Exception as e:
+            if _is_not_found(e):
+                return None
+            raise
+        finally:
+            if os.path.isfile(path):
+                os.remove(path)
+
+    def put_manifest(self, name, manifest):
+        fd, path = tempfile.mkstemp(dir=self.staging_dir)
+        try:
+            with os.fdopen(fd, 'wt') as f:
+                json.dump(manifest, f)
+            self._put(f'manifest_{name}', path)
+        finally:
+            os.remove(path)
+
+    def delete_manifest(self, name):
+        FsStore().delete(f'manifest_{name}')
+
+    def list_manifests(self, scope):
+        """ Names of predictor artifacts of the company of scope 'predictor_{company_id}' """
+        from mindsdb.interfaces.storage.db import session, Predictor
+        company_id = scope[len('predictor_'):]
+        company_id = None if company_id == 'None' else int(company_id)
+        return [
+            f'{scope}_{x[0]}' for x in session.query(Predictor.id).filter_by(company_id=company_id)
+        ]
+
+    def get_legacy(self, name, base_dir):
+        # artifact saved before content addressing was introduced
+        FsStore().get(name, name, base_dir)
+
+    def delete_legacy(self, name):
+        FsStore().delete(name)
+
+
+def get_backend():
+    config = Config()
+    remote_dir = config.get('artifacts', {}).get('remote_dir')
+    if remote_dir is not None:
+        return LocalDirBackend(remote_dir)
+    if config['permanent_storage']['location'] == 'local':
+        # files in paths are the permanent copy
+        return None
+    return FsStoreBackend()
+
+
+class ArtifactStore():
+    """ Content-addressed storage of artifacts (predictor files).
+
+        Artifact is split in parts of 'part_size' bytes, each part is stored as blob named by its sha256,
+        so parts which are same in several versions of artifact are uploaded and stored only once.
+        List of parts is stored in manifest of artifact.
+
+        Blobs are cached in paths['cache']/artifacts, and the cache is limited by 'cache_size' bytes,
+        least recently used blobs are removed first. Artifact file is not downloaded again
+        if hash of local copy is same as in manifest.
+
+        Blob of remote storage is deleted when no manifest references it. Artifacts are named
+        '{scope}_{id}', and blobs are shared only inside of the scope if backend can not list all manifests.
+        Writing and deleting of manifests is done under a file lock, so a blob which is about
+        to be referenced by new manifest is not deleted by other process.
+    """
+    _lock = threading.Lock()
+    _remote_lock = threading.Lock()
+
+    def __init__(self, backend=None):
+        config = Config()
+        artifacts_config = config.get('artifacts', {})
+        self.backend = backend if backend is not None else get_backend()
+        self.part_size = artifacts_config.get('part_size', 64 * 1024 * 1024)
+        self.cache_size = artifacts_config.get('cache_size', 10 * 1024 * 1024 * 1024)
+        self.workers = artifacts_config.get('workers', 4)
+        self.cache_dir = os.path.join(config['paths']['cache'], 'artifacts')
+        self.blobs_dir = os.path.join(self.cache_dir, 'blobs')
+        self.state_dir = os.path.join(self.cache_dir, 'state')
+        os.makedirs(self.blobs_dir, exist_ok=True)
+        os.makedirs(self.state_dir, exist_ok=True)
+
+    def _blob_path(self, sha):
+        return os.path.join(self.blobs_dir, sha)
+
+    @staticmethod
+    def _scope(name):
+        return name.rsplit('_', 1)[0]
+
+    @contextmanager
+    def _locked_remote(self):
+        with self._remote_lock:
+            if fcntl is None:
+                yield
+                return
+            with open(os.path.join(self.cache_dir, 'remote.lock'), 'a') as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _state_path(self, name):
+        return os.path.join(self.state_dir, f'{name}.json')
+
+    def _read_state(self, name):
+        try:
+            with open(self._state_path(name), 'rt') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _write_state(self, name, path, manifest):
+        stat = os.stat(path)
+        with open(self._state_path(name), 'wt') as f:
+            json.dump({'sha256': manifest['sha256'], 'size': stat.st_size, 'mtime': stat.st_mtime}, f)
+
+    def _is_current(self, name, path, manifest):
+        """ Local file is same as in manifest. File is not hashed again if it was not changed since it was written """
+        state = self._read_state(name)
+        if state is None or state['sha256'] != manifest['sha256'] or not os.path.isfile(path):
+            return False
+        stat = os.stat(path)
+        return stat.st_size == state['size'] and stat.st_mtime == state['mtime']
+
+    def _split(self, path):
+        """ Write parts of file to blobs cache, returns manifest of the file """
+        whole_hash = hashlib.sha256()
+        parts = []
+        size = 0
+        with open(path, 'rb') as f:
+            while True:
+                data = f.read(self.part_size)
+                if len(data) == 0:
+                    break
+                whole_hash.update(data)
+                sha = hashlib.sha256(data).hexdigest()
+                blob_path = self._blob_path(sha)
+                if not os.path.isfile(blob_path):
+                    with open(f'{blob_path}.tmp', 'wb') as blob:
+                        blob.write(data)
+                    os.replace(f'{blob_path}.tmp', blob_path)
+                parts.append({'sha256': sha, 'size': len(data)})
+                size += len(data)
+        return {'sha256': whole_hash.hexdigest(), 'size': size, 'parts': parts}
+
+    def _download_blob(self, sha, scope):
+        blob_path = self._blob_path(sha)
+        if os.path.isfile(blob_path):
+            return
+        tmp_path = f'{blob_path}.{threading.get_ident()}.tmp'
+        self.backend.get_blob(sha, tmp_path, scope)
+        with open(tmp_path, 'rb') as f:
+            if hashlib.sha256(f.read()).hexdigest() != sha:
+                os.remove(tmp_path)
+                raise Exception(f'Checksum mismatch of downloaded blob {sha}')
+        os.replace(tmp_path, blob_path)
+
+    def _touch(self, manifest):
+        for part in manifest['parts']:
+            try:
+                os.utime(self._blob_path(part['sha256']))
+            except FileNotFoundError:
+                pass
+
+    def _evict(self, keep):
+        with self._lock:
+            blobs = []
+            total_size = 0
+            for entry in os.scandir(self.blobs_dir):
+                if entry.name.endswith('.tmp'):
+                    continue
+                stat = entry.stat()
+                blobs.append((stat.st_mtime, entry.name, stat.st_size))
+                total_size += stat.st_size
+            for _, sha, size in sorted(blobs):
+                if total_size <= self.cache_size:
+                    break
+                if sha in keep:
+                    continue
+                try:
+                    os.remove(self._blob_path(sha))
+                except FileNotFoundError:
+                    pass
+                total_size -= size
+
+    def put(self, name, base_dir):
+        if self.backend is None:
+            return
+        path = os.path.join(base_dir, name)
+        manifest = self._split(path)
+        manifest['name'] = name
+        manifest['scope'] = self._scope(name)
+
+        with self._locked_remote():
+            previous = self.backend.get_manifest(name)
+            known = set()
+            if previous is not None and previous.get('scope') == manifest['scope']:
+                known = set(x['sha256'] for x in previous['parts'])
+            to_upload = set(
+                x['sha256'] for x in manifest['parts']
+                if x['sha256'] not in known and not self.backend.has_blob(x['sha256'], manifest['scope'])
+            )
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                futures = [
+                    executor.submit(self.backend.put_blob, sha, self._blob_path(sha), manifest['scope'])
+                    for sha in to_upload
+                ]
+                for future in futures:
+                    future.result()
+
+            # manifest is written last, so it never references missing blobs
+            self.backend.put_manifest(name, manifest)
+            if previous is not None:
+                self._delete_unused_blobs(previous, set(x['sha256'] for x in manifest['parts']))
+        self._write_state(name, path, manifest)
+        log.debug(f'Artifact {name}: {len(to_upload)} of {len(manifest["parts"])} parts uploaded')
+        self._evict(set(x['sha256'] for x in manifest['parts']))
+
+    def get(self, name, base_dir):
+        """ Make local copy of artifact current
+
+            Returns:
+                bool: True if local copy was changed
+        """
+        if self.backend is None:
+            return False
+        path = os.path.join(base_dir, name)
+        manifest = self.backend.get_manifest(name)
+        if manifest is None:
+            self.backend.get_legacy(name, base_dir)
+            return True
+        if self._is_current(name, path, manifest):
+            return False
+
+        keep = set(x['sha256'] for x in manifest['parts'])
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for future in [executor.submit(self._download_blob, sha, manifest.get('scope')) for sha in keep]:
+                future.result()
+
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            for part in manifest['parts']:
+                with open(self._blob_path(part['sha256']), 'rb') as blob:
+                    shutil.copyfileobj(blob, f)
+        os.replace(tmp_path, path)
+        self._write_state(name, path, manifest)
+        self._touch(manifest)
+        self._evict(keep)
+        return True
+
+    def delete(self, name):
+        try:
+            os.remove(self._state_path(name))
+        except FileNotFoundError:
+            pass
+        if self.backend is None:
+            return
+        with self._locked_remote():
+            manifest = self.backend.get_manifest(name)
+            if manifest is None:
+                self.backend.delete_legacy(name)
+                return
+            self.backend.delete_manifest(name)
+            self._delete_unused_blobs(manifest, set())
+
+    def _delete_unused_blobs(self, manifest, keep):
+        """ Delete blobs of manifest which are not in keep and are not referenced by other manifests.
+            Must be called under _locked_remote.
+        """
+        scope = manifest.get('scope')
+        if scope is None and self.backend.scoped_blobs:
+            # blobs written before scopes were introduced may be shared by artifacts of any scope
+            return
+        shas = set(x['sha256'] for x in manifest['parts']) - keep
+        if len(shas) == 0:
+            return
+        used = set()
+        for other_name in self.backend.list_manifests(scope):
+            if other_name == manifest['name']:
+                continue
+            other = self.backend.get_manifest(other_name)
+            if other is not None and (not self.backend.scoped_blobs or other.get('scope') == scope):
+                used.update(x['sha256'] for x in other['parts'])
+        for sha in shas - used:
+            self.backend.delete_blob(sha, scope)
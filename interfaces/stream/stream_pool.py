@@ -0,0 +1,380 @@
+import os
+import json
+import time
+import queue
+import bisect
+import signal
+import hashlib
+import threading
+
+import torch.multiprocessing as mp
+
+from mindsdb.utilities.config import Config, STOP_THREADS_EVENT
+from mindsdb.utilities.log import log
+
+ctx = mp.get_context('spawn')
+
+# how often streams are re-read from db and assignments are checked, in seconds
+REBALANCE_INTERVAL = 5
+# how long workers may drain their batches on shutdown, in seconds
+SHUTDOWN_TIMEOUT = 30
+# how often workers report status of their streams, in seconds
+STATUS_INTERVAL = 5
+# partitions of kafka topics are re-read not more often than once in PARTITIONS_REFRESH_INTERVAL seconds,
+# each read opens new connection to kafka
+PARTITIONS_REFRESH_INTERVAL = 300
+
+# {(type, name, connection_info): (time of read, partitions)}
+_partitions_cache = {}
+
+
+def _hash(key: str) -> int:
+    return int(hashlib.md5(key.encode('utf8')).hexdigest()[:16], 16)
+
+
+class HashRing():
+    """ Consistent hash ring: when a node is added or removed, only keys of that node move """
+
+    def __init__(self, nodes=(), replicas=64):
+        self.replicas = replicas
+        self._points = []
+        self._nodes = {}
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node):
+        for i in range(self.replicas):
+            point = _hash(f'{node}#{i}')
+            bisect.insort(self._points, point)
+            self._nodes[point] = node
+
+    def remove(self, node):
+        for i in range(self.replicas):
+            point = _hash(f'{node}#{i}')
+            self._points.remove(point)
+            del self._nodes[point]
+
+    def get(self, key: str):
+        if len(self._points) == 0:
+            return None
+        i = bisect.bisect(self._points, _hash(key)) % len(self._points)
+        return self._nodes[self._points[i]]
+
+
+def _get_partitions(stream_type: str, name: str, connection_info):
+    from mindsdb.interfaces.stream.streams import get_partitions
+    key = (stream_type, name, json.dumps(connection_info, sort_keys=True, default=str))
+    cached = _partitions_cache.get(key)
+    if cached is not None and time.time() - cached[0] < PARTITIONS_REFRESH_INTERVAL:
+        return cached[1]
+    partitions = get_partitions(stream_type, name, connection_info)
+    _partitions_cache[key] = (time.time(), partitions)
+    return partitions
+
+
+def get_stream_units(stream_record, integration: dict) -> dict:
+    """ Units of a stream which are processed independently: whole stream, or each partition of
+        partitioned (kafka) input. Records of timeseries should be sent to partition by their group key
+        (it is default partitioner of kafka for keyed records), so a group is always predicted by one worker.
+
+        Returns:
+            dict: {unit key: params of unit for the worker}
+    """
+    stream_type = stream_record.type if stream_record.type not in (None, 'unknown') else integration.get('type')
+    connection_info = stream_record.connection_info or integration.get('connection')
+    params = {
+        'stream_id': stream_record.id,
+        'name': stream_record.name,
+        'type': stream_type,
+        'connection_info': connection_info,
+        'stream_in': stream_record.stream_in,
+        'stream_out': stream_record.stream_out,
+        'anomaly_stream': stream_record.anomaly_stream,
+        'predictor': stream_record.predictor,
+        'company_id': stream_record.company_id,
+        'updated_at': str(stream_record.updated_at),
+        'partitions': None
+    }
+    partitions = _get_partitions(stream_type, stream_record.stream_in, connection_info)
+    if partitions is None:
+        return {str(stream_record.id): params}
+    return {
+        f'{stream_record.id}:{partition}': dict(params, partitions=[partition])
+        for partition in partitions
+    }
+
+
+def _start_unit(params):
+    from mindsdb.interfaces.stream.streams import get_stream
+    from mindsdb.interfaces.stream.stream_worker import StreamWorker, make_predict_batch
+    stream_in = get_stream(params['type'], params['stream_in'], params['connection_info'], 'r', params['partitions'])
+    stream_out = get_stream(params['type'], params['stream_out'], params['connection_info'], 'w')
+    anomaly_stream = None
+    if params['anomaly_stream'] is not None:
+        anomaly_stream = get_stream(params['type'], params['anomaly_stream'], params['connection_info'], 'w')
+    dead_letter_stream = None
+    if Config().get('streams', {}).get('dead_letter', False):
+        dead_letter_stream = get_stream(
+            params['type'], f"{params['stream_in']}_dead_letter", params['connection_info'], 'w'
+        )
+    worker = StreamWorker(
+        params['name'], stream_in, stream_out, make_predict_batch(params['predictor'], params['company_id']),
+        anomaly_stream=anomaly_stream, dead_letter_stream=dead_letter_stream
+    )
+    return worker.start()
+
+
+def _stop_unit(worker):
+    worker.stop()
+    worker.join(SHUTDOWN_TIMEOUT)
+    for stream in (worker.stream_in, worker.stream_out, worker.anomaly_stream, worker.dead_letter_stream):
+        if stream is not None:
+            stream.close()
+
+
+def run_stream_worker(worker_id, commands, events, stop_event):
+    """ Process of the pool. Starts and stops StreamWorker of units by commands of the pool:
+        ('assign', unit, params), ('revoke', unit), ('exit', ). On stop_event all units are drained and stopped.
+    """
+    # shutdown is coordinated by the pool, so the worker does not die on ctrl+c in the middle of a batch
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    units = {}
+    last_status = 0
+    while not stop_event.is_set():
+        try:
+            command = commands.get(timeout=0.5)
+        except queue.Empty:
+            command = None
+        if command is not None and command[0] == 'exit':
+            break
+        if command is not None and command[0] == 'assign':
+            _, unit, params = command
+            try:
+                units[unit] = _start_unit(params)
+            except Exception as e:
+                log.error(f'Stream worker {worker_id}: can not start {unit}: {e}')
+                events.put(('failed', worker_id, unit, str(e)))
+        elif command is not None and command[0] == 'revoke':
+            unit = command[1]
+            if unit in units:
+                _stop_unit(units.pop(unit))
+            events.put(('revoked', worker_id, unit))
+        if time.time() - last_status > STATUS_INTERVAL:
+            last_status = time.time()
+            events.put(('status', worker_id, {unit: worker.get_status() for unit, worker in units.items()}))
+
+    for worker in units.values():
+        worker.stop()
+    for worker in units.values():
+        _stop_unit(worker)
+
+
+class StreamWorkerProcess(ctx.Process):
+    # daemonic processes are not allowed to have children, and parallel prediction starts workers pool
+    daemon = False
+
+    def __init__(self, *args):
+        super(StreamWorkerProcess, self).__init__(args=args)
+
+    def run(self):
+        run_stream_worker(*self._args)
+
+
+class StreamWorkerPool():
+    """ Streams of the 'stream' table distributed over processes.
+
+        Each unit (stream, or partition of partitioned stream) is assigned to a worker by consistent hash
+        of its key. When workers are added or removed, units which change owner are first revoked from
+        the old owner, which writes and acks its pending batches, and only then assigned to the new one.
+        Setting of STOP_THREADS_EVENT stops all workers: they drain pending batches and exit.
+        Count of workers is taken from config 'streams.workers' on each rebalance, so it may be changed
+        without restart (0 disables the pool only after restart).
+
+        Streams of the table are also run by stream integrations (threads of kafka/redis integrations),
+        and two consumers of one stream would split or duplicate its records. So if the pool is enabled,
+        streams must not be started by integrations: the pool is meant to replace them, not to run along.
+    """
+
+    def __init__(self, workers=None):
+        self.workers_count = workers or Config().get('streams', {}).get('workers') or os.cpu_count()
+        self.stop_event = ctx.Event()
+        self.events = ctx.Queue()
+        self.workers = {}
+        self.ring = HashRing()
+        # unit -> worker which runs it
+        self.owners = {}
+        # unit -> worker which is asked to stop it
+        self.revoking = {}
+        self.units = {}
+        self.status = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stopped = False
+
+    def _start_worker(self, worker_id):
+        commands = ctx.Queue()
+        process = StreamWorkerProcess(worker_id, commands, self.events, self.stop_event)
+        process.start()
+        self.workers[worker_id] = {'process': process, 'commands': commands, 'leaving': False}
+
+    def _add_worker(self):
+        worker_id = f'worker_{self._next_id}'
+        self._next_id += 1
+        self._start_worker(worker_id)
+        self.ring.add(worker_id)
+
+    def resize(self, workers: int):
+        """ Change count of worker processes, units of removed workers are moved to remaining ones """
+        with self._lock:
+            active = [x for x, w in self.workers.items() if not w['leaving']]
+            for _ in range(workers - len(active)):
+                self._add_worker()
+            for worker_id in active[workers:]:
+                self.workers[worker_id]['leaving'] = True
+                self.ring.remove(worker_id)
+            self.workers_count = workers
+        self.rebalance()
+
+    def _read_units(self):
+        from mindsdb.interfaces.storage.db import session, Stream
+        from mindsdb.interfaces.database.integrations import DatasourceController
+        datasource_controller = DatasourceController()
+        units = {}
+        # streams of same integration are usually many
+        integrations = {}
+        try:
+            for stream_record in session.query(Stream).all():
+                if stream_record.learning_params:
+                    # learning streams are not predictions streams
+                    continue
+                try:
+                    integration = {}
+                    if stream_record.integration is not None:
+                        key = (stream_record.integration, stream_record.company_id)
+                        if key not in integrations:
+                            integrations[key] = datasource_controller.get_db_integration(
+                                stream_record.integration, stream_record.company_id
+                            ) or {}
+                        integration = integrations[key]
+                    units.update(get_stream_units(stream_record, integration))
+                except Exception as e:
+                    log.error(f'Can not get partitions of stream {stream_record.name}: {e}')
+        finally:
+            session.remove()
+        return units
+
+    def _process_events(self):
+        while True:
+            try:
+                event = self.events.get_nowait()
+            except queue.Empty:
+                return
+            worker_id = event[1]
+            if event[0] == 'revoked':
+                unit = event[2]
+                self.revoking.pop(unit, None)
+                if self.owners.get(unit) == worker_id:
+                    del self.owners[unit]
+                self.status.pop(unit, None)
+            elif event[0] == 'failed':
+                # will be assigned again on next rebalance
+                self.owners.pop(event[2], None)
+            elif event[0] == 'status':
+                for unit, unit_status in event[2].items():
+                    self.status[unit] = dict(unit_status, worker=worker_id)
+
+    def rebalance(self):
+        with self._lock:
+            self._process_events()
+            for worker_id, worker in list(self.workers.items()):
+                if worker['process'].is_alive():
+                    continue
+                # units of dead worker are not drained, their not acked records will be read again
+                for unit in [x for x, owner in self.owners.items() if owner == worker_id]:
+                    del self.owners[unit]
+                    self.revoking.pop(unit, None)
+                if worker['leaving']:
+                    del self.workers[worker_id]
+                else:
+                    log.warning(f'Stream worker {worker_id} is dead, restarting')
+                    self._start_worker(worker_id)
+
+            try:
+                units = self._read_units()
+            except Exception as e:
+                log.error(f'Can not read streams: {e}')
+                units = self.units
+            for unit, owner in list(self.owners.items()):
+                target = self.ring.get(unit) if unit in units else None
+                changed = unit in units and units[unit] != self.units.get(unit)
+                if (target != owner or changed) and unit not in self.revoking:
+                    self.workers[owner]['commands'].put(('revoke', unit))
+                    self.revoking[unit] = owner
+            self.units = units
+            for unit, params in units.items():
+                if unit in self.owners:
+                    continue
+                target = self.ring.get(unit)
+                if target is None:
+                    continue
+                self.workers[target]['commands'].put(('assign', unit, params))
+                self.owners[unit] = target
+
+            for worker_id, worker in list(self.workers.items()):
+                if worker['leaving'] and worker_id not in self.owners.values():
+                    worker['commands'].put(('exit', ))
+
+    def _run(self):
+        while not STOP_THREADS_EVENT.is_set() and not self.stop_event.is_set():
+            try:
+                workers = Config().get('streams', {}).get('workers')
+                if workers and workers != self.workers_count:
+                    log.info(f'Stream workers: count is changed from {self.workers_count} to {workers}')
+                    self.resize(workers)
+                else:
+                    self.rebalance()
+            except Exception as e:
+                log.error(f'Stream workers rebalance error: {e}')
+            STOP_THREADS_EVENT.wait(REBALANCE_INTERVAL)
+        self.stop()
+
+    def start(self):
+        log.warning('Stream workers pool is enabled: streams must not be started by stream integrations')
+        with self._lock:
+            for _ in range(self.workers_count):
+                self._add_worker()
+        self._thread = threading.Thread(target=self._run, name='stream_workers_pool', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=SHUTDOWN_TIMEOUT):
+        """ Coordinated shutdown: all workers drain their batches, workers which did not exit in timeout are terminated.
+            It is called on exit, on STOP_THREADS_EVENT and on ctrl+c, only first call stops the workers.
+        """
+        with self._lock:
+            if self._stopped:
+                return
+            self._stopped = True
+        self.stop_event.set()
+        deadline = time.time() + timeout
+        for worker in list(self.workers.values()):
+            worker['process'].join(max(deadline - time.time(), 0))
+        for worker_id, worker in list(self.workers.items()):
+            if worker['process'].is_alive():
+                log.warning(f'Stream worker {worker_id} did not stop in {timeout}s, terminating')
+                worker['process'].terminate()
+
+    def get_status(self) -> dict:
+        with self._lock:
+            self._process_events()
+            return {
+                'workers': {
+                    worker_id: {'pid': w['process'].pid, 'alive': w['process'].is_alive(), 'leaving': w['leaving']}
+                    for worker_id, w in self.workers.items()
+                },
+                'units': {
+                    unit: self.status.get(unit, {'worker': owner})
+                    for unit, owner in self.owners.items()
+                }
+            }
@@ -0,0 +1,307 @@
+import time
+import queue
+import threading
+from collections import deque
+from typing import Callable, List, Optional
+
+from mindsdb.utilities.config import Config, STOP_THREADS_EVENT
+from mindsdb.utilities.log import log
+from mindsdb.utilities.metrics import metrics
+from mindsdb.utilities.with_kwargs_wrapper import WithKWArgsWrapper
+from mindsdb.interfaces.stream.streams import BatchStream
+
+# throughput is computed over batches written in last THROUGHPUT_WINDOW seconds
+THROUGHPUT_WINDOW = 60
+# failed batch is retried after RETRY_BACKOFF seconds, the delay doubles on each attempt up to MAX_RETRY_BACKOFF
+RETRY_BACKOFF = 1
+MAX_RETRY_BACKOFF = 30
+# lag of the source is read by the reader thread not more often than once in LAG_INTERVAL seconds
+LAG_INTERVAL = 5
+
+
+# ModelInterface shared by streams of the process, so each predictor is loaded once per process
+_model_interface = None
+_model_interface_lock = threading.Lock()
+
+
+def _get_model_interface():
+    global _model_interface
+    with _model_interface_lock:
+        if _model_interface is None:
+            from mindsdb.interfaces.model.model_interface import ModelInterface
+            _model_interface = ModelInterface()
+    return _model_interface
+
+
+def make_predict_batch(predictor: str, company_id: Optional[int] = None) -> Callable[[List[dict]], List[dict]]:
+    """ Function which predicts batch of records of stream by one call of ModelInterface.predict.
+
+        Output record is input record with predicted value in target column and explanation
+        in '{target}_{field}' columns. For timeseries predictors records are predicted incrementally,
+        so only new rows are sent on each call.
+    """
+    model_interface = WithKWArgsWrapper(_get_model_interface(), company_id=company_id)
+
+    def predict_batch(records):
+        dict_arr, explain_arr = model_interface.predict(predictor, records, 'dict&explain', incremental=True)
+        result = []
+        for dict_row, explain_row in zip(dict_arr, explain_arr):
+            target = next(iter(dict_row))
+            row = dict(dict_row[target])
+            row[target] = row.pop('predicted_value')
+            for field, value in explain_row[target].items():
+                if field != 'predicted_value':
+                    row[f'{target}_{field}'] = value
+            result.append(row)
+        return result
+    return predict_batch
+
+
+def is_anomaly(record: dict) -> bool:
+    return any(k.endswith('_anomaly') and v for k, v in record.items())
+
+
+class StreamWorker():
+    """ Continuous predictions of a stream.
+
+        Reader thread reads batches of stream_in: a batch is closed when it has batch_size records
+        or batch_timeout seconds passed. Predictor thread makes one predict call per batch and writes
+        all outputs of the batch at once. Batches are passed through a queue of max_pending batches,
+        if predict falls behind, the reader waits and records are kept in the source stream.
+        Records are acked in the source after their outputs are written, in order of batches:
+        acking later batch would skip the failed one (kafka commits offset, redis moves last id).
+        So failed batch is retried with backoff max_retries times, then it is written to dead letter stream,
+        or, if there is no dead letter stream, the batch is skipped and logged. Messages of the source which
+        can not be decoded are handled same way, without retries. If the worker is stopped while batch
+        is failing, neither it nor later batches are acked, and they are read again after restart.
+        Stream sources (e.g. kafka consumer) are not thread-safe, so they are used by the reader thread only.
+    """
+
+    def __init__(self, name: str, stream_in: BatchStream, stream_out: BatchStream,
+                 predict_batch: Callable[[List[dict]], List[dict]], anomaly_stream: Optional[BatchStream] = None,
+                 batch_size: Optional[int] = None, batch_timeout: Optional[float] = None,
+                 max_pending: Optional[int] = None, stop_event: Optional[threading.Event] = None,
+                 dead_letter_stream: Optional[BatchStream] = None, max_retries: Optional[int] = None):
+        streams_config = Config().get('streams', {})
+        self.name = name
+        self.stream_in = stream_in
+        self.stream_out = stream_out
+        self.anomaly_stream = anomaly_stream
+        self.dead_letter_stream = dead_letter_stream
+        self.predict_batch = predict_batch
+        self.batch_size = batch_size or streams_config.get('batch_size', 100)
+        self.batch_timeout = batch_timeout or streams_config.get('batch_timeout', 1)
+        self.max_retries = max_retries if max_retries is not None else streams_config.get('max_retries', 3)
+        self.stop_event = stop_event or threading.Event()
+
+        self._batches = queue.Queue(maxsize=max_pending or streams_config.get('max_pending', 4))
+        # tokens of written batches, acked by the reader thread
+        self._acks = queue.Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+        self._written = deque()
+        self._started_at = None
+        self._source_lag = None
+        self._lag_checked_at = 0
+        self.status = {
+            'records_read': 0,
+            'records_written': 0,
+            'records_failed': 0,
+            'errors': 0,
+            'backpressure_seconds': 0,
+            'last_batch_latency': None,
+            'last_error': None
+        }
+
+    def _stopped(self):
+        return self.stop_event.is_set() or STOP_THREADS_EVENT.is_set()
+
+    def _ack_written(self):
+        while True:
+            try:
+                token = self._acks.get_nowait()
+            except queue.Empty:
+                return
+            self.stream_in.ack(token)
+
+    def _check_lag(self):
+        if time.time() - self._lag_checked_at < LAG_INTERVAL:
+            return
+        self._lag_checked_at = time.time()
+        try:
+            self._source_lag = self.stream_in.get_lag()
+        except Exception:
+            self._source_lag = None
+
+    def _read_loop(self):
+        while not self._stopped():
+            self._ack_written()
+            self._check_lag()
+            try:
+                records, token = self.stream_in.read_batch(self.batch_size, self.batch_timeout)
+                invalid = self.stream_in.pop_invalid()
+            except Exception as e:
+                self._on_error(f'reading error - {e}')
+                self.stop_event.wait(self.batch_timeout)
+                continue
+            if len(records) == 0 and len(invalid) == 0:
+                continue
+            with self._lock:
+                self.status['records_read'] += len(records) + len(invalid)
+            metrics.inc('stream_records_read', len(records) + len(invalid))
+            item = (time.time(), records, invalid, token)
+            waited_since = None
+            while not self._stopped():
+                try:
+                    self._batches.put(item, timeout=0.5)
+                    break
+                except queue.Full:
+                    if waited_since is None:
+                        waited_since = time.time()
+                        log.debug(f'Stream {self.name}: predictions fall behind, reading is paused')
+            if waited_since is not None:
+                with self._lock:
+                    self.status['backpressure_seconds'] += time.time() - waited_since
+        # batches which were written before stop
+        self._ack_written()
+
+    def _write_batch(self, records):
+        with metrics.timer('stream.predict'):
+            outputs = self.predict_batch(records)
+        with metrics.timer('stream.write'):
+            if self.anomaly_stream is not None:
+                anomalies = [x for x in outputs if is_anomaly(x)]
+                outputs = [x for x in outputs if not is_anomaly(x)]
+                if len(anomalies) > 0:
+                    self.anomaly_stream.write_batch(anomalies)
+            if len(outputs) > 0:
+                self.stream_out.write_batch(outputs)
+
+    def _reject(self, records, error) -> Optional[bool]:
+        """ Write records to dead letter stream, or skip them if there is no dead letter stream.
+            Returns False when done, None if the worker was stopped before
+        """
+        if self.dead_letter_stream is None:
+            log.error(f'Stream {self.name}: {len(records)} records are skipped - {error}')
+            metrics.inc('stream_records_skipped', len(records))
+            return False
+        attempt = 0
+        while True:
+            try:
+                self.dead_letter_stream.write_batch([{'mindsdb_error': str(error), **x} for x in records])
+                metrics.inc('stream_records_dead_letter', len(records))
+                return False
+            except Exception as e:
+                attempt += 1
+                self._on_error(f'dead letter stream error - {e}')
+            if self._stopped():
+                return None
+            self.stop_event.wait(min(RETRY_BACKOFF * 2 ** (attempt - 1), MAX_RETRY_BACKOFF))
+
+    def _handle_batch(self, records) -> Optional[bool]:
+        """ Write outputs of batch, retrying on errors
+
+            Returns:
+                True if outputs are written, False if records are written to dead letter stream or skipped,
+                None if the worker was stopped before the batch was handled
+        """
+        attempt = 0
+        while True:
+            try:
+                self._write_batch(records)
+                return True
+            except Exception as e:
+                attempt += 1
+                self._on_error(f'prediction error (attempt {attempt}) - {e}')
+                if attempt > self.max_retries:
+                    return self._reject(records, e)
+            if self._stopped():
+                return None
+            self.stop_event.wait(min(RETRY_BACKOFF * 2 ** (attempt - 1), MAX_RETRY_BACKOFF))
+
+    def _predict_loop(self):
+        while not self._stopped() or not self._batches.empty():
+            try:
+                read_at, records, invalid, token = self._batches.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if len(invalid) > 0:
+                if self._reject(invalid, 'message can not be decoded') is None:
+                    return self._on_stopped()
+                with self._lock:
+                    self.status['records_failed'] += len(invalid)
+            if len(records) == 0:
+                self._acks.put(token)
+                continue
+            is_written = self._handle_batch(records)
+            if is_written is None:
+                return self._on_stopped()
+            self._acks.put(token)
+            if not is_written:
+                with self._lock:
+                    self.status['records_failed'] += len(records)
+                continue
+            latency = time.time() - read_at
+            if metrics.enabled:
+                metrics.observe('stream.batch_latency', latency)
+            metrics.inc('stream_records_written', len(records))
+            with self._lock:
+                self.status['records_written'] += len(records)
+                self.status['last_batch_latency'] = latency
+                self._written.append((time.time(), len(records)))
+
+    def _on_stopped(self):
+        # acking later batches would skip this one, so all of them are read again after restart
+        log.warning(f'Stream {self.name}: stopped while batch is failing, unacked batches will be read again')
+
+    def _on_error(self, message):
+        log.error(f'Stream {self.name}: {message}')
+        metrics.inc('stream_errors')
+        with self._lock:
+            self.status['errors'] += 1
+            self.status['last_error'] = message
+
+    def start(self):
+        self._started_at = time.time()
+        self._threads = [
+            threading.Thread(target=self._read_loop, name=f'stream_{self.name}_reader', daemon=True),
+            threading.Thread(target=self._predict_loop, name=f'stream_{self.name}_predictor', daemon=True)
+        ]
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+
+    def join(self, timeout=None):
+        for thread in self._threads:
+            thread.join(timeout)
+        if not self.is_alive():
+            # batches written after the reader was stopped
+            self._ack_written()
+
+    def is_alive(self):
+        return any(thread.is_alive() for thread in self._threads)
+
+    def get_status(self) -> dict:
+        """ Counters of the worker, plus:
+                lag: records which are read but not written, plus not read records of the source if it is known,
+                    the latter is checked by the reader thread once in LAG_INTERVAL seconds
+                pending_batches: batches which wait for predict
+                throughput: records written per second during last THROUGHPUT_WINDOW seconds
+        """
+        source_lag = self._source_lag
+        now = time.time()
+        with self._lock:
+            while len(self._written) > 0 and self._written[0][0] < now - THROUGHPUT_WINDOW:
+                self._written.popleft()
+            status = dict(self.status)
+            in_flight = status['records_read'] - status['records_written'] - status['records_failed']
+            written_recently = sum(x[1] for x in self._written)
+        status['name'] = self.name
+        status['pending_batches'] = self._batches.qsize()
+        status['lag'] = in_flight + (source_lag or 0)
+        window = min(THROUGHPUT_WINDOW, now - (self._started_at or now))
+        status['throughput'] = written_recently / window if window > 0 else 0
+        return status
@@ -0,0 +1,244 @@
+import json
+import time
+import threading
+from collections import deque
+
+
+class BatchStream():
+    """ Stream which is read and written by batches.
+
+        read_batch returns records and ack token. Records are removed from the source only when
+        ack() is called with the token, after outputs of the batch are written. So records of
+        batches which were read but not processed (for example, because of crash) are read again.
+        Messages which can not be decoded are not returned as records, they are returned by pop_invalid()
+        after the read, and they are removed from the source by ack() of the batch.
+    """
+
+    def read_batch(self, max_records: int, timeout: float):
+        """ Wait up to timeout seconds until there are max_records records.
+
+            Returns:
+                list: records, may be empty
+                object: token for ack()
+        """
+        raise NotImplementedError
+
+    def ack(self, token) -> None:
+        pass
+
+    def pop_invalid(self) -> list:
+        """ Messages of last read_batch which could not be decoded, as records {'mindsdb_raw': ..., 'mindsdb_error': ...} """
+        invalid = getattr(self, '_invalid', [])
+        self._invalid = []
+        return invalid
+
+    def _decode_messages(self, messages: list, decode) -> list:
+        """ Decode each message separately, so one bad message does not fail whole batch """
+        records = []
+        invalid = []
+        for message in messages:
+            try:
+                records.append(decode(message))
+            except Exception as e:
+                invalid.append({'mindsdb_raw': repr(message), 'mindsdb_error': f'can not decode message: {e}'})
+        self._invalid = invalid
+        return records
+
+    def write_batch(self, records: list) -> None:
+        raise NotImplementedError
+
+    def get_lag(self):
+        """ Count of records in the source which are not read yet, or None if it is unknown """
+        return None
+
+    def close(self) -> None:
+        pass
+
+
+class MemoryStream(BatchStream):
+    """ In-memory stream, for tests and benchmarks """
+
+    def __init__(self, records=None):
+        self.records = deque(records or [])
+        self.written = []
+        self._cond = threading.Condition()
+
+    def put(self, record: dict) -> None:
+        with self._cond:
+            self.records.append(record)
+            self._cond.notify_all()
+
+    def read_batch(self, max_records, timeout):
+        deadline = time.time() + timeout
+        with self._cond:
+            while len(self.records) < max_records:
+                left = deadline - time.time()
+                if left <= 0:
+                    break
+                self._cond.wait(left)
+            batch = [self.records.popleft() for _ in range(min(max_records, len(self.records)))]
+        return batch, None
+
+    def write_batch(self, records):
+        with self._cond:
+            self.written.extend(records)
+
+    def get_lag(self):
+        return len(self.records)
+
+
+class RedisBatchStream(BatchStream):
+    """ Redis stream with same records format as mindsdb_streams.RedisStream: each entry has
+        json of record in field ''. Entries are read with XREAD COUNT, written and deleted
+        in one pipeline per batch.
+    """
+
+    def __init__(self, stream: str, connection_info):
+        import walrus
+        if isinstance(connection_info, str):
+            connection_info = json.loads(connection_info)
+        self.stream = stream
+        self.client = walrus.Database(**connection_info)
+        self.last_id = '0'
+
+    @staticmethod
+    def _decode(fields):
+        if b'' in fields:
+            return json.loads(fields[b''])
+        return {k.decode('utf8'): v.decode('utf8') for k, v in fields.items()}
+
+    def read_batch(self, max_records, timeout):
+        # in redis 'block 0' means wait forever
+        response = self.client.xread({self.stream: self.last_id}, count=max_records, block=max(int(timeout * 1000), 1))
+        if not response:
+            return [], []
+        entries = response[0][1]
+        self.last_id = entries[-1][0]
+        records = self._decode_messages([fields for _, fields in entries], self._decode)
+        return records, [entry_id for entry_id, _ in entries]
+
+    def ack(self, token):
+        if len(token) > 0:
+            self.client.xdel(self.stream, *token)
+
+    def write_batch(self, records):
+        pipe = self.client.pipeline(transaction=False)
+        for record in records:
+            pipe.xadd(self.stream, {'': json.dumps(record, default=str)})
+        pipe.execute()
+
+    def get_lag(self):
+        # read entries are deleted by ack, so length of the stream is count of not processed records
+        return self.client.xlen(self.stream)
+
+
+class KafkaBatchStream(BatchStream):
+    """ Kafka topic with same connection_info as mindsdb_streams.KafkaStream. Records of batch are
+        sent without waiting for each of them and flushed once. Offsets are committed by ack(),
+        if the consumer has group_id. If partitions are set, only these partitions of the topic are read.
+    """
+
+    def __init__(self, topic: str, connection_info, mode='rw', partitions=None):
+        import kafka
+        if isinstance(connection_info, str):
+            connection_info = json.loads(connection_info)
+        connection_info = dict(connection_info)
+        advanced = connection_info.pop('advanced', {})
+        self.topic = topic
+        self.producer = None
+        self.consumer = None
+        if 'w' in mode:
+            producer_kwargs = {'acks': 'all', 'linger_ms': 5}
+            producer_kwargs.update(advanced.get('producer', {}))
+            self.producer = kafka.KafkaProducer(**connection_info, **producer_kwargs)
+        if 'r' in mode:
+            consumer_kwargs = dict(advanced.get('consumer', {}))
+            self.commit_offsets = consumer_kwargs.get('group_id') is not None
+            if self.commit_offsets:
+                consumer_kwargs['enable_auto_commit'] = False
+            self.consumer = kafka.KafkaConsumer(**connection_info, **consumer_kwargs)
+            if partitions is None:
+                self.consumer.subscribe(topics=[topic])
+            else:
+                self.consumer.assign([kafka.TopicPartition(topic, p) for p in partitions])
+
+    def read_batch(self, max_records, timeout):
+        from kafka.structs import OffsetAndMetadata
+        response = self.consumer.poll(timeout_ms=int(timeout * 1000), max_records=max_records)
+        values = []
+        offsets = {}
+        for partition, messages in response.items():
+            values.extend(message.value for message in messages)
+            offsets[partition] = OffsetAndMetadata(messages[-1].offset + 1, None)
+        return self._decode_messages(values, json.loads), offsets
+
+    def ack(self, token):
+        # consumer is not thread-safe, so ack must be called in the thread which reads
+        if self.commit_offsets and len(token) > 0:
+            self.consumer.commit(token)
+
+    def write_batch(self, records):
+        for record in records:
+            self.producer.send(self.topic, json.dumps(record, default=str).encode('utf-8'))
+        self.producer.flush()
+
+    def get_lag(self):
+        # consumer is not thread-safe, so it must be called in the thread which reads
+        partitions = self.consumer.assignment()
+        if len(partitions) == 0:
+            return None
+        end_offsets = self.consumer.end_offsets(list(partitions))
+        return sum(max(end_offsets[p] - self.consumer.position(p), 0) for p in partitions)
+
+    def close(self):
+        if self.consumer is not None:
+            self.consumer.close()
+        if self.producer is not None:
+            self.producer.close()
+
+
+class LegacyStream(BatchStream):
+    """ Batch interface for streams with read() generator and write(dict), like mindsdb_streams.
+        Generator of read() is always exhausted, because these streams remove record only after
+        it is yielded, so batch may be bigger than max_records.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def read_batch(self, max_records, timeout):
+        deadline = time.time() + timeout
+        records = []
+        while len(records) < max_records and time.time() < deadline:
+            records.extend(self.stream.read())
+            if len(records) < max_records:
+                time.sleep(min(0.05, max(deadline - time.time(), 0)))
+        return records, None
+
+    def write_batch(self, records):
+        for record in records:
+            self.stream.write(record)
+
+
+def get_stream(stream_type: str, name: str, connection_info, mode='rw', partitions=None) -> BatchStream:
+    if stream_type == 'redis':
+        return RedisBatchStream(name, connection_info)
+    if stream_type == 'kafka':
+        return KafkaBatchStream(name, connection_info, mode, partitions)
+    raise Exception(f'Unknown stream type: {stream_type}')
+
+
+def get_partitions(stream_type: str, name: str, connection_info):
+    """ Partitions of the stream which may be read independently, or None if stream is not partitioned """
+    if stream_type != 'kafka':
+        return None
+    import kafka
+    if isinstance(connection_info, str):
+        connection_info = json.loads(connection_info)
+    connection_info = {k: v for k, v in connection_info.items() if k != 'advanced'}
+    consumer = kafka.KafkaConsumer(**connection_info)
+    try:
+        partitions = consumer.partitions_for_topic(name)
+    finally:
+        consumer.close()
+    return sorted(partitions) if partitions else None
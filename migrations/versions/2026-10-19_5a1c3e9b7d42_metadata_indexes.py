@@ -0,0 +1,54 @@
+"""metadata_indexes
+
+Revision ID: 5a1c3e9b7d42
+Revises: 47f97b83cee4
+Create Date: 2026-10-19 10:12:44.318207
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import mindsdb.interfaces.storage.db
+
+
+# revision identifiers, used by Alembic.
+revision = '5a1c3e9b7d42'
+down_revision = '47f97b83cee4'
+branch_labels = None
+depends_on = None
+
+
+# Models of interfaces/storage/db.py must declare same indexes in __table_args__ (along with
+# constraints which are there already), otherwise autogenerate of next migration drops them:
+#   Predictor: Index('predictor_company_id_name_index', 'company_id', 'name')
+#   Datasource: Index('datasource_company_id_name_index', 'company_id', 'name'),
+#               Index('datasource_company_id_id_index', 'company_id', 'id')
+#   Semaphor: Index('semaphor_entity_type_entity_id_index', 'entity_type', 'entity_id', unique=True)
+#   Log: Index('log_company_id_created_at_index', 'company_id', 'created_at'), instead of 'some_index'
+
+
+def upgrade():
+    # unique constraint of semaphor was declared in the model but never created, so there may be duplicates.
+    # Semaphor rows are short-living locks, the first one of each entity is kept.
+    conn = op.get_bind()
+    conn.execute(sa.text('''
+        delete from semaphor where id not in (
+            select id from (
+                select min(id) as id from semaphor group by entity_type, entity_id
+            ) as first_semaphor
+        )
+    '''))
+    op.create_index('semaphor_entity_type_entity_id_index', 'semaphor', ['entity_type', 'entity_id'], unique=True)
+
+    op.create_index('predictor_company_id_name_index', 'predictor', ['company_id', 'name'])
+    op.create_index('datasource_company_id_name_index', 'datasource', ['company_id', 'name'])
+    op.create_index('datasource_company_id_id_index', 'datasource', ['company_id', 'id'])
+    # replaces 'some_index' of model, which refers to nonexistent column 'created_at_index'
+    op.create_index('log_company_id_created_at_index', 'log', ['company_id', 'created_at'])
+
+
+def downgrade():
+    op.drop_index('log_company_id_created_at_index', table_name='log')
+    op.drop_index('datasource_company_id_id_index', table_name='datasource')
+    op.drop_index('datasource_company_id_name_index', table_name='datasource')
+    op.drop_index('predictor_company_id_name_index', table_name='predictor')
+    op.drop_index('semaphor_entity_type_entity_id_index', table_name='semaphor')
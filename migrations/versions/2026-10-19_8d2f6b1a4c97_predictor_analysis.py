@@ -0,0 +1,95 @@
+"""predictor_analysis
+
+Revision ID: 8d2f6b1a4c97
+Revises: 5a1c3e9b7d42
+Create Date: 2026-10-19 14:37:02.581930
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import mindsdb.interfaces.storage.db
+from mindsdb.interfaces.storage.db import Json
+
+
+# revision identifiers, used by Alembic.
+revision = '8d2f6b1a4c97'
+down_revision = '5a1c3e9b7d42'
+branch_labels = None
+depends_on = None
+
+# predictors are moved by batches, so analyses of all predictors are not loaded to memory at once
+BATCH_SIZE = 100
+# same as mindsdb.interfaces.model.predictor_analysis.SUMMARY_FIELDS at the moment of migration
+SUMMARY_FIELDS = ('accuracies', )
+
+predictor_table = sa.table(
+    'predictor',
+    sa.column('id', sa.Integer),
+    sa.column('data', Json)
+)
+analysis_table = sa.table(
+    'predictor_analysis',
+    sa.column('predictor_id', sa.Integer),
+    sa.column('data', Json)
+)
+
+
+def _is_analysis(data):
+    return isinstance(data, dict) and 'error' not in data and 'training_log' not in data and len(set(data) - {'name'}) > 0
+
+
+def upgrade():
+    op.create_table(
+        'predictor_analysis',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('predictor_id', sa.Integer(), nullable=False),
+        sa.Column('data', Json(), nullable=True),
+        sa.ForeignKeyConstraint(['predictor_id'], ['predictor.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('predictor_id')
+    )
+
+    conn = op.get_bind()
+    last_id = -1
+    while True:
+        rows = conn.execute(
+            sa.select([predictor_table.c.id, predictor_table.c.data])
+            .where(predictor_table.c.id > last_id)
+            .order_by(predictor_table.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if len(rows) == 0:
+            break
+        last_id = rows[-1][0]
+        for predictor_id, data in rows:
+            if not _is_analysis(data):
+                continue
+            conn.execute(analysis_table.insert().values(predictor_id=predictor_id, data=data))
+            conn.execute(
+                predictor_table.update()
+                .where(predictor_table.c.id == predictor_id)
+                .values(data={k: data[k] for k in SUMMARY_FIELDS if k in data})
+            )
+
+
+def downgrade():
+    conn = op.get_bind()
+    last_id = -1
+    while True:
+        rows = conn.execute(
+            sa.select([analysis_table.c.predictor_id, analysis_table.c.data])
+            .where(analysis_table.c.predictor_id > last_id)
+            .order_by(analysis_table.c.predictor_id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if len(rows) == 0:
+            break
+        last_id = rows[-1][0]
+        for predictor_id, data in rows:
+            conn.execute(
+                predictor_table.update()
+                .where(predictor_table.c.id == predictor_id)
+                .values(data=data)
+            )
+
+    op.drop_table('predictor_analysis')
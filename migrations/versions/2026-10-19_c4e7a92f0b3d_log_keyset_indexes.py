@@ -0,0 +1,33 @@
+"""log_keyset_indexes
+
+Revision ID: c4e7a92f0b3d
+Revises: 8d2f6b1a4c97
+Create Date: 2026-10-19 17:05:51.904126
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import mindsdb.interfaces.storage.db
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e7a92f0b3d'
+down_revision = '8d2f6b1a4c97'
+branch_labels = None
+depends_on = None
+
+
+# Log model of interfaces/storage/db.py must declare same indexes in __table_args__:
+#   Index('log_company_id_id_index', 'company_id', 'id'),
+#   Index('log_company_id_log_type_id_index', 'company_id', 'log_type', 'id'),
+
+
+def upgrade():
+    # logs are paginated by id within company, optionally filtered by level
+    op.create_index('log_company_id_id_index', 'log', ['company_id', 'id'])
+    op.create_index('log_company_id_log_type_id_index', 'log', ['company_id', 'log_type', 'id'])
+
+
+def downgrade():
+    op.drop_index('log_company_id_log_type_id_index', table_name='log')
+    op.drop_index('log_company_id_id_index', table_name='log')
@@ -1,6 +1,28 @@
+from mindsdb.api.mongo.utilities.compression import negotiate_compressors
+
+
 def is_true(val):
     return bool(val) is True
 
 
 def is_false(val):
     return bool(val) is False
+
+
+def handshake_result(query, primary_field='ismaster'):
+    """ Reply to handshake (hello, isMaster, ismaster) with compressors negotiated for the connection
+
+        Args:
+            query (dict): handshake command
+            primary_field (str): 'ismaster' for isMaster, 'isWritablePrimary' for hello
+    """
+    result = {
+        primary_field: True,
+        "minWireVersion": 0,
+        "maxWireVersion": 9,
+        "ok": 1
+    }
+    compression = negotiate_compressors(query.get('compression'))
+    if len(compression) > 0:
+        result['compression'] = compression
+    return result
@@ -2,6 +2,7 @@ from .whatsmyuri import responder as responder_whatsmyuri
 from .buildinfo import responder as responder_buildinfo
 from .is_master import responder as responder_is_master
 from .is_master_lower import responder as responder_is_master_lower
+from .hello import responder as responder_hello
 from .replsetgetstatus import responder as responder_replsetgetstatus
 from .getlog import responder as responder_getlog
 from .add_shard import responder as responder_add_shard
@@ -38,6 +39,7 @@ responders = [
     responder_buildinfo,
     responder_is_master,
     responder_is_master_lower,
+    responder_hello,
     responder_replsetgetstatus,
     responder_getlog,
     responder_add_shard,                # 4.4
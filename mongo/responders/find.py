@@ -5,6 +5,28 @@ from mindsdb.api.mongo.classes import Responder
 import mindsdb.api.mongo.functions as helpers
 
 
+def get_requested_columns(projection, predicted_columns):
+    """ Fields of prediction needed for projection, or None if all fields are needed """
+    if projection is None:
+        return None
+    included = [key for key, value in projection.items() if helpers.is_true(value) and key != '_id']
+    if len(included) == 0:
+        return None
+    columns = set()
+    for key in included:
+        for col in predicted_columns:
+            if key == f'{col}_explain':
+                return None
+            if key == f'{col}_confidence':
+                columns.add('confidence')
+            elif key == f'{col}_min':
+                columns.add('confidence_lower_bound')
+            elif key == f'{col}_max':
+                columns.add('confidence_upper_bound')
+        columns.add(key)
+    return list(columns)
+
+
 class Responce(Responder):
     when = {'find': helpers.is_true}
 
@@ -24,7 +46,7 @@ class Responce(Responder):
             } for x in models]
         elif table in model_names:
             # prediction
-            model = mindsdb_env['mindsdb_native'].get_model_data(name=query['find'])
+            model = mindsdb_env['mindsdb_native'].get_model_data(name=query['find'], with_analysis=False)
 
             columns = []
             columns += list(model['dtype_dict'].keys())
@@ -75,15 +97,20 @@ class Responce(Responder):
             if isinstance(datasource, OrderedDict):
                 datasource = dict(datasource)
 
-            pred_dict_arr, explanations = mindsdb_env['mindsdb_native'].predict(table, datasource, 'dict&explain')
-
-            if 'select_data_query' in where_data:
-                mindsdb_env['data_store'].delete_datasource(ds_name)
-
             predicted_columns = model['predict']
             if not isinstance(predicted_columns, list):
                 predicted_columns = [predicted_columns]
 
+            pred_dict_arr, explanations = mindsdb_env['mindsdb_native'].predict(
+                table,
+                datasource,
+                'dict&explain',
+                columns=get_requested_columns(query.get('projection'), predicted_columns)
+            )
+
+            if 'select_data_query' in where_data:
+                mindsdb_env['data_store'].delete_datasource(ds_name)
+
             data = []
             all_columns = list(model['dtype_dict'].keys())   # [k for k in pred_dict_arr[0] if k in columns]
             min_max_keys = []
@@ -106,7 +133,7 @@ class Responce(Responder):
                         row[key] = None
 
                 for key in predicted_columns:
-                    row[key + '_confidence'] = explanation[key]['confidence']
+                    row[key + '_confidence'] = explanation[key].get('confidence')
                     row[key + '_explain'] = explanation[key]
                 for key in min_max_keys:
                     if 'confidence_lower_bound' in explanation[key]:
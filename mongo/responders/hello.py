@@ -0,0 +1,12 @@
+from mindsdb.api.mongo.classes import Responder
+import mindsdb.api.mongo.functions as helpers
+
+
+class Responce(Responder):
+    when = {'hello': helpers.is_true}
+
+    def result(self, query, request_env, mindsdb_env, session):
+        return helpers.handshake_result(query, 'isWritablePrimary')
+
+
+responder = Responce()
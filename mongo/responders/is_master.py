@@ -5,12 +5,8 @@ import mindsdb.api.mongo.functions as helpers
 class Responce(Responder):
     when = {'isMaster': helpers.is_true}
 
-    result = {
-        "ismaster": True,
-        "minWireVersion": 0,
-        "maxWireVersion": 9,
-        "ok": 1
-    }
+    def result(self, query, request_env, mindsdb_env, session):
+        return helpers.handshake_result(query, 'ismaster')
 
 
 responder = Responce()
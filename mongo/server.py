@@ -10,6 +10,7 @@ import mindsdb.api.mongo.functions as helpers
 from mindsdb.api.mongo.classes import RespondersCollection, Session
 from mindsdb.api.mongo.responders import responders
 from mindsdb.api.mongo.utilities import log
+from mindsdb.api.mongo.utilities.compression import compress_message, decompress_message, CompressionError
 from mindsdb.utilities.with_kwargs_wrapper import WithKWArgsWrapper
 from mindsdb.interfaces.storage.db import session as db_session
 from mindsdb.interfaces.datastore.datastore import DataStore
@@ -23,6 +24,7 @@ OP_QUERY = 2004
 OP_GET_MORE = 2005
 OP_DELETE = 2006
 OP_KILL_CURSORS = 2007
+OP_COMPRESSED = 2012
 OP_MSG = 2013
 
 BYTE = '<b'
@@ -257,6 +259,19 @@ class MongoRequestHandler(SocketServer.BaseRequestHandler):
         db_session.close()
 
     def get_answer(self, request_id, opcode, msg_bytes):
+        compressor_id = None
+        if opcode == OP_COMPRESSED:
+            # reply must be compressed with same compressor as request
+            try:
+                opcode, msg_bytes, compressor_id = decompress_message(msg_bytes)
+            except CompressionError as e:
+                log.error(f'Can not decode OpCompressed: {e}')
+                responder = self.server.operationsHandlersMap.get(e.original_opcode)
+                if responder is None:
+                    responder = self.server.operationsHandlersMap[OP_MSG]
+                # error reply is not compressed, as compressor of the client is not usable
+                return responder.to_bytes({'ok': 0, 'errmsg': str(e), 'code': e.code}, request_id)
+            log.debug(f'GET OpCompressed original_opcode={opcode} compressor_id={compressor_id}')
         if opcode not in self.server.operationsHandlersMap:
             raise NotImplementedError(f'Unknown opcode {opcode}')
         responder = self.server.operationsHandlersMap[opcode]
@@ -264,7 +279,10 @@ class MongoRequestHandler(SocketServer.BaseRequestHandler):
         response = responder.handle(msg_bytes, request_id, self.session.mindsdb_env, self.session)
         if response is None:
             return None
-        return responder.to_bytes(response, request_id)
+        answer = responder.to_bytes(response, request_id)
+        if answer is not None and compressor_id is not None:
+            answer = compress_message(answer, compressor_id, OP_COMPRESSED)
+        return answer
 
     def _read_bytes(self, length):
         buffer = b''
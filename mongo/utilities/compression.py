@@ -0,0 +1,170 @@
+import zlib
+import struct
+from collections import OrderedDict
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import snappy
+except ImportError:
+    snappy = None
+
+
+# https://github.com/mongodb/specifications/blob/master/source/compression/OP_COMPRESSED.rst
+COMPRESSOR_IDS = {
+    'noop': 0,
+    'snappy': 1,
+    'zlib': 2,
+    'zstd': 3
+}
+
+ZLIB_COMPRESSION_LEVEL = -1
+ZSTD_COMPRESSION_LEVEL = 3
+# mongo error code which is sent to client if compressed message can not be decoded
+BAD_VALUE_ERROR_CODE = 2
+
+
+class CompressionError(Exception):
+    """ Compressed message can not be decoded. Client gets error reply, connection is kept
+
+        Attributes:
+            original_opcode (int): opcode of compressed message, if it is known, reply is sent in that format
+            code (int): mongo error code
+    """
+
+    def __init__(self, message, original_opcode=None, code=BAD_VALUE_ERROR_CODE):
+        super().__init__(message)
+        self.original_opcode = original_opcode
+        self.code = code
+
+
+class NoopCompressor():
+    name = 'noop'
+
+    def compress(self, data):
+        return data
+
+    def decompress(self, data):
+        return data
+
+
+class ZlibCompressor():
+    name = 'zlib'
+
+    def compress(self, data):
+        return zlib.compress(data, ZLIB_COMPRESSION_LEVEL)
+
+    def decompress(self, data):
+        return zlib.decompress(data)
+
+
+class ZstdCompressor():
+    name = 'zstd'
+
+    def compress(self, data):
+        # contexts are not thread safe, so new ones are created on each call
+        return zstandard.ZstdCompressor(level=ZSTD_COMPRESSION_LEVEL).compress(data)
+
+    def decompress(self, data):
+        return zstandard.ZstdDecompressor().decompress(data)
+
+
+class SnappyCompressor():
+    name = 'snappy'
+
+    def compress(self, data):
+        return snappy.compress(data)
+
+    def decompress(self, data):
+        return snappy.uncompress(data)
+
+
+def get_available_compressors():
+    """ Compressors which can be used in this environment, in server preference order
+
+        Returns:
+            OrderedDict: compressor name -> compressor instance
+    """
+    compressors = OrderedDict()
+    if zstandard is not None:
+        compressors['zstd'] = ZstdCompressor()
+    if snappy is not None:
+        compressors['snappy'] = SnappyCompressor()
+    compressors['zlib'] = ZlibCompressor()
+    return compressors
+
+
+COMPRESSORS = get_available_compressors()
+COMPRESSORS_BY_ID = {COMPRESSOR_IDS[name]: compressor for name, compressor in COMPRESSORS.items()}
+COMPRESSORS_BY_ID[COMPRESSOR_IDS['noop']] = NoopCompressor()
+
+
+def negotiate_compressors(requested):
+    """ Intersection of compressors requested by client in handshake and available on server.
+        Client order is kept, as client lists compressors by its preference.
+
+        Args:
+            requested (list): compressors names from 'compression' field of handshake
+        Returns:
+            list of str
+    """
+    if not isinstance(requested, (list, tuple)):
+        return []
+    return [name for name in requested if name in COMPRESSORS]
+
+
+def get_compressor(compressor_id):
+    compressor = COMPRESSORS_BY_ID.get(compressor_id)
+    if compressor is None:
+        raise CompressionError(f'Unsupported compressor id: {compressor_id}')
+    return compressor
+
+
+def decompress_message(buffer):
+    """ Unpack body of OP_COMPRESSED message
+
+        Args:
+            buffer (bytes): message without header
+        Returns:
+            tuple: original opcode, uncompressed message (without header), compressor id
+        Raises:
+            CompressionError
+    """
+    if len(buffer) < 9:
+        raise CompressionError('OP_COMPRESSED message is too short')
+    original_opcode, uncompressed_size, compressor_id = struct.unpack('<iiB', buffer[:9])
+    try:
+        compressor = get_compressor(compressor_id)
+        msg_bytes = compressor.decompress(buffer[9:])
+    except CompressionError as e:
+        e.original_opcode = original_opcode
+        raise
+    except Exception as e:
+        raise CompressionError(f'Can not decompress message: {e}', original_opcode)
+    if len(msg_bytes) != uncompressed_size:
+        raise CompressionError(
+            f'Wrong size of uncompressed message: expected {uncompressed_size}, got {len(msg_bytes)}',
+            original_opcode
+        )
+    return original_opcode, msg_bytes, compressor_id
+
+
+def compress_message(message, compressor_id, op_compressed):
+    """ Wrap full message (with header) into OP_COMPRESSED message
+
+        Args:
+            message (bytes): message with header
+            compressor_id (int): id of compressor which must be used
+            op_compressed (int): OP_COMPRESSED opcode
+        Returns:
+            bytes
+    """
+    _length, reply_id, response_to, original_opcode = struct.unpack('<iiii', message[:16])
+    body = message[16:]
+    compressor = get_compressor(compressor_id)
+    data = struct.pack('<iiB', original_opcode, len(body), compressor_id) + compressor.compress(body)
+    header = struct.pack('<iiii', 16 + len(data), reply_id, response_to, op_compressed)
+    return header + data
@@ -0,0 +1,65 @@
+from collections import OrderedDict
+
+
+DEFAULT_MAX_PREPARED_STATEMENTS = 1000
+
+
+class PreparedStatements():
+    """ Registry of session prepared statements.
+
+        Ids are never reused within the session: client may still hold id of evicted statement,
+        and it must get an error instead of executing another statement.
+        If the registry is full, least recently used statement is evicted.
+        Each entry is a dict:
+            type: type of statement
+            statement: prepared statement
+            fetched: count of rows sent to the client
+    """
+
+    def __init__(self, max_statements=DEFAULT_MAX_PREPARED_STATEMENTS):
+        self.max_statements = max_statements
+        self._statements = OrderedDict()
+        self._next_id = 1
+
+    def _evict(self):
+        self._statements.popitem(last=False)
+
+    def register(self, statement, type=None):
+        if len(self._statements) >= self.max_statements:
+            self._evict()
+        stmt_id = self._next_id
+        self._next_id += 1
+        self._statements[stmt_id] = dict(
+            type=type,
+            statement=statement,
+            fetched=0
+        )
+        return stmt_id
+
+    def unregister(self, stmt_id):
+        # COM_STMT_CLOSE of unknown statement is ignored, as it has no response
+        self._statements.pop(stmt_id, None)
+
+    def __getitem__(self, stmt_id):
+        stmt = self._statements.get(stmt_id)
+        if stmt is None:
+            raise Exception(f'Unknown prepared statement handler ({stmt_id})')
+        self._statements.move_to_end(stmt_id)
+        return stmt
+
+    def __delitem__(self, stmt_id):
+        self.unregister(stmt_id)
+
+    def __contains__(self, stmt_id):
+        return stmt_id in self._statements
+
+    def __len__(self):
+        return len(self._statements)
+
+    def __iter__(self):
+        return iter(list(self._statements.keys()))
+
+    def get(self, stmt_id, default=None):
+        if stmt_id not in self._statements:
+            return default
+        return self[stmt_id]
@@ -9,33 +9,27 @@
  *******************************************************
 """
 
+import weakref
+import threading
+from collections import OrderedDict
+
 from mindsdb.interfaces.ai_table.ai_table import AITableStore
 from mindsdb.api.mysql.mysql_proxy.datahub import init_datahub
 from mindsdb.api.mysql.mysql_proxy.utilities import log
+from mindsdb.api.mysql.mysql_proxy.controllers.prepared_statements import (
+    PreparedStatements,
+    DEFAULT_MAX_PREPARED_STATEMENTS
+)
 from mindsdb.utilities.config import Config
 from mindsdb.utilities.with_kwargs_wrapper import WithKWArgsWrapper
 
 
-class SessionController():
+class CompanyResources():
     '''
-    This class manages the server session
+    Objects which do not depend on session state, so they are created once per company and shared between sessions
     '''
 
-    def __init__(self, server, company_id=None) -> object:
-        """
-        Initialize the session
-        :param company_id:
-        """
-
-        self.username = None
-        self.auth = False
-        self.company_id = company_id
-        self.logging = log
-
-        self.integration = None
-        self.integration_type = None
-        self.database = None
-
+    def __init__(self, server, company_id):
         self.config = Config()
         self.ai_table = AITableStore(company_id=company_id)
 
@@ -58,27 +52,83 @@ class SessionController():
             company_id=company_id
         )
 
-        self.datahub = init_datahub(self)
 
-        self.prepared_stmts = {}
+# count of companies whose resources are kept for each server, least recently used are dropped
+MAX_CACHED_COMPANIES = 100
+
+# server -> OrderedDict(company_id -> CompanyResources), entries are dropped together with the server
+_company_resources = weakref.WeakKeyDictionary()
+_company_resources_lock = threading.Lock()
+
+
+def get_company_resources(server, company_id):
+    with _company_resources_lock:
+        server_resources = _company_resources.get(server)
+        if server_resources is None:
+            server_resources = OrderedDict()
+            _company_resources[server] = server_resources
+        resources = server_resources.get(company_id)
+        if resources is None:
+            resources = CompanyResources(server, company_id)
+            server_resources[company_id] = resources
+            if len(server_resources) > MAX_CACHED_COMPANIES:
+                server_resources.popitem(last=False)
+        else:
+            server_resources.move_to_end(company_id)
+    return resources
+
+
+class SessionController():
+    '''
+    This class manages the server session
+    '''
+
+    def __init__(self, server, company_id=None) -> object:
+        """
+        Initialize the session
+        :param company_id:
+        """
+
+        self.username = None
+        self.auth = False
+        self.company_id = company_id
+        self.logging = log
+
+        self.integration = None
+        self.integration_type = None
+        self.database = None
+
+        resources = get_company_resources(server, company_id)
+        self.config = resources.config
+        self.ai_table = resources.ai_table
+        self.data_store = resources.data_store
+        self.model_interface = resources.model_interface
+        self.datasource_interface = resources.datasource_interface
+        self.view_interface = resources.view_interface
+
+        # datahub is created on first use, as many connections never query data
+        self._datahub = None
+
+        self.prepared_stmts = PreparedStatements(
+            max_statements=self.config['api']['mysql'].get('max_prepared_statements', DEFAULT_MAX_PREPARED_STATEMENTS)
+        )
         self.packet_sequence_number = 0
 
+    @property
+    def datahub(self):
+        if self._datahub is None:
+            self._datahub = init_datahub(self)
+        return self._datahub
+
+    @datahub.setter
+    def datahub(self, value):
+        self._datahub = value
+
     def inc_packet_sequence_number(self):
         self.packet_sequence_number = (self.packet_sequence_number + 1) % 256
 
     def register_stmt(self, statement):
-        i = 1
-        while i in self.prepared_stmts and i < 100:
-            i = i + 1
-        if i == 100:
-            raise Exception('Too many unclosed queries')
-
-        self.prepared_stmts[i] = dict(
-            type=None,
-            statement=statement,
-            fetched=0
-        )
-        return i
+        return self.prepared_stmts.register(statement)
 
     def unregister_stmt(self, stmt_id):
-        del self.prepared_stmts[stmt_id]
+        self.prepared_stmts.unregister(stmt_id)
@@ -0,0 +1,77 @@
+""" Dataset analysis time: full datasource vs sample, as in ModelController.analyse_dataset.
+
+    Usage:
+        python3 tests/benchmarks/analyse_dataset.py --rows 10000000 --sample_size 100000
+"""
+import os
+import time
+import argparse
+import tempfile
+
+import numpy as np
+import pandas as pd
+import lightwood
+
+from mindsdb.interfaces.datastore.chunked_reader import iter_chunks, ReservoirSampler
+
+
+class CsvDS():
+    def __init__(self, path):
+        self.path = path
+        self._df = None
+
+    @property
+    def df(self):
+        if self._df is None:
+            self._df = pd.read_csv(self.path)
+        return self._df
+
+
+def make_csv(path, rows):
+    rng = np.random.default_rng(0)
+    chunk_size = 1000000
+    for i in range(0, rows, chunk_size):
+        n = min(chunk_size, rows - i)
+        pd.DataFrame({
+            'number_of_rooms': rng.integers(0, 5, n),
+            'sqft': rng.integers(100, 3000, n),
+            'location': rng.choice(['good', 'great', 'poor'], n),
+            'days_on_market': rng.integers(0, 100, n),
+            'rental_price': rng.random(n) * 5000
+        }).to_csv(path, mode='a', header=(i == 0), index=False)
+
+
+def timed(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return result, round(time.perf_counter() - started, 3)
+
+
+def analyse_sample(ds, sample_size):
+    sampler = ReservoirSampler(sample_size)
+    for chunk in iter_chunks(ds):
+        sampler.add(chunk)
+    return lightwood.analyze_dataset(sampler.sample)
+
+
+parser = argparse.ArgumentParser(description='Dataset analysis benchmark.')
+parser.add_argument('--rows', type=int, default=10000000, help='rows in generated csv')
+parser.add_argument('--sample_size', type=int, default=100000)
+parser.add_argument('--skip_full', action='store_true', help='do not analyse whole dataset')
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    path = os.path.join(tempfile.mkdtemp(), 'analyse_dataset.csv')
+    make_csv(path, args.rows)
+    try:
+        ds = CsvDS(path)
+        _, load_time = timed(lambda: ds.df)
+        print(f'csv load: {load_time}s')
+        _, sample_time = timed(analyse_sample, ds, args.sample_size)
+        print(f'sampled analysis ({args.sample_size} rows): {sample_time}s')
+        if not args.skip_full:
+            _, full_time = timed(lightwood.analyze_dataset, ds.df)
+            print(f'full analysis ({args.rows} rows): {full_time}s')
+    finally:
+        os.remove(path)
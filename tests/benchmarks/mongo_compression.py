@@ -0,0 +1,88 @@
+""" Throughput of OP_COMPRESSED compressors on prediction-like payloads.
+
+    Usage:
+        python3 tests/benchmarks/mongo_compression.py --rows 1000 --repeat 20
+"""
+import time
+import random
+import argparse
+
+import bson
+
+from mindsdb.api.mongo.utilities.compression import (
+    COMPRESSORS,
+    COMPRESSOR_IDS,
+    compress_message,
+    decompress_message
+)
+
+OP_MSG = 2013
+OP_COMPRESSED = 2012
+
+
+def make_payload(rows):
+    """ OP_MSG-like reply of 'find' with '_explain' columns, as mongo 'find' responder returns it """
+    data = []
+    for i in range(rows):
+        value = random.random() * 1000
+        data.append({
+            'sqft': random.randint(100, 2000),
+            'location': random.choice(['good', 'great', 'poor']),
+            'rental_price': value,
+            'rental_price_original': None,
+            'rental_price_min': value * 0.9,
+            'rental_price_max': value * 1.1,
+            'rental_price_confidence': 0.95,
+            'rental_price_explain': {
+                'predicted_value': value,
+                'confidence': 0.95,
+                'anomaly': None,
+                'truth': None,
+                'confidence_lower_bound': value * 0.9,
+                'confidence_upper_bound': value * 1.1
+            }
+        })
+    body = b'\x00\x00\x00\x00\x00' + bson.BSON.encode({
+        'cursor': {'id': 0, 'ns': 'mindsdb.$cmd.home_rentals', 'firstBatch': data},
+        'ok': 1
+    })
+    header = (16 + len(body)).to_bytes(4, 'little', signed=True) + b'\x00' * 8 + OP_MSG.to_bytes(4, 'little')
+    return header + body
+
+
+def run(rows, repeat):
+    message = make_payload(rows)
+    size_mb = len(message) / pow(2, 20)
+    print(f'message size: {round(size_mb, 3)} MB, rows: {rows}')
+    print(f"{'compressor':<10} {'ratio':>8} {'compress MB/s':>15} {'decompress MB/s':>17}")
+    for name in COMPRESSORS:
+        compressor_id = COMPRESSOR_IDS[name]
+
+        started = time.perf_counter()
+        for _ in range(repeat):
+            compressed = compress_message(message, compressor_id, OP_COMPRESSED)
+        compress_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for _ in range(repeat):
+            _, uncompressed, _ = decompress_message(compressed[16:])
+        decompress_time = time.perf_counter() - started
+
+        assert uncompressed == message[16:]
+
+        ratio = len(message) / len(compressed)
+        print(
+            f'{name:<10} {round(ratio, 2):>8} '
+            f'{round(size_mb * repeat / compress_time, 2):>15} '
+            f'{round(size_mb * repeat / decompress_time, 2):>17}'
+        )
+
+
+parser = argparse.ArgumentParser(description='OP_COMPRESSED compressors throughput.')
+parser.add_argument('--rows', type=int, default=1000, help='number of rows in prediction reply')
+parser.add_argument('--repeat', type=int, default=20, help='number of compress/decompress rounds')
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    run(args.rows, args.repeat)
@@ -0,0 +1,59 @@
+""" Latency of connection setup and first query of MySQL API.
+
+    Usage:
+        python3 tests/benchmarks/mysql_connection_setup.py --port 47335 --count 200
+"""
+import time
+import argparse
+import statistics
+
+import mysql.connector
+
+
+def connect(args):
+    return mysql.connector.connect(
+        host=args.host,
+        port=args.port,
+        user=args.user,
+        passwd=args.password,
+        database=args.database,
+        ssl_disabled=True
+    )
+
+
+def run(args):
+    connect_times = []
+    query_times = []
+    for _ in range(args.count):
+        started = time.perf_counter()
+        con = connect(args)
+        connected = time.perf_counter()
+        cur = con.cursor()
+        cur.execute('select 1')
+        cur.fetchall()
+        queried = time.perf_counter()
+        cur.close()
+        con.close()
+        connect_times.append((connected - started) * 1000)
+        query_times.append((queried - connected) * 1000)
+
+    for name, values in (('connect', connect_times), ('first query', query_times)):
+        values.sort()
+        print(
+            f'{name:<12} ms: mean={round(statistics.mean(values), 2)} '
+            f'p50={round(values[len(values) // 2], 2)} '
+            f'p99={round(values[int(len(values) * 0.99) - 1], 2)}'
+        )
+
+
+parser = argparse.ArgumentParser(description='MySQL API connection setup latency.')
+parser.add_argument('--host', type=str, default='127.0.0.1')
+parser.add_argument('--port', type=int, default=47335)
+parser.add_argument('--user', type=str, default='mindsdb')
+parser.add_argument('--password', type=str, default='')
+parser.add_argument('--database', type=str, default='mindsdb')
+parser.add_argument('--count', type=int, default=200, help='number of connections')
+
+
+if __name__ == '__main__':
+    run(parser.parse_args())
@@ -0,0 +1,260 @@
+""" Prediction latency on synthetic datasets, without docker or running APIs.
+
+    For each dataset a tiny predictor is trained and saved the same way as by learn of mindsdb
+    (record in sqlite database of temporary storage dir, code generated by run_generate, pickle in
+    paths['predictors']), then ModelController.predict is measured:
+        cold_load       - first prediction of one row, including load of the predictor to the cache
+        single_row      - warm prediction of one row; for timeseries it is incremental prediction of one
+                          new row, history of the group is passed once before the measurement
+        batch_1k        - warm prediction of 1000 rows
+        batch_1k_new    - same with pred_format 'new', i.e. without formatting of rows
+        batch_100k      - warm prediction of 100000 rows
+
+    Each case has per-stage breakdown, taken from stage timers of mindsdb.utilities.metrics
+    (predict.db_lookup, predict.deserialize, predict.build_df, predict.inference, predict.format, ...).
+    Prediction cache is disabled, so each round runs the model.
+    Results are written as json, and may be compared with results of other commit.
+
+    Usage:
+        python3 tests/benchmarks/prediction_latency.py --output results.json
+        python3 tests/benchmarks/prediction_latency.py --output new.json --compare old.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import datetime
+import statistics
+import subprocess
+
+import numpy as np
+import pandas as pd
+
+parser = argparse.ArgumentParser(description='Prediction latency benchmark.')
+parser.add_argument('--datasets', type=str, default='tabular,timeseries', help='comma separated datasets')
+parser.add_argument('--train_rows', type=int, default=2000)
+parser.add_argument('--rounds', type=int, default=20)
+parser.add_argument('--skip_100k', action='store_true', help='do not measure batch of 100000 rows')
+parser.add_argument('--output', type=str, default='prediction_latency.json')
+parser.add_argument('--compare', type=str, default=None, help='json with results of previous run')
+args = parser.parse_args()
+# mindsdb parses arguments of the process on import
+sys.argv = sys.argv[:1]
+
+# separate storage and database, metrics are enabled for the stage breakdown
+STORAGE_DIR = tempfile.mkdtemp(prefix='mindsdb_benchmark_')
+CONFIG_PATH = os.path.join(STORAGE_DIR, 'config.json')
+with open(CONFIG_PATH, 'wt') as f:
+    json.dump({
+        'metrics': {'enabled': True},
+        'prediction_cache': {'enabled': False},
+        'warm_up': {'enabled': False}
+    }, f)
+os.environ['MINDSDB_CONFIG_PATH'] = CONFIG_PATH
+os.environ['MINDSDB_STORAGE_DIR'] = STORAGE_DIR
+os.environ['MINDSDB_DB_CON'] = f"sqlite:///{os.path.join(STORAGE_DIR, 'mindsdb.sqlite3.db')}?check_same_thread=False&timeout=30"
+
+import lightwood  # noqa: E402
+from lightwood.api.types import ProblemDefinition  # noqa: E402
+
+import mindsdb.interfaces.storage.db as db  # noqa: E402
+from mindsdb.interfaces.model import code_cache  # noqa: E402
+from mindsdb.interfaces.model.learn_process import run_generate  # noqa: E402
+from mindsdb.interfaces.model.model_controller import ModelController  # noqa: E402
+from mindsdb.utilities.config import Config  # noqa: E402
+from mindsdb.utilities.metrics import metrics  # noqa: E402
+
+
+def make_tabular(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'number_of_rooms': rng.integers(0, 5, rows),
+        'sqft': rng.integers(100, 3000, rows),
+        'location': rng.choice(['good', 'great', 'poor'], rows),
+        'days_on_market': rng.integers(0, 100, rows)
+    })
+    df['rental_price'] = df['sqft'] * 1.5 + df['number_of_rooms'] * 300 + rng.normal(0, 100, rows)
+    return df
+
+
+def make_timeseries(rows, groups=5, seed=0):
+    rng = np.random.default_rng(seed)
+    per_group = rows // groups
+    frames = []
+    for g in range(groups):
+        order = np.arange(per_group)
+        frames.append(pd.DataFrame({
+            'group': f'g{g}',
+            'order': order,
+            'x': rng.random(per_group),
+            'y': np.sin(order / 10 + g) * 10 + rng.normal(0, 0.5, per_group)
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+DATASETS = {
+    'tabular': {
+        'make': make_tabular,
+        'problem_definition': {'target': 'rental_price', 'time_aim': 20}
+    },
+    'timeseries': {
+        'make': make_timeseries,
+        'problem_definition': {
+            'target': 'y',
+            'time_aim': 20,
+            'timeseries_settings': {
+                'order_by': ['order'],
+                'group_by': ['group'],
+                'horizon': 1,
+                'window': 10,
+                'use_previous_target': True
+            }
+        }
+    }
+}
+
+
+def stage_sums():
+    return {stage: record['sum'] for stage, record in metrics.snapshot()['durations'].items()}
+
+
+def run_case(func, rounds, before_round=None):
+    """ func is called once in each round. Returns summary of total and each stage time, in ms """
+    totals = []
+    stages = {}
+    for _ in range(rounds):
+        if before_round is not None:
+            before_round()
+        stages_before = stage_sums()
+        started = time.perf_counter()
+        func()
+        totals.append((time.perf_counter() - started) * 1000)
+        for stage, value in stage_sums().items():
+            spent = value - stages_before.get(stage, 0)
+            if spent > 0:
+                stages.setdefault(stage, []).append(spent * 1000)
+    return {
+        'rounds': rounds,
+        'median_ms': round(statistics.median(totals), 3),
+        'min_ms': round(min(totals), 3),
+        'max_ms': round(max(totals), 3),
+        'stages_median_ms': {k: round(statistics.median(v), 3) for k, v in stages.items()}
+    }
+
+
+def train_predictor(name, train_df, problem_definition):
+    """ Create predictor record and pickle the same way as learn does, returns name of the predictor """
+    problem_definition = ProblemDefinition.from_dict(problem_definition)
+    predictor_name = f'benchmark_{name}'
+    predictor_record = db.Predictor(
+        company_id=None,
+        name=predictor_name,
+        to_predict=problem_definition.target,
+        learn_args=problem_definition.to_dict(),
+        data={'name': predictor_name}
+    )
+    db.session.add(predictor_record)
+    db.session.commit()
+
+    run_generate(train_df, problem_definition, predictor_record.id)
+    db.session.refresh(predictor_record)
+    predictor = code_cache.predictor_from_code(predictor_record.code)
+    predictor.learn(train_df)
+    predictor.save(os.path.join(
+        Config()['paths']['predictors'], f'predictor_{predictor_record.company_id}_{predictor_record.id}'
+    ))
+    predictor_record.dtype_dict = predictor.dtype_dict
+    db.session.commit()
+    return predictor_name
+
+
+def benchmark_dataset(name, train_rows, rounds, skip_100k):
+    dataset = DATASETS[name]
+    problem_definition = dataset['problem_definition']
+    target = problem_definition['target']
+    train_df = dataset['make'](train_rows)
+    predictor_name = train_predictor(name, train_df, problem_definition)
+
+    controller = ModelController(ray_based=False)
+    when_data = dataset['make'](100000, seed=1)
+    if name != 'timeseries':
+        # for timeseries values of target are history of groups
+        when_data = when_data.drop(columns=[target])
+    results = {}
+
+    def predict(records, pred_format='dict&explain', incremental=False):
+        controller.predict(predictor_name, records, pred_format, company_id=None, incremental=incremental)
+
+    one_row = when_data.iloc[:1].to_dict(orient='records')
+    results['cold_load'] = run_case(
+        lambda: predict(one_row),
+        max(rounds // 5, 1),
+        before_round=lambda: controller._uncache_predictor(f'None@@@@@{predictor_name}')
+    )
+
+    if name == 'timeseries':
+        # history of one group is sent once, then each round sends next row of the group
+        tss = problem_definition['timeseries_settings']
+        group_rows = when_data[when_data['group'] == 'g0'].to_dict(orient='records')
+        predict(group_rows[:tss['window']], incremental=True)
+        new_rows = iter(group_rows[tss['window']:])
+        results['single_row'] = run_case(lambda: predict([next(new_rows)], incremental=True), rounds)
+    else:
+        results['single_row'] = run_case(lambda: predict(one_row), rounds)
+
+    records_1k = when_data.iloc[:1000].to_dict(orient='records')
+    results['batch_1k'] = run_case(lambda: predict(records_1k), rounds)
+    results['batch_1k_new'] = run_case(lambda: predict(records_1k, 'new'), rounds)
+    if not skip_100k:
+        records_100k = when_data.iloc[:100000].to_dict(orient='records')
+        results['batch_100k'] = run_case(lambda: predict(records_100k), max(rounds // 10, 1))
+    return results
+
+
+def get_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)), stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def compare(results, old_results):
+    print(f"\ncompared with {old_results.get('commit')}:")
+    for dataset, cases in results['results'].items():
+        for case, summary in cases.items():
+            old = old_results['results'].get(dataset, {}).get(case)
+            if old is None:
+                continue
+            ratio = summary['median_ms'] / old['median_ms'] if old['median_ms'] > 0 else float('nan')
+            print(f"  {dataset}.{case}: {old['median_ms']}ms -> {summary['median_ms']}ms (x{ratio:.2f})")
+
+
+if __name__ == '__main__':
+    db.Base.metadata.create_all(db.engine)
+    results = {
+        'commit': get_commit(),
+        'created_at': str(datetime.datetime.now()),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'lightwood': lightwood.__version__,
+        'params': {'train_rows': args.train_rows, 'rounds': args.rounds},
+        'results': {}
+    }
+    for name in args.datasets.split(','):
+        print(f'{name}: training predictor on {args.train_rows} rows')
+        results['results'][name] = benchmark_dataset(name, args.train_rows, args.rounds, args.skip_100k)
+        for case, summary in results['results'][name].items():
+            print(f"  {case}: {summary['median_ms']}ms {summary['stages_median_ms']}")
+
+    with open(args.output, 'wt') as f:
+        json.dump(results, f, indent=4)
+    print(f'results are written to {args.output}')
+
+    if args.compare is not None:
+        with open(args.compare, 'rt') as f:
+            compare(results, json.load(f))
@@ -0,0 +1,76 @@
+""" Time from launch of 'python -m mindsdb' until APIs accept connections.
+
+    Usage:
+        python3 tests/benchmarks/startup_time.py --config path/to/config.json --api http,mysql --repeat 3
+"""
+import sys
+import json
+import time
+import socket
+import argparse
+import subprocess
+
+import psutil
+
+
+def is_port_open(host, port):
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.settimeout(0.1)
+        return sock.connect_ex((host, int(port))) == 0
+
+
+def stop_process(process):
+    parent = psutil.Process(process.pid)
+    for child in parent.children(recursive=True):
+        try:
+            child.terminate()
+        except psutil.NoSuchProcess:
+            pass
+    process.terminate()
+    process.wait()
+
+
+def measure_startup(config_path, api_arr, ports, timeout):
+    cmd = [sys.executable, '-m', 'mindsdb', f'--api={",".join(api_arr)}']
+    if config_path is not None:
+        cmd.append(f'--config={config_path}')
+
+    started = time.perf_counter()
+    process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    durations = {}
+    try:
+        while len(durations) < len(api_arr) and (time.perf_counter() - started) < timeout:
+            for api in api_arr:
+                if api not in durations and is_port_open('127.0.0.1', ports[api]):
+                    durations[api] = round(time.perf_counter() - started, 3)
+            time.sleep(0.05)
+    finally:
+        stop_process(process)
+    for api in api_arr:
+        durations.setdefault(api, None)
+    return durations
+
+
+parser = argparse.ArgumentParser(description='MindsDB APIs startup time.')
+parser.add_argument('--config', type=str, default=None, help='path to mindsdb config.json')
+parser.add_argument('--api', type=str, default='http,mysql', help='comma separated list of APIs')
+parser.add_argument('--repeat', type=int, default=3, help='number of launches')
+parser.add_argument('--timeout', type=int, default=300, help='max seconds to wait for each launch')
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    api_arr = args.api.split(',')
+
+    ports = {'http': 47334, 'mysql': 47335, 'mongodb': 47336}
+    if args.config is not None:
+        with open(args.config, 'r') as fp:
+            user_config = json.load(fp)
+        for api, api_config in user_config.get('api', {}).items():
+            if 'port' in api_config:
+                ports[api] = api_config['port']
+
+    results = [measure_startup(args.config, api_arr, ports, args.timeout) for _ in range(args.repeat)]
+    for api in api_arr:
+        values = [x[api] for x in results]
+        print(f'{api} API started in (seconds): {values}')
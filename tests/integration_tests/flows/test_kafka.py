@@ -41,6 +41,14 @@ STREAM_OUT_OL = f"test_stream_out_ol_{STREAM_SUFFIX}"
 DEFAULT_PREDICTOR = "kafka_predictor"
 TS_PREDICTOR = "kafka_ts_predictor"
 DS_NAME = "kafka_test_ds"
+BATCH_STREAM = f"test_batch_stream_{STREAM_SUFFIX}"
+
+
+def predict_batch(records):
+    """ Prediction of StreamWorker which fails on batches with 'fail' record """
+    if any(x['x'] == 'fail' for x in records):
+        raise Exception('can not predict')
+    return [dict(x, y=x['x'] * 2) for x in records]
 
 
 class KafkaTest(unittest.TestCase):
@@ -250,6 +258,68 @@ class KafkaTest(unittest.TestCase):
         self.assertEqual(res.status_code, 200,
                          f"expected to get {PREDICTOR_NAME} info, but have {res.text}")
 
+    def test_batch_stream_ack_and_poison_messages(self):
+        print(f"\nExecuting {self._testMethodName}")
+        from mindsdb.interfaces.stream.streams import KafkaBatchStream
+        from mindsdb.interfaces.stream.stream_worker import StreamWorker
+
+        # offsets are committed only by consumer with group
+        group_connection = dict(CONNECTION_PARAMS, advanced={
+            'consumer': {'auto_offset_reset': 'earliest', 'group_id': BATCH_STREAM}
+        })
+        producer = kafka.KafkaProducer(bootstrap_servers=CONNECTION_PARAMS['bootstrap_servers'])
+        for x in range(10):
+            producer.send(f'{BATCH_STREAM}_in', json.dumps({'x': x}).encode('utf-8'))
+        # message which is not json, and record which can not be predicted
+        producer.send(f'{BATCH_STREAM}_in', b'not json')
+        producer.send(f'{BATCH_STREAM}_in', json.dumps({'x': 'fail'}).encode('utf-8'))
+        producer.flush()
+        producer.close()
+
+        stream_in = KafkaBatchStream(f'{BATCH_STREAM}_in', group_connection, 'r')
+        stream_out = KafkaBatchStream(f'{BATCH_STREAM}_out', CONNECTION_PARAMS, 'w')
+        dead_letter = KafkaBatchStream(f'{BATCH_STREAM}_dead_letter', CONNECTION_PARAMS, 'w')
+        worker = StreamWorker(
+            BATCH_STREAM, stream_in, stream_out, predict_batch, batch_size=5, batch_timeout=1,
+            dead_letter_stream=dead_letter, max_retries=1
+        ).start()
+        start_time = time.time()
+        while time.time() - start_time < 60 and worker.get_status()['records_read'] < 12:
+            time.sleep(1)
+        time.sleep(5)
+        worker.stop()
+        worker.join()
+        status = worker.get_status()
+        for stream in (stream_in, stream_out, dead_letter):
+            stream.close()
+
+        def read_all(topic):
+            stream = KafkaBatchStream(topic, CONNECTION_PARAMS, 'r')
+            records, _ = stream.read_batch(100, 10)
+            stream.close()
+            return records
+
+        output = read_all(f'{BATCH_STREAM}_out')
+        failed = read_all(f'{BATCH_STREAM}_dead_letter')
+        # whole batch of the record which can not be predicted is sent to dead letter topic
+        self.assertEqual(len(output) + len(failed), 12)
+        self.assertEqual(status['records_written'], len(output))
+        self.assertEqual(status['records_failed'], len(failed))
+        self.assertTrue(all(x['y'] == x['x'] * 2 for x in output))
+        self.assertTrue(any('mindsdb_raw' in x for x in failed))
+        self.assertTrue(any(x.get('x') == 'fail' for x in failed))
+        self.assertTrue(all('mindsdb_error' in x for x in failed))
+
+        # all batches are acked: committed offsets of the group are at the end of the topic
+        consumer = kafka.KafkaConsumer(
+            bootstrap_servers=CONNECTION_PARAMS['bootstrap_servers'], group_id=BATCH_STREAM
+        )
+        partitions = [kafka.TopicPartition(f'{BATCH_STREAM}_in', p) for p in consumer.partitions_for_topic(f'{BATCH_STREAM}_in')]
+        end_offsets = consumer.end_offsets(partitions)
+        for partition in partitions:
+            self.assertEqual(consumer.committed(partition) or 0, end_offsets[partition])
+        consumer.close()
+
 
 if __name__ == '__main__':
     try:
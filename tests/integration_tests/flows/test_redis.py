@@ -41,6 +41,14 @@ TS_PREDICTOR = "redis_ts_predictor"
 DS_NAME = "redis_test_ds"
 TS_DS_NAME = "ts_redis_test_ds"
 NORMAL_STREAM_NAME = f'normal_stream_{STREAM_SUFFIX}'
+BATCH_STREAM = f"test_batch_stream_{STREAM_SUFFIX}"
+
+
+def predict_batch(records):
+    """ Prediction of StreamWorker which fails on batches with 'fail' record """
+    if any(x['x'] == 'fail' for x in records):
+        raise Exception('can not predict')
+    return [dict(x, y=x['x'] * 2) for x in records]
 
 
 class RedisTest(unittest.TestCase):
@@ -284,6 +292,44 @@ class RedisTest(unittest.TestCase):
 
         self.assertEqual(len(list(stream_out.read())), 2)
 
+    def test_batch_stream_ack_and_poison_messages(self):
+        print(f"\nExecuting {self._testMethodName}")
+        from mindsdb.interfaces.stream.streams import RedisBatchStream
+        from mindsdb.interfaces.stream.stream_worker import StreamWorker
+
+        stream_in = RedisBatchStream(f'{BATCH_STREAM}_in', CONNECTION_PARAMS)
+        stream_out = RedisBatchStream(f'{BATCH_STREAM}_out', CONNECTION_PARAMS)
+        dead_letter = RedisBatchStream(f'{BATCH_STREAM}_dead_letter', CONNECTION_PARAMS)
+
+        stream_in.write_batch([{'x': x} for x in range(10)])
+        # message which is not json, and record which can not be predicted
+        stream_in.client.xadd(f'{BATCH_STREAM}_in', {'': 'not json'})
+        stream_in.write_batch([{'x': 'fail'}])
+
+        worker = StreamWorker(
+            BATCH_STREAM, stream_in, stream_out, predict_batch, batch_size=5, batch_timeout=1,
+            dead_letter_stream=dead_letter, max_retries=1
+        ).start()
+        start_time = time.time()
+        while time.time() - start_time < 30 and worker.get_status()['records_read'] < 12:
+            time.sleep(1)
+        time.sleep(5)
+        worker.stop()
+        worker.join()
+
+        output, _ = RedisBatchStream(f'{BATCH_STREAM}_out', CONNECTION_PARAMS).read_batch(100, 1)
+        failed, _ = RedisBatchStream(f'{BATCH_STREAM}_dead_letter', CONNECTION_PARAMS).read_batch(100, 1)
+        self.assertEqual(sorted(x['y'] for x in output), [x * 2 for x in range(10)])
+        self.assertEqual(len(failed), 2)
+        self.assertTrue(any('mindsdb_raw' in x for x in failed))
+        self.assertTrue(any(x.get('x') == 'fail' for x in failed))
+        self.assertTrue(all('mindsdb_error' in x for x in failed))
+        # all batches are acked
+        self.assertEqual(stream_in.get_lag(), 0)
+        status = worker.get_status()
+        self.assertEqual(status['records_written'], 10)
+        self.assertEqual(status['records_failed'], 2)
+
     def test_delete_stream_http_api(self):
         print(f"\nExecuting {self._testMethodName}")
         url = f'{HTTP_API_ROOT}/streams/{NORMAL_STREAM_NAME}'
@@ -0,0 +1,123 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from mindsdb.interfaces.storage.artifacts import ArtifactStore, LocalDirBackend
+
+
+class MemoryBackend():
+    """ Backend which, like permanent storage, keeps blobs of each scope separately """
+    scoped_blobs = True
+
+    def __init__(self):
+        self.blobs = {}
+        self.manifests = {}
+
+    def has_blob(self, sha, scope):
+        return False
+
+    def put_blob(self, sha, src_path, scope):
+        with open(src_path, 'rb') as f:
+            self.blobs[(scope, sha)] = f.read()
+
+    def get_blob(self, sha, dst_path, scope):
+        with open(dst_path, 'wb') as f:
+            f.write(self.blobs[(scope, sha)])
+
+    def delete_blob(self, sha, scope):
+        self.blobs.pop((scope, sha), None)
+
+    def get_manifest(self, name):
+        return self.manifests.get(name)
+
+    def put_manifest(self, name, manifest):
+        self.manifests[name] = manifest
+
+    def delete_manifest(self, name):
+        self.manifests.pop(name, None)
+
+    def list_manifests(self, scope):
+        return [x for x in self.manifests if x.startswith(f'{scope}_')]
+
+    def delete_legacy(self, name):
+        pass
+
+
+class ArtifactStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.config = {
+            'paths': {'cache': os.path.join(self.root, 'cache')},
+            'artifacts': {'part_size': 1000, 'cache_size': 10 ** 9}
+        }
+        self.files_dir = os.path.join(self.root, 'files')
+        os.makedirs(self.files_dir)
+        patcher = mock.patch('mindsdb.interfaces.storage.artifacts.Config', return_value=self.config)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(shutil.rmtree, self.root)
+
+    def write_file(self, name, data):
+        with open(os.path.join(self.files_dir, name), 'wb') as f:
+            f.write(data)
+
+    def read_file(self, name):
+        with open(os.path.join(self.files_dir, name), 'rb') as f:
+            return f.read()
+
+    def test_shared_blobs_are_deleted_with_last_reference(self):
+        backend = LocalDirBackend(os.path.join(self.root, 'remote'))
+        store = ArtifactStore(backend)
+        common = os.urandom(3000)
+        self.write_file('predictor_1_1', common + os.urandom(1000))
+        self.write_file('predictor_1_2', common + os.urandom(1000))
+        store.put('predictor_1_1', self.files_dir)
+        store.put('predictor_1_2', self.files_dir)
+        self.assertEqual(len(os.listdir(backend.blobs_dir)), 5)
+
+        store.delete('predictor_1_1')
+        self.assertEqual(len(os.listdir(backend.blobs_dir)), 4)
+        os.remove(os.path.join(self.files_dir, 'predictor_1_2'))
+        shutil.rmtree(store.blobs_dir)
+        os.makedirs(store.blobs_dir)
+        self.assertTrue(store.get('predictor_1_2', self.files_dir))
+        self.assertEqual(self.read_file('predictor_1_2')[:3000], common)
+
+        store.delete('predictor_1_2')
+        self.assertEqual(os.listdir(backend.blobs_dir), [])
+
+    def test_replaced_parts_are_deleted(self):
+        backend = LocalDirBackend(os.path.join(self.root, 'remote'))
+        store = ArtifactStore(backend)
+        data = os.urandom(4000)
+        self.write_file('predictor_1_1', data)
+        store.put('predictor_1_1', self.files_dir)
+        self.write_file('predictor_1_1', data[:3000] + os.urandom(1000))
+        store.put('predictor_1_1', self.files_dir)
+        self.assertEqual(len(os.listdir(backend.blobs_dir)), 4)
+        # local copy is current, nothing is downloaded
+        self.assertFalse(store.get('predictor_1_1', self.files_dir))
+
+    def test_blobs_of_other_scope_are_kept(self):
+        backend = MemoryBackend()
+        store = ArtifactStore(backend)
+        data = os.urandom(2000)
+        self.write_file('predictor_1_1', data)
+        self.write_file('predictor_2_1', data)
+        store.put('predictor_1_1', self.files_dir)
+        store.put('predictor_2_1', self.files_dir)
+        self.assertEqual(len(backend.blobs), 4)
+
+        store.delete('predictor_1_1')
+        self.assertEqual(set(x[0] for x in backend.blobs), {'predictor_2'})
+        os.remove(os.path.join(self.files_dir, 'predictor_2_1'))
+        shutil.rmtree(store.blobs_dir)
+        os.makedirs(store.blobs_dir)
+        store.get('predictor_2_1', self.files_dir)
+        self.assertEqual(self.read_file('predictor_2_1'), data)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from mindsdb.interfaces.model import code_cache
+
+
+CODE = '''
+class Predictor():
+    value = {value}
+'''
+
+
+class CodeCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        patcher = mock.patch(
+            'mindsdb.interfaces.model.code_cache.Config', return_value={'paths': {'cache': self.root}}
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        code_cache._modules.clear()
+        code_cache._codes.clear()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_module_is_compiled_once_per_code(self):
+        module = code_cache.module_from_code(CODE.format(value=1))
+        self.assertIs(code_cache.module_from_code(CODE.format(value=1)), module)
+        self.assertEqual(code_cache.predictor_from_code(CODE.format(value=1)).value, 1)
+
+        other = code_cache.module_from_code(CODE.format(value=2))
+        self.assertIsNot(other, module)
+        self.assertEqual(other.Predictor.value, 2)
+        self.assertEqual(len(os.listdir(os.path.join(self.root, 'predictor_modules'))), 2)
+
+    def test_module_name_depends_on_lightwood_version(self):
+        module = code_cache.module_from_code(CODE.format(value=1))
+        with mock.patch.object(code_cache, 'lightwood_version', '0.0.0'):
+            self.assertNotEqual(code_cache.module_from_code(CODE.format(value=1)).__name__, module.__name__)
+
+    def test_least_recently_used_modules_are_evicted(self):
+        with mock.patch.object(code_cache, 'MAX_CACHED_MODULES', 2):
+            first = code_cache.module_from_code(CODE.format(value=1))
+            second = code_cache.module_from_code(CODE.format(value=2))
+            code_cache.module_from_code(CODE.format(value=1))
+            code_cache.module_from_code(CODE.format(value=3))
+            self.assertEqual(len(code_cache._modules), 2)
+            self.assertNotIn(second.__name__, code_cache._modules)
+            self.assertIs(code_cache.module_from_code(CODE.format(value=1)), first)
+
+    def test_code_from_json_ai_is_generated_once(self):
+        json_ai = mock.Mock()
+        json_ai.to_dict.return_value = {'encoders': {'x': 'Numeric'}}
+        with mock.patch.object(code_cache.lightwood, 'code_from_json_ai', return_value='code') as generate:
+            self.assertEqual(code_cache.code_from_json_ai(json_ai), 'code')
+            self.assertEqual(code_cache.code_from_json_ai(json_ai), 'code')
+            self.assertEqual(generate.call_count, 1)
+
+            # code is kept on disk for other processes
+            code_cache._codes.clear()
+            self.assertEqual(code_cache.code_from_json_ai(json_ai), 'code')
+            self.assertEqual(generate.call_count, 1)
+
+            json_ai.to_dict.return_value = {'encoders': {'x': 'Categorical'}}
+            code_cache.code_from_json_ai(json_ai)
+            self.assertEqual(generate.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import struct
+import unittest
+
+import bson
+
+from mindsdb.api.mongo.utilities.compression import (
+    COMPRESSORS,
+    COMPRESSOR_IDS,
+    CompressionError,
+    compress_message,
+    decompress_message,
+    negotiate_compressors
+)
+
+OP_MSG = 2013
+OP_COMPRESSED = 2012
+
+
+def make_op_msg(document, request_id=7):
+    data = struct.pack('<I', 0) + struct.pack('<b', 0) + bson.BSON.encode(document)
+    return struct.pack('<iiii', 16 + len(data), request_id, 3, OP_MSG) + data
+
+
+class CompressionTest(unittest.TestCase):
+    def test_round_trip(self):
+        message = make_op_msg({'find': 'predictors', 'filter': {'name': 'x' * 1000}})
+        for name in list(COMPRESSORS) + ['noop']:
+            compressor_id = COMPRESSOR_IDS[name]
+            compressed = compress_message(message, compressor_id, OP_COMPRESSED)
+            length, request_id, response_to, opcode = struct.unpack('<iiii', compressed[:16])
+            self.assertEqual(length, len(compressed))
+            self.assertEqual((request_id, response_to, opcode), (7, 3, OP_COMPRESSED))
+
+            original_opcode, body, used_id = decompress_message(compressed[16:])
+            self.assertEqual(original_opcode, OP_MSG)
+            self.assertEqual(used_id, compressor_id)
+            self.assertEqual(body, message[16:])
+
+    def test_unknown_compressor(self):
+        body = struct.pack('<iiB', OP_MSG, 10, 99) + b'0123456789'
+        with self.assertRaises(CompressionError) as cm:
+            decompress_message(body)
+        self.assertEqual(cm.exception.original_opcode, OP_MSG)
+
+    def test_wrong_size(self):
+        compressed = compress_message(make_op_msg({'ping': 1}), COMPRESSOR_IDS['zlib'], OP_COMPRESSED)
+        body = bytearray(compressed[16:])
+        struct.pack_into('<i', body, 4, 1)
+        with self.assertRaises(CompressionError):
+            decompress_message(bytes(body))
+
+    def test_negotiate(self):
+        self.assertEqual(negotiate_compressors(['unknown', 'zlib']), ['zlib'])
+        self.assertEqual(negotiate_compressors(None), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+from unittest import mock
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pandas as pd
+
+from mindsdb.interfaces.model import parallel_predict
+from mindsdb.interfaces.model.parallel_predict import ParallelPredictor, get_workers_count
+
+
+class FakePredictor():
+    def predict(self, df):
+        return pd.DataFrame({'prediction': df['x'] * 2, 'original_index': range(len(df))})
+
+
+class BrokenExecutor():
+    def submit(self, *args):
+        raise BrokenProcessPool('worker was killed')
+
+    def shutdown(self, wait=True):
+        pass
+
+
+class ParallelPredictorTest(unittest.TestCase):
+    def setUp(self):
+        # workers are threads of this process, predictor of the worker is set directly
+        patcher = mock.patch.object(parallel_predict, '_worker_predictor', FakePredictor())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(parallel_predict, 'get_workers_count', side_effect=lambda path, workers: workers)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_shards_are_predicted_in_order_of_input(self):
+        with mock.patch.object(ParallelPredictor, '_make_executor', side_effect=lambda: ThreadPoolExecutor(3)):
+            predictor = ParallelPredictor('path', 'code', workers=3)
+            predictions = predictor.predict(pd.DataFrame({'x': range(10)}))
+            predictor.close()
+        self.assertEqual(list(predictions['prediction']), [x * 2 for x in range(10)])
+        self.assertEqual(list(predictions['original_index']), list(range(10)))
+
+    def test_broken_pool_is_recreated(self):
+        executors = [BrokenExecutor(), ThreadPoolExecutor(3)]
+        with mock.patch.object(ParallelPredictor, '_make_executor', side_effect=executors) as make_executor:
+            predictor = ParallelPredictor('path', 'code', workers=3)
+            predictions = predictor.predict(pd.DataFrame({'x': range(5)}))
+            self.assertEqual(make_executor.call_count, 2)
+            self.assertIs(predictor.executor, executors[1])
+            self.assertEqual(list(predictions['prediction']), [x * 2 for x in range(5)])
+            predictor.close()
+
+    def test_pool_which_is_broken_again_is_replaced_and_error_is_raised(self):
+        executors = [BrokenExecutor(), BrokenExecutor(), ThreadPoolExecutor(3)]
+        with mock.patch.object(ParallelPredictor, '_make_executor', side_effect=executors):
+            predictor = ParallelPredictor('path', 'code', workers=3)
+            with self.assertRaises(BrokenProcessPool):
+                predictor.predict(pd.DataFrame({'x': range(5)}))
+            # next call uses new pool
+            self.assertIs(predictor.executor, executors[2])
+            self.assertEqual(len(predictor.predict(pd.DataFrame({'x': range(5)}))), 5)
+            predictor.close()
+
+
+class WorkersCountTest(unittest.TestCase):
+    def test_workers_fit_into_available_memory(self):
+        worker_memory = parallel_predict.WORKER_BASE_MEMORY + 2 * 1000
+        memory = mock.Mock(available=worker_memory * 2.5)
+        with mock.patch.object(parallel_predict.os.path, 'getsize', return_value=1000), \
+                mock.patch.object(parallel_predict.psutil, 'virtual_memory', return_value=memory), \
+                mock.patch.object(parallel_predict.os, 'cpu_count', return_value=32):
+            self.assertEqual(get_workers_count('path'), 2)
+            self.assertEqual(get_workers_count('path', 1), 1)
+            memory.available = worker_memory * 100
+            self.assertEqual(get_workers_count('path'), parallel_predict.MAX_DEFAULT_WORKERS)
+            self.assertEqual(get_workers_count('path', 8), 8)
+            memory.available = 0
+            self.assertEqual(get_workers_count('path'), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
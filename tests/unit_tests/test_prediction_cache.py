@@ -0,0 +1,69 @@
+import time
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from mindsdb.interfaces.model.prediction_cache import PredictionCache
+
+
+def make_cache(**predictions_config):
+    config = {'cache': {'type': 'local', 'predictions': dict(enabled=True, **predictions_config)}}
+    with mock.patch('mindsdb.interfaces.model.prediction_cache.Config', return_value=config):
+        return PredictionCache()
+
+
+class PredictionCacheTest(unittest.TestCase):
+    def test_hit_equals_miss(self):
+        cache = make_cache()
+        rows = [{'x': 1, 'y': 'a'}, {'x': 2, 'y': 'b'}]
+        keys = cache.get_keys(1, 10, '2021-01-01', 'dict', rows)
+        self.assertEqual(cache.get_many(keys), [None, None])
+
+        predicted = [
+            {'price': np.float64(1.5), 'price_confidence': 0.9, 'date': np.datetime64('2021-01-01')},
+            {'price': np.int64(2), 'price_confidence': None, 'date': np.datetime64('2021-01-02')}
+        ]
+        cache.put_many(keys, predicted)
+        cached = cache.get_many(keys)
+        self.assertEqual(cached, predicted)
+        for cached_row, row in zip(cached, predicted):
+            for key in row:
+                self.assertIs(type(cached_row[key]), type(row[key]))
+
+        # changing of returned row does not change the cache
+        cached[0]['price'] = 0
+        self.assertEqual(cache.get_many(keys)[0]['price'], 1.5)
+
+    def test_keys_depend_on_predictor_version(self):
+        cache = make_cache()
+        rows = [{'x': 1}]
+        cache.put_many(cache.get_keys(1, 10, 'v1', 'dict', rows), [{'y': 1}])
+        self.assertEqual(cache.get_many(cache.get_keys(1, 10, 'v2', 'dict', rows)), [None])
+
+    def test_size_and_ttl(self):
+        cache = make_cache(max_size=2)
+        keys = cache.get_keys(1, 10, 'v1', 'dict', [{'x': i} for i in range(3)])
+        cache.put_many(keys[:2], [0, 1])
+        # read moves entry to the end of eviction queue
+        cache.get_many(keys[:1])
+        cache.put_many(keys[2:], [2])
+        self.assertEqual(cache.get_many(keys), [0, None, 2])
+
+        cache.ttl = 0
+        cache.put_many(keys[:1], [0])
+        time.sleep(0.01)
+        self.assertEqual(cache.get_many(keys[:1]), [None])
+
+    def test_invalidate(self):
+        cache = make_cache()
+        rows = [{'x': 1}]
+        cache.put_many(cache.get_keys(1, 10, 'v1', 'dict', rows), [{'y': 1}])
+        cache.put_many(cache.get_keys(1, 11, 'v1', 'dict', rows), [{'y': 2}])
+        cache.invalidate(1, 10)
+        self.assertEqual(cache.get_many(cache.get_keys(1, 10, 'v1', 'dict', rows)), [None])
+        self.assertEqual(cache.get_many(cache.get_keys(1, 11, 'v1', 'dict', rows)), [{'y': 2}])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+import unittest
+
+from mindsdb.api.mysql.mysql_proxy.controllers.prepared_statements import PreparedStatements
+
+
+class PreparedStatementsTest(unittest.TestCase):
+    def test_ids_are_not_reused(self):
+        stmts = PreparedStatements(max_statements=10)
+        first = stmts.register('select 1')
+        second = stmts.register('select 2')
+        self.assertEqual((first, second), (1, 2))
+
+        stmts.unregister(first)
+        third = stmts.register('select 3')
+        self.assertEqual(third, 3)
+        self.assertNotIn(first, stmts)
+        with self.assertRaises(Exception):
+            stmts[first]
+
+    def test_least_recently_used_is_evicted(self):
+        stmts = PreparedStatements(max_statements=2)
+        first = stmts.register('select 1')
+        second = stmts.register('select 2')
+        # using of statement moves it to the end of the eviction queue
+        stmts[first]
+        third = stmts.register('select 3')
+        self.assertEqual(list(stmts), [first, third])
+        self.assertNotIn(second, stmts)
+        self.assertEqual(stmts[third]['statement'], 'select 3')
+
+    def test_unknown_statement(self):
+        stmts = PreparedStatements()
+        # COM_STMT_CLOSE of unknown statement must not raise
+        stmts.unregister(100)
+        del stmts[100]
+        self.assertIsNone(stmts.get(100))
+        self.assertEqual(len(stmts), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
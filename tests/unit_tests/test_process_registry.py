@@ -0,0 +1,82 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from mindsdb.utilities import process_registry
+from mindsdb.utilities.process_registry import ActivityRegistry, SLOT, PROCESS_TYPES
+from mindsdb.utilities.functions import mark_process
+
+
+@unittest.skipIf(process_registry.fcntl is None, 'activity is tracked on posix only')
+class ActivityRegistryTest(unittest.TestCase):
+    def setUp(self):
+        # name of shared memory block depends on root dir, so each test has own block
+        self.root = tempfile.mkdtemp()
+        config = {'paths': {'root': self.root, 'tmp': self.root}}
+        patcher = mock.patch('mindsdb.utilities.process_registry.Config', return_value=config)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.registry = ActivityRegistry()
+
+    def tearDown(self):
+        if self.registry._shm is not None:
+            self.registry._shm.close()
+            self.registry._shm.unlink()
+        shutil.rmtree(self.root)
+
+    def write_slot(self, i, pid, create_time, counters):
+        SLOT.pack_into(self.registry._open().buf, i * SLOT.size, pid, create_time, *counters)
+
+    def test_start_and_finish(self):
+        pid = os.getpid()
+        self.registry.start('predict')
+        self.registry.start('predict')
+        self.registry.start('learn')
+        self.assertEqual(self.registry.get_counts()['predict'], {pid: 2})
+        self.assertEqual(self.registry.get_active(), {'learn': True, 'predict': True, 'analyse': False})
+
+        self.registry.finish('predict')
+        self.registry.finish('predict')
+        self.registry.finish('learn')
+        self.assertEqual(self.registry.get_active(), {'learn': False, 'predict': False, 'analyse': False})
+        # slot stays claimed by the process
+        self.assertEqual(self.registry._read_slot(self.registry._slot)[0], pid)
+
+    def test_slots_of_dead_processes_are_reaped(self):
+        # same pid with other create time is a dead process whose pid was reused
+        self.write_slot(0, os.getpid(), 1.0, [1] * len(PROCESS_TYPES))
+        self.registry.start('analyse')
+        self.assertEqual(self.registry._slot, 0)
+        self.assertEqual(self.registry._read_slot(0)[0], os.getpid())
+        self.assertEqual(self.registry._read_slot(0)[1], self.registry._create_time)
+
+        self.write_slot(5, os.getpid(), 1.0, [1] * len(PROCESS_TYPES))
+        self.registry._last_reap = 0
+        self.assertEqual(self.registry.get_counts(), {'learn': {}, 'predict': {}, 'analyse': {os.getpid(): 1}})
+        self.assertEqual(self.registry._read_slot(5)[0], 0)
+
+    def test_errors_do_not_fail_calls(self):
+        @mark_process(name='predict')
+        def predict():
+            return 'predicted'
+
+        registry = process_registry.activity_registry
+        with mock.patch.object(registry, '_pid', None), mock.patch.object(registry, '_open'), \
+                mock.patch.object(registry, '_claim_slot', side_effect=Exception('All 1024 slots are used')):
+            self.assertEqual(predict(), 'predicted')
+
+        with mock.patch.object(ActivityRegistry, '_open', side_effect=OSError('no space left on device')):
+            self.registry.start('learn')
+            self.registry.finish('learn')
+            self.assertEqual(self.registry.get_counts(), {x: {} for x in PROCESS_TYPES})
+
+    def test_finish_without_start_does_not_make_counter_negative(self):
+        self.registry.finish('learn')
+        self.registry.start('learn')
+        self.assertEqual(self.registry.get_counts()['learn'], {os.getpid(): 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+
+from mindsdb.interfaces.stream.stream_pool import HashRing
+
+
+KEYS = [f'{stream}:{partition}' for stream in range(50) for partition in range(8)]
+
+
+class HashRingTest(unittest.TestCase):
+    def assign(self, ring):
+        return {key: ring.get(key) for key in KEYS}
+
+    def test_empty_ring(self):
+        self.assertIsNone(HashRing().get('1:0'))
+
+    def test_keys_are_distributed_over_all_nodes(self):
+        ring = HashRing(['worker_0', 'worker_1', 'worker_2', 'worker_3'])
+        owners = self.assign(ring)
+        self.assertEqual(owners, self.assign(HashRing(['worker_3', 'worker_2', 'worker_1', 'worker_0'])))
+        counts = {node: list(owners.values()).count(node) for node in ('worker_0', 'worker_1', 'worker_2', 'worker_3')}
+        for count in counts.values():
+            self.assertGreater(count, len(KEYS) / 4 / 2)
+
+    def test_added_node_takes_keys_of_other_nodes_only(self):
+        ring = HashRing(['worker_0', 'worker_1', 'worker_2'])
+        before = self.assign(ring)
+        ring.add('worker_3')
+        after = self.assign(ring)
+        moved = [key for key in KEYS if before[key] != after[key]]
+        self.assertGreater(len(moved), 0)
+        self.assertLess(len(moved), len(KEYS) / 2)
+        self.assertTrue(all(after[key] == 'worker_3' for key in moved))
+
+    def test_removed_node_keys_move_to_remaining_nodes(self):
+        ring = HashRing(['worker_0', 'worker_1', 'worker_2'])
+        before = self.assign(ring)
+        ring.remove('worker_1')
+        after = self.assign(ring)
+        for key in KEYS:
+            if before[key] == 'worker_1':
+                self.assertIn(after[key], ('worker_0', 'worker_2'))
+            else:
+                self.assertEqual(after[key], before[key])
+
+        ring.add('worker_1')
+        self.assertEqual(self.assign(ring), before)
+
+
+if __name__ == '__main__':
+    unittest.main()
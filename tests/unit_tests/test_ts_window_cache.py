@@ -0,0 +1,76 @@
+import unittest
+
+import pandas as pd
+
+from mindsdb.interfaces.model.ts_window_cache import TsWindowCache
+
+
+def rows(group, orders):
+    return pd.DataFrame({'g': [group] * len(orders), 'o': list(orders), 'y': [float(x) for x in orders]})
+
+
+class TsWindowCacheTest(unittest.TestCase):
+    def extend(self, cache, df, version=1):
+        return cache.extend('p', version, df, ['o'], ['g'], 3)
+
+    def test_tail_is_updated_only_by_update(self):
+        cache = TsWindowCache()
+        data, positions, tails = self.extend(cache, rows('a', [1, 2, 3, 4]))
+        self.assertEqual(list(data['o']), [1, 2, 3, 4])
+        self.assertEqual(positions, [0, 1, 2, 3])
+
+        # prediction failed: window is not moved
+        data, positions, _ = self.extend(cache, rows('a', [5]))
+        self.assertEqual(list(data['o']), [5])
+
+        cache.update(tails)
+        data, positions, tails = self.extend(cache, rows('a', [5]))
+        self.assertEqual(list(data['o']), [2, 3, 4, 5])
+        self.assertEqual(positions, [3])
+        cache.update(tails)
+
+        data, _, _ = self.extend(cache, rows('a', [6]))
+        self.assertEqual(list(data['o']), [3, 4, 5, 6])
+
+    def test_new_rows_replace_tail_rows(self):
+        cache = TsWindowCache()
+        cache.update(self.extend(cache, rows('a', [1, 2, 3]))[2])
+        new_rows = rows('a', [3])
+        new_rows['y'] = 10.0
+        data, positions, _ = self.extend(cache, new_rows)
+        self.assertEqual(list(data['o']), [1, 2, 3])
+        self.assertEqual(data['y'].iloc[2], 10.0)
+        self.assertEqual(positions, [2])
+
+    def test_positions_in_input_order(self):
+        cache = TsWindowCache()
+        cache.update(self.extend(cache, pd.concat([rows('a', [1, 2]), rows('b', [1, 2])]))[2])
+        df = pd.concat([rows('b', [3]), rows('a', [3])], ignore_index=True)
+        data, positions, _ = self.extend(cache, df)
+        # data is sorted by groups, positions follow rows of input
+        self.assertEqual(list(data['g']), ['a', 'a', 'a', 'b', 'b', 'b'])
+        self.assertEqual(list(data['g'].iloc[positions]), ['b', 'a'])
+        self.assertNotIn('__mindsdb_new_row_position', data.columns)
+
+    def test_versions_and_invalidate(self):
+        cache = TsWindowCache()
+        cache.update(self.extend(cache, rows('a', [1, 2]))[2])
+        data, _, _ = self.extend(cache, rows('a', [3]), version=2)
+        self.assertEqual(list(data['o']), [3])
+
+        cache.invalidate('p')
+        data, _, _ = self.extend(cache, rows('a', [3]))
+        self.assertEqual(list(data['o']), [3])
+
+    def test_least_recently_used_groups_are_evicted(self):
+        cache = TsWindowCache(max_groups=2)
+        for group in ('a', 'b', 'c'):
+            cache.update(self.extend(cache, rows(group, [1]))[2])
+        data, _, _ = self.extend(cache, rows('a', [2]))
+        self.assertEqual(list(data['o']), [2])
+        data, _, _ = self.extend(cache, rows('c', [2]))
+        self.assertEqual(list(data['o']), [1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -103,15 +103,27 @@ class RedisCache(BaseCache):
         key = f"{self.prefix}_{key}"
         self.client.set(key, json.dumps(value))
 
+    def __prefixed_keys(self):
+        return self.__decode(self.client.keys(f"{self.prefix}_*"))
+
     def __iter__(self):
-        return iter(self.__decode(self.client.keys()))
+        return iter([x[len(self.prefix) + 1:] for x in self.__prefixed_keys()])
+
+    def __len__(self):
+        return len(self.__prefixed_keys())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, _type, value, traceback):
+        return None
 
     def __next__(self):
         for i in self.__decode(self.client.keys()):
             yield i
 
     def __delitem__(self, key):
-        key = f"{self.prefix}_key"
+        key = f"{self.prefix}_{key}"
         self.client.delete(key)
 
     def delete(self):
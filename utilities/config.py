@@ -45,8 +45,12 @@ class Config():
                     "console": "INFO",
                     "file": "DEBUG",
                     "db": "WARNING"
+                },
+                "retention": {
+                    "days": 0,
+                    "batch_size": 1000,
+                    "interval": 3600
                 }
-
             },
             "debug": False,
             "integrations": {},
@@ -70,7 +74,48 @@ class Config():
                 }
             },
             "cache": {
-                "type": "local"
+                "type": "local",
+                "predictions": {
+                    "enabled": False,
+                    "ttl": 3600,
+                    "max_size": 100000
+                }
+            },
+            "artifacts": {
+                "remote_dir": None,
+                "cache_size": 10 * 1024 * 1024 * 1024,
+                "part_size": 64 * 1024 * 1024,
+                "workers": 4
+            },
+            "metrics": {
+                "enabled": False
+            },
+            "inference_server": {
+                "enabled": False,
+                "socket": None,
+                "workers": 8,
+                "connections": 4,
+                "timeout": None
+            },
+            "streams": {
+                "batch_size": 100,
+                "batch_timeout": 1,
+                "max_pending": 4,
+                "max_retries": 3,
+                "dead_letter": False,
+                "workers": 0
+            },
+            "ts_window_cache": {
+                "max_groups": 10000
+            },
+            "warm_up": {
+                "enabled": True,
+                "predictors": 10
+            },
+            "parallel_predict": {
+                "enabled": False,
+                "min_rows": 100000,
+                "workers": None
             },
             "force_datasource_removing": False
         }
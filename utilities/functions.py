@@ -3,7 +3,7 @@ import datetime
 import requests
 from functools import wraps
 
-from mindsdb.utilities.fs import create_process_mark, delete_process_mark
+from mindsdb.utilities.process_registry import activity_registry
 
 
 def args_parse():
@@ -51,11 +51,11 @@ def mark_process(name):
     def mark_process_wrapper(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
-            mark = create_process_mark(name)
+            activity_registry.start(name)
             try:
                 return func(*args, **kwargs)
             finally:
-                delete_process_mark(name, mark)
+                activity_registry.finish(name)
         return wrapper
     return mark_process_wrapper
 
@@ -1,6 +1,8 @@
 import os
 import sys
 import logging
+import datetime
+import threading
 import traceback
 
 from mindsdb.interfaces.storage.db import session, Log
@@ -98,8 +100,13 @@ class DbHandler(logging.Handler):
         session.commit()
 
 
+# rows are fetched from db by chunks of this size while logs are formatted
+LOGS_FETCH_SIZE = 500
+
+
 def fmt_log_record(log_record):
     return {
+        'id': log_record.id,
         'log_from': 'mindsdb',
         'level': log_record.log_type,
         'context': 'unkown',
@@ -108,7 +115,13 @@ def fmt_log_record(log_record):
     }
 
 
-def get_logs(min_timestamp, max_timestamp, context, level, log_from, limit):
+def iter_logs(min_timestamp, max_timestamp=None, context=None, level=None, log_from=None, limit=None, after_id=None):
+    """ Formatted logs of the company, ordered by id. Rows are read from db by chunks while they are consumed.
+
+        Args:
+            level (str): log type, or several types separated by comma
+            after_id (int): id of the last log of previous page, for keyset pagination
+    """
     logs = session.query(Log).filter(
         Log.company_id == os.environ.get('MINDSDB_COMPANY_ID', None),
         Log.created_at > min_timestamp
@@ -117,22 +130,87 @@ def get_logs(min_timestamp, max_timestamp, context, level, log_from, limit):
     if max_timestamp is not None:
         logs = logs.filter(Log.created_at < max_timestamp)
 
+    if after_id is not None:
+        logs = logs.filter(Log.id > int(after_id))
+
     if context is not None:
         # e.g. datasource/predictor and assoicated id
         pass
 
     if level is not None:
-        logs = logs.filter(Log.log_type == level)
+        levels = [x.strip() for x in str(level).split(',')]
+        logs = logs.filter(Log.log_type.in_(levels) if len(levels) > 1 else Log.log_type == levels[0])
 
     if log_from is not None:
         # mindsdb/native/lightwood/all
         pass
 
+    logs = logs.order_by(Log.id)
     if limit is not None:
-        logs = logs.limit(limit)
-
-    logs = [fmt_log_record(x) for x in logs]
-    return logs
+        logs = logs.limit(int(limit))
+
+    for log_record in logs.yield_per(LOGS_FETCH_SIZE):
+        yield fmt_log_record(log_record)
+
+
+def get_logs(min_timestamp, max_timestamp, context, level, log_from, limit, after_id=None):
+    """ Page of logs, ordered by id.
+
+        Before keyset pagination logs were returned in no particular order, and 'limit' was the only
+        way to bound the result, so pages taken by created_at could skip or repeat rows. Now callers
+        (e.g. logs endpoint of http API) must pass 'id' of the last log of the page as after_id to get
+        the next page; without after_id the first page is returned.
+    """
+    return list(iter_logs(min_timestamp, max_timestamp, context, level, log_from, limit, after_id))
+
+
+def delete_old_logs(retention_days, batch_size=1000, stop_event=None):
+    """ Delete logs of the company which are older than retention_days, by batches of batch_size rows,
+        so the table is not locked for long and the transaction stays small.
+
+        Returns:
+            int: count of deleted rows
+    """
+    threshold = datetime.datetime.now() - datetime.timedelta(days=retention_days)
+    deleted = 0
+    try:
+        while stop_event is None or not stop_event.is_set():
+            ids = [x[0] for x in session.query(Log.id).filter(
+                Log.company_id == os.environ.get('MINDSDB_COMPANY_ID', None),
+                Log.created_at < threshold
+            ).order_by(Log.id).limit(batch_size)]
+            if len(ids) == 0:
+                break
+            session.query(Log).filter(Log.id.in_(ids)).delete(synchronize_session=False)
+            session.commit()
+            deleted += len(ids)
+    finally:
+        session.remove()
+    return deleted
+
+
+def _run_log_retention(retention_days, batch_size, interval, stop_event):
+    while not stop_event.is_set():
+        try:
+            delete_old_logs(retention_days, batch_size, stop_event)
+        except Exception as e:
+            logging.getLogger('mindsdb').warning(f'Error while deleting old logs: {e}')
+        stop_event.wait(interval)
+
+
+def start_log_retention(stop_event, config=global_config):
+    """ Start background thread which deletes logs older than log.retention.days. 0 days (default) keeps all logs """
+    retention = config['log'].get('retention', {})
+    if not retention.get('days'):
+        return None
+    thread = threading.Thread(
+        target=_run_log_retention,
+        args=(retention['days'], retention.get('batch_size', 1000), retention.get('interval', 3600), stop_event),
+        name='log_retention',
+        daemon=True
+    )
+    thread.start()
+    return thread
 
 
 def initialize_log(config=global_config, logger_name='main', wrap_print=False):
@@ -0,0 +1,266 @@
+import os
+import json
+import time
+import atexit
+import threading
+from functools import wraps
+from contextlib import contextmanager
+
+import psutil
+
+from mindsdb.utilities.config import Config
+from mindsdb.utilities.log import log
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# upper bounds of histogram buckets, in seconds
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 1800)
+# metrics of process are written to file by background thread once in FLUSH_INTERVAL seconds
+FLUSH_INTERVAL = 10
+
+
+class _NullTimer():
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer():
+    __slots__ = ('metrics', 'stage', 'started')
+
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self.metrics.observe(self.stage, time.perf_counter() - self.started)
+        return False
+
+
+class Metrics():
+    """ Duration of hot-path stages and counters of events, exported in Prometheus text format.
+
+        APIs and learn processes are separate processes, so each process writes its metrics to
+        paths['tmp']/metrics/{pid}.json from background thread, and render() sums metrics of all processes.
+        The file also has create time of the process, so file of a dead process is not taken as alive
+        when its pid is reused.
+        If metrics are disabled in config, timer() returns shared no-op context manager.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._collect_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._enabled = None
+        self._durations = {}
+        self._counters = {}
+        self._flusher_pid = None
+        # pid and create time of the process, forked process has its own
+        self._process = None
+
+    @property
+    def enabled(self):
+        if self._enabled is None:
+            self._enabled = Config().get('metrics', {}).get('enabled', False)
+            if self._enabled:
+                atexit.register(self.flush)
+        return self._enabled
+
+    @property
+    def metrics_dir(self):
+        path = os.path.join(Config()['paths']['tmp'], 'metrics')
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def timer(self, stage):
+        """ Context manager which measures duration of stage """
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, stage)
+
+    def timed(self, stage):
+        """ Decorator for long stages, like learn. Metrics are written to file right after the stage,
+            because it may be run in a process which exits without atexit handlers.
+        """
+        def timed_wrapper(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                started = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.observe(stage, time.perf_counter() - started)
+                    self.flush()
+            return wrapper
+        return timed_wrapper
+
+    def observe(self, stage, seconds):
+        if not self.enabled:
+            return
+        with self._lock:
+            record = self._durations.get(stage)
+            if record is None:
+                record = self._durations[stage] = {'count': 0, 'sum': 0, 'buckets': [0] * len(BUCKETS)}
+            record['count'] += 1
+            record['sum'] += seconds
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    record['buckets'][i] += 1
+                    break
+        self._start_flusher()
+
+    def inc(self, name, value=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+        self._start_flusher()
+
+    def _start_flusher(self):
+        """ Start flushing thread in the process, threads are not inherited by forked processes """
+        if self._flusher_pid == os.getpid():
+            return
+        with self._flush_lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+            threading.Thread(target=self._flush_loop, name='metrics_flush', daemon=True).start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(FLUSH_INTERVAL)
+            self.flush()
+
+    def snapshot(self):
+        """ Metrics of this process """
+        with self._lock:
+            return json.loads(json.dumps({'durations': self._durations, 'counters': self._counters}))
+
+    def flush(self):
+        """ Write metrics of the process to file. Errors are logged, metrics never break the caller """
+        try:
+            with self._flush_lock:
+                path = os.path.join(self.metrics_dir, f'{os.getpid()}.json')
+                tmp_path = f'{path}.{threading.get_ident()}.tmp'
+                if self._process is None or self._process[0] != os.getpid():
+                    self._process = (os.getpid(), psutil.Process().create_time())
+                snapshot = self.snapshot()
+                snapshot['create_time'] = self._process[1]
+                with open(tmp_path, 'wt') as f:
+                    json.dump(snapshot, f)
+                os.replace(tmp_path, path)
+        except Exception as e:
+            log.warning(f'Can not write metrics: {e}')
+
+    @staticmethod
+    def _merge(total, snapshot):
+        for stage, record in snapshot['durations'].items():
+            if stage not in total['durations']:
+                total['durations'][stage] = {'count': 0, 'sum': 0, 'buckets': [0] * len(BUCKETS)}
+            total_record = total['durations'][stage]
+            total_record['count'] += record['count']
+            total_record['sum'] += record['sum']
+            total_record['buckets'] = [a + b for a, b in zip(total_record['buckets'], record['buckets'])]
+        for name, value in snapshot['counters'].items():
+            total['counters'][name] = total['counters'].get(name, 0) + value
+
+    @contextmanager
+    def _file_lock(self):
+        """ Several processes may render metrics at same time, files of finished processes are merged under the lock """
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.metrics_dir, 'collect.lock'), 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _is_alive(pid, create_time):
+        if create_time is None:
+            # file of older version
+            return psutil.pid_exists(pid)
+        try:
+            # create time is compared, because pid of dead process may be reused
+            return abs(psutil.Process(pid).create_time() - create_time) < 1
+        except psutil.Error:
+            return False
+
+    def _collect(self):
+        """ Sum metrics of all processes. Files of finished processes are merged to 'finished.json' """
+        total = {'durations': {}, 'counters': {}}
+        finished = {'durations': {}, 'counters': {}}
+        finished_path = os.path.join(self.metrics_dir, 'finished.json')
+        with self._file_lock():
+            if os.path.isfile(finished_path):
+                with open(finished_path, 'rt') as f:
+                    self._merge(finished, json.load(f))
+            finished_pids = []
+            for file_name in os.listdir(self.metrics_dir):
+                if not file_name.endswith('.json') or file_name == 'finished.json':
+                    continue
+                pid = int(file_name[:-len('.json')])
+                if pid == os.getpid():
+                    continue
+                try:
+                    with open(os.path.join(self.metrics_dir, file_name), 'rt') as f:
+                        snapshot = json.load(f)
+                except (OSError, ValueError):
+                    continue
+                if self._is_alive(pid, snapshot.get('create_time')):
+                    self._merge(total, snapshot)
+                else:
+                    self._merge(finished, snapshot)
+                    finished_pids.append(pid)
+            if len(finished_pids) > 0:
+                with open(f'{finished_path}.tmp', 'wt') as f:
+                    json.dump(finished, f)
+                os.replace(f'{finished_path}.tmp', finished_path)
+                for pid in finished_pids:
+                    os.remove(os.path.join(self.metrics_dir, f'{pid}.json'))
+        self._merge(total, finished)
+        self._merge(total, self.snapshot())
+        return total
+
+    def render(self):
+        """ Metrics of all processes in Prometheus text format """
+        if not self.enabled:
+            return ''
+        with self._collect_lock:
+            total = self._collect()
+        lines = [
+            '# HELP mindsdb_stage_duration_seconds Duration of predict and learn stages.',
+            '# TYPE mindsdb_stage_duration_seconds histogram'
+        ]
+        for stage in sorted(total['durations']):
+            record = total['durations'][stage]
+            cumulative = 0
+            for bound, count in zip(BUCKETS, record['buckets']):
+                cumulative += count
+                lines.append(f'mindsdb_stage_duration_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'mindsdb_stage_duration_seconds_bucket{{stage="{stage}",le="+Inf"}} {record["count"]}')
+            lines.append(f'mindsdb_stage_duration_seconds_sum{{stage="{stage}"}} {record["sum"]}')
+            lines.append(f'mindsdb_stage_duration_seconds_count{{stage="{stage}"}} {record["count"]}')
+        for name in sorted(total['counters']):
+            lines.append(f'# TYPE mindsdb_{name}_total counter')
+            lines.append(f'mindsdb_{name}_total {total["counters"][name]}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
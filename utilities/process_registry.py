@@ -0,0 +1,166 @@
+import os
+import time
+import struct
+import hashlib
+import threading
+from contextlib import contextmanager
+
+import psutil
+
+from mindsdb.utilities.config import Config
+
+try:
+    import fcntl
+    from multiprocessing import shared_memory, resource_tracker
+except ImportError:
+    # not posix, activity is not tracked
+    fcntl = None
+
+PROCESS_TYPES = ('learn', 'predict', 'analyse')
+MAX_SLOTS = 1024
+# slot of a process: pid, create time of the process, count of running calls of each type
+SLOT = struct.Struct(f'=qd{len(PROCESS_TYPES)}q')
+# slots of dead processes are freed not more often than once in REAP_INTERVAL seconds
+REAP_INTERVAL = 10
+
+
+class ActivityRegistry():
+    """ Count of running learn/predict/analyse calls of each local process, in shared memory.
+
+        Each process owns one slot of the shared memory block, and only that process changes
+        counters of its slot, so increments are not contended between processes. Slots are claimed
+        under file lock, and slots of dead processes are reaped, so a crashed process is not shown
+        as active forever. The block is not removed when processes exit: it is reused after restart.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._shm = None
+        self._slot = None
+        self._pid = None
+        self._create_time = None
+        self._counters = None
+        self._last_reap = 0
+
+    @property
+    def enabled(self):
+        return fcntl is not None
+
+    def _open(self):
+        if self._shm is not None:
+            return self._shm
+        root = Config()['paths']['root']
+        name = f"mindsdb_activity_{hashlib.md5(root.encode('utf8')).hexdigest()[:16]}"
+        try:
+            shm = shared_memory.SharedMemory(name=name, create=True, size=SLOT.size * MAX_SLOTS)
+        except FileExistsError:
+            shm = shared_memory.SharedMemory(name=name)
+        # block must outlive the process which created it, it is shared by all mindsdb processes
+        try:
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        except Exception:
+            pass
+        self._shm = shm
+        return shm
+
+    @contextmanager
+    def _file_lock(self):
+        path = os.path.join(Config()['paths']['tmp'], 'activity.lock')
+        with open(path, 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _is_alive(pid, create_time):
+        try:
+            # create time is compared, because pid of dead process may be reused
+            return abs(psutil.Process(pid).create_time() - create_time) < 1
+        except psutil.Error:
+            return False
+
+    def _read_slot(self, i):
+        return SLOT.unpack_from(self._open().buf, i * SLOT.size)
+
+    def _reap(self):
+        """ Free slots of dead processes. Must be called under file lock """
+        for i in range(MAX_SLOTS):
+            pid, create_time, *_ = self._read_slot(i)
+            if pid != 0 and not self._is_alive(pid, create_time):
+                SLOT.pack_into(self._shm.buf, i * SLOT.size, 0, 0, *[0] * len(PROCESS_TYPES))
+
+    def _claim_slot(self):
+        pid = os.getpid()
+        create_time = psutil.Process(pid).create_time()
+        with self._file_lock():
+            self._reap()
+            self._last_reap = time.time()
+            for i in range(MAX_SLOTS):
+                if self._read_slot(i)[0] == 0:
+                    self._counters = [0] * len(PROCESS_TYPES)
+                    SLOT.pack_into(self._shm.buf, i * SLOT.size, pid, create_time, *self._counters)
+                    self._slot = i
+                    self._pid = pid
+                    self._create_time = create_time
+                    return
+        raise Exception(f'All {MAX_SLOTS} slots of process activity registry are used')
+
+    def _change(self, process_type, delta):
+        """ Errors are logged: status of processes must not fail learn and predict calls """
+        if not self.enabled:
+            return
+        index = PROCESS_TYPES.index(process_type)
+        try:
+            with self._lock:
+                if self._pid != os.getpid():
+                    # first call in this process, or the process is a fork
+                    self._open()
+                    self._claim_slot()
+                # if start of the call was not registered, finish does not make the counter negative
+                self._counters[index] = max(self._counters[index] + delta, 0)
+                SLOT.pack_into(self._shm.buf, self._slot * SLOT.size, self._pid, self._create_time, *self._counters)
+        except Exception as e:
+            # utilities.log can not be imported on import of this module, it is used on mindsdb import
+            from mindsdb.utilities.log import log
+            log.warning(f'Can not register {process_type} process activity: {e}')
+
+    def start(self, process_type):
+        self._change(process_type, 1)
+
+    def finish(self, process_type):
+        self._change(process_type, -1)
+
+    def get_counts(self) -> dict:
+        """ Count of running calls of each type, by pid """
+        counts = {x: {} for x in PROCESS_TYPES}
+        if not self.enabled:
+            return counts
+        try:
+            self._open()
+            with self._lock:
+                reap = time.time() - self._last_reap > REAP_INTERVAL
+                if reap:
+                    self._last_reap = time.time()
+            if reap:
+                with self._file_lock():
+                    self._reap()
+            for i in range(MAX_SLOTS):
+                pid, _, *counters = self._read_slot(i)
+                if pid == 0:
+                    continue
+                for process_type, count in zip(PROCESS_TYPES, counters):
+                    if count > 0:
+                        counts[process_type][pid] = count
+        except Exception as e:
+            from mindsdb.utilities.log import log
+            log.warning(f'Can not read process activity: {e}')
+        return counts
+
+    def get_active(self) -> dict:
+        """ True for each type which has running calls in any process """
+        return {k: len(v) > 0 for k, v in self.get_counts().items()}
+
+
+activity_registry = ActivityRegistry()